@@ -1,146 +1,149 @@
-import streamlit as st
-import pandas as pd
-import cava_functions as cf
-import altair as alt
 import os
+import streamlit as st
 
-# --- INICIALIZACIÓN AUTOMÁTICA DE BASE DE DATOS (PARA CLOUD) ---
-# Verificamos si la base de datos existe y tiene datos. Si no, corremos el ETL.
-from db_config import get_connection, is_postgres
+# ==============================================================================
+# CONFIGURACIÓN DE PÁGINA (DEBE SER LO PRIMERO)
+# ==============================================================================
+st.set_page_config(page_title="CAVA Stats", page_icon="⚽", layout="wide")
+
+import startup_timing
+from startup_timing import timed
+
+# Solo lo que usan todas las vistas: los gráficos (altair) y la administración
+# se importan recién cuando se muestra la vista que los necesita
+with timed("import", "pandas"):
+    import pandas as pd
+with timed("import", "cava_functions"):
+    import cava_functions as cf
+from db_config import db_connection, is_postgres, read_db_metadata
+from db_migrations import latest_version
 
 DB_FILE = "cava_stats_v2.db"
 
+@st.cache_resource(show_spinner=False)
 def check_db_integrity():
     """
-    Verifica si la base de datos ya está inicializada (tablas creadas).
-    Soporta tanto SQLite local como Postgres en la nube.
+    Verifica si la base de datos ya está inicializada, leyendo db_metadata una sola vez
+    por proceso (se limpia con check_db_integrity.clear() después de correr el ETL).
+    Soporta tanto SQLite local como Postgres en la nube. Retorna (estado, detalle):
+      - "lista": metadatos de la base en `detalle`.
+      - "vacia": no hay base o no tiene datos cargados: hay que correr el ETL.
+      - "esquema": el esquema no está en la versión del código; `detalle` es la versión de la base.
     """
-    conn = get_connection()
-    if not conn: 
-        # Si no hay conexión (ni local file ni cloud creds), retornamos False
-        return False
-        
-    try:
-        c = conn.cursor()
-        # Verificamos si hay DATOS en la tabla más importante (stats)
-        c.execute("SELECT count(*) FROM stats")
-        count = c.fetchone()[0]
-        conn.close()
-        return count > 0
-    except Exception as e:
-        # Si falla (ej: tabla no existe), asumimos que hay que inicializar
-        return False
-
-if not check_db_integrity():
-    st.info("👋 ¡Bienvenido a CAVA Stats!")
-    
-    excel_file = "Estadísticas CAVA_v3_original.xlsx"
-    
-    # Si el archivo NO existe localmente, pedimos que lo suban
-    if not os.path.exists(excel_file):
-        st.warning(f"⚠️ No se encontró el archivo '{excel_file}'.")
-        st.write("Para inicializar la base de datos en la nube, por favor sube el Excel original aquí:")
-        
-        uploaded_file = st.file_uploader("Subir Excel", type=["xlsx"])
-        
-        if uploaded_file is not None:
-            # Guardamos el archivo subido con el nombre esperado
-            with open(excel_file, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.success("✅ Archivo subido con éxito. Procesando...")
-            st.rerun()
-        else:
-            st.stop() # Detenemos la ejecución hasta que suban el archivo
+    with db_connection(readonly=True) as conn:
+        if not conn: 
+            # Si no hay conexión (ni local file ni cloud creds), hay que inicializar
+            return "vacia", None
+            
+        try:
+            meta = read_db_metadata(conn)
+        except Exception:
+            # Sin db_metadata: o la base está vacía, o le faltan migraciones
+            conn.rollback()
+            try:
+                c = conn.cursor()
+                c.execute("SELECT MAX(version) FROM schema_migrations")
+                return "esquema", c.fetchone()[0] or 0
+            except Exception:
+                return "vacia", None
 
-    # Si el archivo YA existe (o se acaba de subir), inicializamos la DB
-    with st.spinner("🚀 Inicializando motor de base de datos..."):
-        from db_init import init_db
-        from etl_process import main as run_etl
-        
-        init_db()
-        run_etl()
-    
-    st.success("✅ ¡Todo listo! Cargando dashboard...")
-    st.rerun()
+    version = int(meta.get("schema_version", 0))
+    if version != latest_version():
+        return "esquema", version
+    if int(meta.get("filas_stats", 0)) == 0:
+        return "vacia", None
+    return "lista", meta
 
-import admin_module as admin
+# --- INICIALIZACIÓN AUTOMÁTICA DE BASE DE DATOS (PARA CLOUD) ---
+def ensure_database():
+    """
+    Verifica que la base esté lista (ver check_db_integrity). Si falta cargarla lanza el ETL
+    en segundo plano y muestra su avance; en cualquier caso que no sea "lista" corta la ejecución.
+    Retorna los metadatos de la base.
+    """
+    with timed("consulta", "check_db_integrity"):
+        db_status, db_detail = check_db_integrity()
 
-# ==============================================================================
-# CONFIGURACIÓN DE PÁGINA (DEBE SER LO PRIMERO)
-# ==============================================================================
-st.set_page_config(page_title="CAVA Stats", page_icon="⚽", layout="wide")
+    if db_status == "esquema":
+        # No recargamos: los datos están, lo que falta es actualizar la estructura
+        st.error(f"⚠️ La base de datos está en la versión de esquema {db_detail} y el código espera la "
+                 f"{latest_version()}. Corré `python db_migrations.py` y reiniciá la app.")
+        st.stop()
 
-import admin_module as admin
+    if db_status == "vacia":
+        import etl_jobs
 
-# Diseño estético (CSS)
-st.markdown("""
-    <style>
-    .main { background-color: #f8f9fa; }
-    .stMetric { background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); }
-    .stTabs [data-baseweb="tab-list"] { gap: 24px; }
-    .stTabs [data-baseweb="tab"] { height: 50px; white-space: pre-wrap; font-weight: 600; }
-    </style>
-""", unsafe_allow_html=True)
+        st.info("👋 ¡Bienvenido a CAVA Stats!")
+        job = etl_jobs.current_etl_job()
 
-# ==============================================================================
-# MODO DE NAVEGACIÓN
-# ==============================================================================
-view_mode = st.sidebar.radio("Vista", ["📊 Dashboard Público", "⚙️ Administración"])
+        # La carga corre en segundo plano (una sola por proceso): mostramos su avance
+        if job is not None and job.running:
+            @st.fragment(run_every=1)
+            def etl_progress():
+                snap = job.snapshot()
+                if job.running:
+                    st.progress(snap["avance"], text=f"🚀 Inicializando base de datos: {snap['etiqueta']} ({snap['segundos']:.0f}s)")
+                else:
+                    st.rerun()  # Terminó: se vuelve a correr la app completa
 
-if view_mode == "⚙️ Administración":
-    admin.main()
-    st.stop()
+            etl_progress()
+            st.stop()
 
-# ==============================================================================
-# DASHBOARD PÚBLICO
-# ==============================================================================
-st.title("⚽ CAVA - Sistema de Estadísticas")
-
-# Cargamos los datos básicos
-df_torneos = cf.load_torneos()
-df_jugadores = cf.load_jugadores()
-
-if df_torneos.empty:
-    st.warning("No hay datos de torneos disponibles.")
-    temporadas = ["Todas"]
-else:
-    temporadas = ["Todas"] + sorted(df_torneos['temporada'].unique().tolist(), reverse=True)
-
-# BARRA LATERAL (Filtros)
-with st.sidebar:
-    st.header("Filtros")
-    sel_temp = st.selectbox("Temporada", temporadas)
+        snap = job.snapshot() if job is not None else None
+        if snap and snap["estado"] == "ok" and not getattr(job, "publicado", False):
+            # La primera sesión que ve la carga terminada invalida el estado cacheado de la base
+            job.publicado = True
+            cf.load_data_versions.clear()
+            check_db_integrity.clear()
+            st.success("✅ ¡Todo listo! Cargando dashboard...")
+            st.rerun()
+        if snap and snap["estado"] == "error":
+            st.error(f"❌ Falló la inicialización: {snap['error']}")
+        elif snap:
+            st.warning("⚠️ La carga terminó pero la base sigue sin datos.")
     
-    if df_torneos.empty:
-        torneos_list = ["Todos"]
-    elif sel_temp == "Todas":
-        torneos_list = ["Todos"] + df_torneos['nombre'].unique().tolist()
-    else:
-        torneos_list = ["Todos"] + df_torneos[df_torneos['temporada'] == sel_temp]['nombre'].tolist()
+        excel_file = "Estadísticas CAVA_v3_original.xlsx"
     
-    sel_torneo = st.selectbox("Torneo", torneos_list)
+        if os.path.exists(excel_file):
+            source = excel_file
+        else:
+            # Si el archivo NO existe localmente, pedimos que lo suban
+            st.warning(f"⚠️ No se encontró el archivo '{excel_file}'.")
+            st.write("Para inicializar la base de datos en la nube, por favor sube el Excel original aquí:")
+        
+            uploaded_file = st.file_uploader("Subir Excel", type=["xlsx"])
+        
+            if uploaded_file is None:
+                st.stop() # Detenemos la ejecución hasta que suban el archivo
+            # El ETL lee el archivo subido directamente desde memoria
+            source = uploaded_file.getvalue()
+
+        # Después de una carga fallida no reintentamos solos
+        if snap and not st.button("🔄 Reintentar carga"):
+            st.stop()
+
+        etl_jobs.start_etl_job(source)
+        st.rerun()
 
-# Definición de las solapas (Tabs) principales
-tab0, tab1, tab2 = st.tabs(["📈 Análisis", "🏟️ Partidos", "👤 Jugadores"])
+    return db_detail
 
 # ---------------------------------------------------------
-# SOLAPA 0: DASHBOARD DE ANÁLISIS GLOBAL
+# VISTA: DASHBOARD DE ANÁLISIS GLOBAL
 # ---------------------------------------------------------
-with tab0:
+def render_analisis(tid, temporada):
     st.subheader("Resumen de Campaña")
     
-    # Obtenemos las métricas globales filtradas
-    tid = None
-    if sel_torneo != "Todos":
-        tid = int(df_torneos[df_torneos['nombre'] == sel_torneo]['id'].iloc[0])
-        
-    g_stats = cf.get_global_stats(torneo_id=tid, temporada=sel_temp)
+    with timed("import", "altair"):
+        import altair as alt
     
-    # Cálculo de Efectividad Global para la selección
-    efectividad_val = 0
-    if g_stats['pj'] > 0:
-        pts = (g_stats['pg'] * 3) + g_stats['pe']
-        efectividad_val = (pts / (g_stats['pj'] * 3)) * 100
+    # Toda la vista sale de un único snapshot cacheado (una conexión, pocas consultas)
+    with timed("consulta", "get_dashboard_snapshot"):
+        snap = cf.get_dashboard_snapshot(torneo_id=tid, temporada=temporada)
+    if snap is None:
+        st.error("No se pudo conectar a la base de datos.")
+        st.stop()
+    g_stats = snap.record
+    efectividad_val = snap.efectividad
     
     # Fila de tarjetas de métricas
     m1, m2, m3, m4, m5, m6 = st.columns(6)
@@ -158,7 +161,7 @@ with tab0:
     
     with col_g1:
         st.markdown("##### Rendimiento")
-        df_dist = cf.get_result_distribution(torneo_id=tid, temporada=sel_temp)
+        df_dist = snap.distribution
         if not df_dist.empty and df_dist['Cantidad'].sum() > 0:
             pie = alt.Chart(df_dist).mark_arc(innerRadius=50).encode(
                 theta=alt.Theta(field="Cantidad", type="quantitative"),
@@ -171,8 +174,7 @@ with tab0:
 
     with col_g2:
         st.markdown("##### Goleadores")
-        # Pasamos los filtros a get_top_stat
-        df_top_g = cf.get_top_stat("goles_marcados", limit=5, torneo_id=tid, temporada=sel_temp)
+        df_top_g = snap.top_goleadores
         if not df_top_g.empty:
             chart_g = alt.Chart(df_top_g).mark_bar(cornerRadiusEnd=4).encode(
                 x=alt.X('Total:Q', title=None),
@@ -186,8 +188,8 @@ with tab0:
 
     with col_g3:
         st.markdown("##### Más Minutos")
-        # Pasamos los filtros a get_top_stat (sum_initial=False para ver solo lo filtrado)
-        df_top_m = cf.get_top_stat("minutos_jugados", limit=5, sum_initial=False, torneo_id=tid, temporada=sel_temp)
+        # Solo minutos del detalle filtrado (sin saldo inicial)
+        df_top_m = snap.top_minutos
         if not df_top_m.empty:
             chart_m = alt.Chart(df_top_m).mark_bar(cornerRadiusEnd=4).encode(
                 x=alt.X('Total:Q', title=None),
@@ -201,7 +203,7 @@ with tab0:
             
     # --- RACHA DE FORMA ---
     st.markdown("##### Racha Actual")
-    df_form = cf.get_recent_form(limit=5, torneo_id=tid, temporada=sel_temp)
+    df_form = snap.recent_form
     if not df_form.empty:
         # Mostramos bolitas de colores (emojies)
         cols_form = st.columns(len(df_form))
@@ -214,22 +216,46 @@ with tab0:
 
     st.divider()
     
-    # Tabla de DTs filtrada
+    # Tabla de DTs filtrada (a pedido: es la tabla más larga de la vista)
     st.markdown("##### Efectividad DTs")
-    df_dt = cf.get_dt_stats(torneo_id=tid, temporada=sel_temp)
-    if not df_dt.empty:
-        df_dt_display = df_dt.copy()
-        df_dt_display['Efectivid.'] = df_dt_display['Efectividad'].astype(str) + "%"
-        st.dataframe(df_dt_display[['Tecnico', 'PJ', 'PG', 'Efectivid.', 'PTS']], 
-                     use_container_width=True, hide_index=True)
+    if st.toggle("Mostrar efectividad de los DTs", key="mostrar_dts"):
+        df_dt = snap.dt_stats
+        if not df_dt.empty:
+            df_dt_display = df_dt.copy()
+            df_dt_display['Efectivid.'] = df_dt_display['Efectividad'].astype(str) + "%"
+            st.dataframe(df_dt_display[['Tecnico', 'PJ', 'PG', 'Efectivid.', 'PTS']], 
+                         use_container_width=True, hide_index=True)
+
+    st.divider()
+    st.markdown("##### Desglose")
+    if st.toggle("Mostrar desglose por DT, rival, árbitro, torneo o condición", key="mostrar_desglose"):
+        render_desglose(tid, temporada)
 
     st.divider()
     st.write("**Historial contra Rivales**")
-    df_rivales = cf.load_rivales()
-    if not df_rivales.empty:
-        sel_rival = st.selectbox("Seleccionar Rival para ver historial", df_rivales['nombre'].tolist())
+    if st.toggle("Mostrar historial contra rivales", key="mostrar_rivales"):
+        render_historial_rivales()
+
+@st.fragment
+def render_desglose(tid, temporada):
+    # Fragmento: cambiar las dimensiones solo vuelve a correr esta sección
+    dims = st.multiselect("Agrupar por", list(cf.PIVOT_DIMENSIONS), default=["condicion"],
+                          format_func=lambda d: cf.PIVOT_DIMENSIONS[d][0], key="desglose_dimensiones")
+    df_pivot = cf.get_pivot(tuple(dims), torneo_id=tid, temporada=temporada)
+    if not df_pivot.empty:
+        st.dataframe(df_pivot, use_container_width=True, hide_index=True,
+                     column_config={'Efectividad': st.column_config.NumberColumn(format="%.1f%%")})
+
+@st.fragment
+def render_historial_rivales():
+    # Fragmento: elegir otro rival solo vuelve a correr esta sección
+    import altair as alt
+    # Una sola tabla cacheada con todos los rivales: cambiar de rival no consulta la base
+    df_h2h = cf.get_head_to_head()
+    if not df_h2h.empty:
+        sel_rival = st.selectbox("Seleccionar Rival para ver historial", df_h2h['Rival'].tolist())
         if sel_rival:
-            rid = int(df_rivales[df_rivales['nombre'] == sel_rival]['id'].iloc[0])
+            rid = int(df_h2h[df_h2h['Rival'] == sel_rival]['id_rival'].iloc[0])
             r_stats = cf.get_stats_against_rival(rid)
             
             c1, c2, c3, c4, c5, c6 = st.columns(6)
@@ -251,12 +277,27 @@ with tab0:
             )
             st.altair_chart(pie_chart, use_container_width=True)
 
+        with st.expander("Ver todos los rivales"):
+            st.dataframe(
+                df_h2h[['Rival', 'PJ', 'PG', 'PE', 'PP', 'GF', 'GC', 'Efectividad',
+                        'PJ_L', 'PG_L', 'PE_L', 'PP_L', 'PJ_V', 'PG_V', 'PE_V', 'PP_V', 'Último']]
+                    .sort_values(by='PJ', ascending=False),
+                use_container_width=True, hide_index=True,
+                column_config={
+                    'Efectividad': st.column_config.NumberColumn(format="%.1f%%"),
+                    'Último': "Último partido",
+                }
+            )
+
 # ---------------------------------------------------------
-# SOLAPA 1: LISTADO DE PARTIDOS
+# VISTA: LISTADO DE PARTIDOS
 # ---------------------------------------------------------
-with tab1:
+@st.fragment
+def render_partidos(tid, temporada):
+    # Fragmento: "Cargar más" solo vuelve a correr esta vista
     st.subheader("Historial de Partidos")
-    df_partidos = cf.load_partidos(torneo_id=tid)
+    listado = f"partidos:{tid}:{temporada}"
+    df_partidos, hay_mas = load_pages(listado, lambda cursor: cf.load_partidos_page(tid, temporada, before_id=cursor))
     
     if df_partidos.empty:
         st.info("No hay partidos registrados para los filtros seleccionados.")
@@ -264,12 +305,42 @@ with tab1:
         # Mostramos una tabla con el detalle de cada partido
         cols_show = ['nro_fecha', 'rival_nombre', 'condicion', 'goles_favor', 'goles_contra', 'torneo_nombre']
         st.dataframe(df_partidos[cols_show], use_container_width=True, hide_index=True)
+        st.caption(f"Mostrando {len(df_partidos)} de {cf.count_partidos(tid, temporada)} partidos")
+        if hay_mas:
+            load_more_button(listado)
+
+# ---------------------------------------------------------
+# LISTADOS PAGINADOS ("Cargar más")
+# ---------------------------------------------------------
+def load_pages(listado, fetch):
+    """
+    Junta las páginas ya pedidas de un listado paginado. `fetch(cursor)` retorna
+    (df, cursor siguiente o None); `listado` identifica el listado y sus filtros (cada
+    combinación lleva su propia cuenta de páginas). Cada página está cacheada:
+    pedir una más solo consulta esa. Retorna (df, hay más páginas).
+    """
+    pages = st.session_state.setdefault("paginas", {}).get(listado, 1)
+    frames, cursor = [], None
+    for _ in range(pages):
+        df, cursor = fetch(cursor)
+        frames.append(df)
+        if cursor is None:
+            break
+    return pd.concat(frames, ignore_index=True), cursor is not None
+
+def load_more_button(listado):
+    def load_more():
+        st.session_state["paginas"][listado] = st.session_state["paginas"].get(listado, 1) + 1
+    st.button("Cargar más", key=f"mas:{listado}", on_click=load_more)
 
 # ---------------------------------------------------------
-# SOLAPA 2: FICHAS DE JUGADORES
+# VISTA: FICHAS DE JUGADORES
 # ---------------------------------------------------------
-with tab2:
+@st.fragment
+def render_jugadores():
+    # Fragmento: elegir otro jugador solo vuelve a correr esta vista
     st.subheader("Estadísticas por Jugador")
+    df_jugadores = cf.load_jugadores()
     
     if not df_jugadores.empty:
         df_jugadores['full_name'] = df_jugadores['apellido'] + ", " + df_jugadores['nombre']
@@ -281,7 +352,8 @@ with tab2:
             
             # Traemos las estadísticas calculadas y el log de partidos
             stats = cf.get_player_stats(pid)
-            match_log = cf.get_player_matches(pid)
+            listado = f"jugador:{pid}"
+            match_log, hay_mas = load_pages(listado, lambda cursor: cf.get_player_matches_page(pid, before_id=cursor))
             
             if not stats.empty:
                  s = stats.iloc[0]
@@ -305,4 +377,85 @@ with tab2:
                  
                  st.divider()
                  st.write("**Historial de partidos detallado**")
-                 st.dataframe(match_log, hide_index=True, use_container_width=True)
+                 st.dataframe(match_log.drop(columns=['id_partido'], errors='ignore'),
+                              hide_index=True, use_container_width=True)
+                 st.caption(f"Mostrando {len(match_log)} de {cf.count_player_matches(pid)} partidos")
+                 if hay_mas:
+                     load_more_button(listado)
+
+# ==============================================================================
+# APLICACIÓN (cada rerun de Streamlit entra por acá)
+# ==============================================================================
+def main():
+    db_detail = ensure_database()
+
+    # Diseño estético (CSS)
+    st.markdown("""
+        <style>
+        .main { background-color: #f8f9fa; }
+        .stMetric { background-color: white; padding: 15px; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); }
+        </style>
+    """, unsafe_allow_html=True)
+
+    # ==============================================================================
+    # MODO DE NAVEGACIÓN
+    # ==============================================================================
+    view_mode = st.sidebar.radio("Vista", ["📊 Dashboard Público", "⚙️ Administración"])
+
+    if view_mode == "⚙️ Administración":
+        with timed("import", "admin_module"):
+            import admin_module as admin
+        admin.main()
+        st.stop()
+
+    # ==============================================================================
+    # DASHBOARD PÚBLICO
+    # ==============================================================================
+    st.title("⚽ CAVA - Sistema de Estadísticas")
+
+    # Cargamos los datos básicos
+    with timed("consulta", "load_torneos"):
+        df_torneos = cf.load_torneos()
+
+    if df_torneos.empty:
+        st.warning("No hay datos de torneos disponibles.")
+        temporadas = ["Todas"]
+    else:
+        temporadas = ["Todas"] + sorted(df_torneos['temporada'].unique().tolist(), reverse=True)
+
+    # BARRA LATERAL (Filtros)
+    with st.sidebar:
+        st.header("Filtros")
+        sel_temp = st.selectbox("Temporada", temporadas)
+    
+        if df_torneos.empty:
+            torneos_list = ["Todos"]
+        elif sel_temp == "Todas":
+            torneos_list = ["Todos"] + df_torneos['nombre'].unique().tolist()
+        else:
+            torneos_list = ["Todos"] + df_torneos[df_torneos['temporada'] == sel_temp]['nombre'].tolist()
+    
+        sel_torneo = st.selectbox("Torneo", torneos_list)
+
+        if db_detail and db_detail.get("ultima_carga"):
+            st.caption(f"Última carga del Excel: {db_detail['ultima_carga']}")
+
+    tid = None
+    if sel_torneo != "Todos":
+        tid = int(df_torneos[df_torneos['nombre'] == sel_torneo]['id'].iloc[0])
+
+    # Solo se calcula la vista activa (st.tabs corría las tres en cada interacción)
+    VISTAS = ["📈 Análisis", "🏟️ Partidos", "👤 Jugadores"]
+    vista = st.radio("Vista", VISTAS, horizontal=True, key="vista_dashboard", label_visibility="collapsed")
+
+    if vista == "📈 Análisis":
+        render_analisis(tid, sel_temp)
+    elif vista == "🏟️ Partidos":
+        render_partidos(tid, sel_temp)
+    else:
+        render_jugadores()
+
+    # Tiempos del arranque en frío (una sola vez por proceso, en el log del servidor)
+    startup_timing.report()
+
+main()
@@ -0,0 +1,480 @@
+"""
+Benchmark de cava_functions sobre datos sintéticos.
+
+Genera una base con el esquema de cava_schema.sql (+ migraciones) y datos inventados pero
+deterministas (misma semilla -> mismos datos), de tamaño configurable hasta millones de
+filas en stats, y mide cada lectura y escritura pública de cava_functions.
+
+    python benchmark.py --scale medium --output resultados.json
+    python benchmark.py --scale medium --baseline resultados.json   # exit 1 si algo empeoró
+
+El backend es el mismo que usaría la app: SQLite (un archivo aparte, --db) o, si hay una
+sección [supabase] en los secrets, ese Postgres; apuntarla a un Postgres local con el
+esquema ya creado para medir contra Postgres. Nunca se escribe sobre una base con datos reales.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import db_config
+import db_migrations
+from db_config import get_connection, close_connection, get_placeholder, bulk_insert
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tamaños predefinidos: temporadas, jugadores, partidos (en total) y jugadores con stats por partido
+SCALES = {
+    "small":  {"seasons": 5,   "players": 150,   "matches": 300,    "stats_per_match": 16},
+    "medium": {"seasons": 20,  "players": 1000,  "matches": 3000,   "stats_per_match": 16},
+    "large":  {"seasons": 60,  "players": 10000, "matches": 60000,  "stats_per_match": 18},
+    "huge":   {"seasons": 100, "players": 40000, "matches": 200000, "stats_per_match": 18},
+}
+
+POSICIONES = ("ARQ", "DEF", "VOL", "DEL")
+N_RIVALES = 60
+N_ARBITROS = 80
+SQUAD_SIZE = 30          # Plantel del que salen los jugadores de cada partido
+TITULARES = 11
+STATS_CHUNK = 20000      # Partidos cuyas stats se generan e insertan de a una vez
+ULTIMA_TEMPORADA = 2025
+
+# Lecturas que el motor en memoria (fact_store) puede responder: se miden en los dos modos
+STORE_READERS = {
+    "get_global_stats", "get_top_stat", "get_dt_stats", "get_recent_form", "get_head_to_head",
+    "get_pivot", "get_dashboard_snapshot", "get_result_distribution", "count_partidos",
+}
+
+# Comparación contra una corrida anterior (--baseline)
+DEFAULT_THRESHOLD = 1.5     # Regresión: la mediana supera a la anterior por este factor...
+DEFAULT_MIN_DELTA_MS = 2.0  # ...y por al menos estos milisegundos (evita ruido en lo sub-milisegundo)
+
+# ==============================================================================
+# GENERACIÓN DE DATOS
+# ==============================================================================
+
+def generate(conn, params):
+    """
+    Llena las tablas con datos sintéticos según `params` (ver SCALES, más 'seed') y
+    reconstruye las tablas derivadas como al final del ETL. Retorna {tabla: filas}.
+    """
+    from etl_process import rebuild_player_totals, rebuild_player_rollup, record_load_metadata
+
+    rng = np.random.default_rng(params["seed"])
+    seasons, players = params["seasons"], params["players"]
+    matches, per_match = params["matches"], params["stats_per_match"]
+    if per_match > players:
+        raise ValueError("stats_per_match no puede superar la cantidad de jugadores")
+
+    temporadas = [str(ULTIMA_TEMPORADA - seasons + 1 + i) for i in range(seasons)]
+    torneos = [(2 * i + k + 1, f"{nombre} {t[-2:]}", t)
+               for i, t in enumerate(temporadas)
+               for k, nombre in enumerate(("APERTURA", "CLAUSURA"))]
+    n_tecnicos = max(1, seasons)
+
+    bulk_insert(conn, "posiciones", ["id", "nombre"], list(enumerate(POSICIONES, 1)))
+    bulk_insert(conn, "torneos", ["id", "nombre", "temporada"], torneos)
+    bulk_insert(conn, "rivales", ["id", "nombre"], [(i, f"Rival {i:03d}") for i in range(1, N_RIVALES + 1)])
+    bulk_insert(conn, "arbitros", ["id", "nombre"], [(i, f"Árbitro {i:03d}") for i in range(1, N_ARBITROS + 1)])
+    bulk_insert(conn, "tecnicos", ["id", "nombre"], [(i, f"Técnico {i:03d}") for i in range(1, n_tecnicos + 1)])
+
+    # Jugadores: el primer 10% arrastra saldos iniciales (historia previa al sistema)
+    posicion = rng.integers(1, len(POSICIONES) + 1, players)
+    historicos = np.arange(players) < max(1, players // 10)
+    iniciales = rng.poisson((20, 3, 5, 2, 4, 0.3, 12, 6), (players, 8)) * historicos[:, None]
+    bulk_insert(conn, "jugadores", [
+        "id", "id_excel", "nombre", "apellido", "id_posicion",
+        "pj_inicial", "goles_marcados_inicial", "goles_recibidos_inicial", "asistencias_inicial",
+        "amarillas_inicial", "rojas_inicial", "titular_inicial", "suplente_inicial",
+    ], [
+        (i + 1, f"J{i + 1:05d}", f"Nombre{i + 1}", f"Apellido{i + 1}", int(posicion[i]), *iniciales[i].tolist())
+        for i in range(players)
+    ])
+
+    # Partidos repartidos en orden entre los torneos (los ids crecen con el tiempo)
+    ids = np.arange(matches)
+    torneo_idx = ids * len(torneos) // matches
+    primero = np.searchsorted(torneo_idx, torneo_idx)
+    nro = ids - primero + 1
+    rival = rng.integers(1, N_RIVALES + 1, matches)
+    arbitro = rng.integers(1, N_ARBITROS + 1, matches)
+    sin_arbitro = rng.random(matches) < 0.05
+    tecnico = ids * n_tecnicos // matches + 1
+    condicion = rng.choice(np.array(["L", "V", "N"]), matches, p=(0.48, 0.48, 0.04))
+    gf = rng.poisson(1.3, matches)
+    gc = rng.poisson(1.1, matches)
+    partidos = []
+    for i in range(matches):
+        t = int(torneo_idx[i])
+        # Apertura arranca en febrero y Clausura en agosto, una fecha por semana
+        inicio = date(int(torneos[t][2]), 2 if t % 2 == 0 else 8, 1)
+        partidos.append((
+            i + 1, (inicio + timedelta(days=7 * (int(nro[i]) - 1) % 150)).isoformat(), f"F{nro[i]}",
+            t + 1, int(rival[i]), None if sin_arbitro[i] else int(arbitro[i]), int(tecnico[i]),
+            str(condicion[i]), int(gf[i]), int(gc[i]),
+        ))
+    bulk_insert(conn, "partidos", [
+        "id", "fecha_calendario", "nro_fecha", "id_torneo", "id_rival", "id_arbitro", "id_tecnico",
+        "condicion", "goles_favor", "goles_contra",
+    ], partidos)
+    del partidos
+
+    # Stats: cada partido toma jugadores distintos de un plantel que se va renovando con los años
+    squad = min(players, max(SQUAD_SIZE, per_match))
+    columns = ["id_partido", "id_jugador", "es_titular", "minutos_jugados", "goles_marcados",
+               "goles_recibidos", "asistencias", "amarillas", "rojas"]
+    for start in range(0, matches, STATS_CHUNK):
+        chunk = np.arange(start, min(start + STATS_CHUNK, matches))
+        n = len(chunk)
+        desde = chunk * (players - squad) // max(1, matches - 1)
+        elegidos = np.argsort(rng.random((n, squad)), axis=1)[:, :per_match]
+        jugador = desde[:, None] + elegidos + 1
+        titular = np.broadcast_to(np.arange(per_match) < TITULARES, (n, per_match))
+        minutos = np.where(titular, rng.integers(60, 91, (n, per_match)), rng.integers(1, 46, (n, per_match)))
+        recibidos = np.zeros((n, per_match), dtype=np.int64)
+        recibidos[:, 0] = gc[chunk]  # El primero de la lista es el arquero
+        rows = np.stack([
+            np.broadcast_to(chunk[:, None] + 1, (n, per_match)), jugador, titular, minutos,
+            rng.poisson(0.12, (n, per_match)), recibidos, rng.poisson(0.08, (n, per_match)),
+            rng.binomial(1, 0.12, (n, per_match)), rng.binomial(1, 0.01, (n, per_match)),
+        ], axis=-1).reshape(-1, len(columns)).tolist()
+        for row in rows:
+            row[2] = bool(row[2])
+        bulk_insert(conn, "stats", columns, rows)
+        del rows
+
+    rebuild_player_totals(conn)
+    rebuild_player_rollup(conn)
+    db_config.bump_data_versions(conn, ["global"])
+    db_config.write_db_metadata(conn, {"benchmark": json.dumps(params, sort_keys=True)})
+    conn.commit()
+    record_load_metadata(conn)
+    return row_counts(conn)
+
+def row_counts(conn):
+    c = conn.cursor()
+    counts = {}
+    for table in ("jugadores", "torneos", "partidos", "stats", "player_rollup"):
+        c.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = c.fetchone()[0]
+    return counts
+
+def _clear_tables(conn):
+    """(Postgres) Vacía una base de benchmark anterior antes de volver a generarla."""
+    c = conn.cursor()
+    for table in ("stats", "player_rollup", "player_totals", "partidos", "jugadores",
+                  "posiciones", "torneos", "rivales", "arbitros", "tecnicos"):
+        c.execute(f"DELETE FROM {table}")
+    c.execute("DELETE FROM usuarios WHERE username LIKE 'bench%'")
+    conn.commit()
+
+def prepare_database(params, db_path, reuse=False):
+    """
+    Deja lista la base de benchmark con los datos de `params`. Con `reuse` y una base ya
+    generada con los mismos parámetros no se regenera. Retorna (backend, filas, segundos de generación).
+    """
+    if db_config._get_pool() is None:
+        backend = "sqlite"
+        db_path = os.path.abspath(db_path)
+        if db_path == os.path.abspath(os.path.join(BASE_DIR, "cava_stats_v2.db")):
+            raise SystemExit("❌ --db no puede ser la base de la app.")
+        db_config.DB_NAME = db_path
+        db_config.SCHEMA_FILE_SQLITE = os.path.join(BASE_DIR, db_config.SCHEMA_FILE_SQLITE)
+    else:
+        backend = "postgres"
+    db_migrations.MIGRATIONS_DIR = os.path.join(BASE_DIR, db_migrations.MIGRATIONS_DIR)
+
+    wanted = json.dumps(params, sort_keys=True)
+    if backend == "sqlite" and os.path.exists(db_path):
+        stored = _stored_params(db_path)
+        if stored is None:
+            raise SystemExit(f"❌ {db_path} no es una base de benchmark: no se sobrescribe.")
+        if reuse and stored == wanted:
+            return backend, _counts(), 0.0
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    if backend == "sqlite":
+        db_config.init_db()
+    db_migrations.apply_migrations()
+
+    conn = get_connection()
+    try:
+        if backend == "postgres":
+            stored = db_config.read_db_metadata(conn).get("benchmark")
+            if stored is None and row_counts(conn)["partidos"]:
+                raise SystemExit("❌ La base Postgres configurada ya tiene partidos: el benchmark necesita una vacía.")
+            if stored == wanted and reuse:
+                return backend, row_counts(conn), 0.0
+            _clear_tables(conn)
+        t0 = time.perf_counter()
+        counts = generate(conn, params)
+        return backend, counts, time.perf_counter() - t0
+    finally:
+        close_connection(conn)
+
+def _stored_params(db_path):
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute("SELECT valor FROM db_metadata WHERE clave = 'benchmark'").fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+def _counts():
+    conn = get_connection()
+    try:
+        return row_counts(conn)
+    finally:
+        close_connection(conn)
+
+# ==============================================================================
+# MEDICIONES
+# ==============================================================================
+
+def _reader_calls(conn):
+    """
+    Lecturas públicas de cava_functions con argumentos tomados de los datos generados
+    (el torneo, jugador y rival con más registros), como en db_migrations._hot_path_calls.
+    """
+    import cava_functions as cf
+    c = conn.cursor()
+    ph = get_placeholder(conn)
+    c.execute("SELECT id_torneo FROM partidos GROUP BY id_torneo ORDER BY COUNT(*) DESC LIMIT 1")
+    tid = c.fetchone()[0]
+    c.execute(f"SELECT temporada FROM torneos WHERE id = {ph}", (tid,))
+    temporada = c.fetchone()[0]
+    c.execute("SELECT id_jugador FROM stats GROUP BY id_jugador ORDER BY COUNT(*) DESC LIMIT 1")
+    jid = c.fetchone()[0]
+    c.execute("SELECT id_rival FROM partidos GROUP BY id_rival ORDER BY COUNT(*) DESC LIMIT 1")
+    rid = c.fetchone()[0]
+    c.execute(f"SELECT MAX(id) FROM partidos WHERE id_torneo = {ph}", (tid,))
+    before = c.fetchone()[0]
+
+    return [
+        ("load_torneos", cf.load_torneos, (), {}),
+        ("load_partidos", cf.load_partidos, (), {}),
+        ("load_partidos[torneo]", cf.load_partidos, (tid,), {}),
+        ("load_partidos_page", cf.load_partidos_page, (), {}),
+        ("load_partidos_page[torneo]", cf.load_partidos_page, (tid,), {"before_id": before}),
+        ("load_partidos_page[temporada]", cf.load_partidos_page, (None, temporada), {}),
+        ("count_partidos[temporada]", cf.count_partidos, (None, temporada), {}),
+        ("load_jugadores", cf.load_jugadores, (), {}),
+        ("load_rivales", cf.load_rivales, (), {}),
+        ("get_player_stats", cf.get_player_stats, (jid,), {}),
+        ("get_player_matches", cf.get_player_matches, (jid,), {}),
+        ("get_player_matches_page", cf.get_player_matches_page, (jid,), {}),
+        ("count_player_matches", cf.count_player_matches, (jid,), {}),
+        ("login_user", cf.login_user, ("bench_inexistente", "x"), {}),
+        ("get_global_stats", cf.get_global_stats, (), {}),
+        ("get_global_stats[torneo]", cf.get_global_stats, (), {"torneo_id": tid}),
+        ("get_global_stats[temporada]", cf.get_global_stats, (), {"temporada": temporada}),
+        ("get_top_stat", cf.get_top_stat, ("goles_marcados",), {}),
+        ("get_top_stat[torneo]", cf.get_top_stat, ("goles_marcados",), {"torneo_id": tid}),
+        ("get_top_stat[temporada]", cf.get_top_stat, ("minutos_jugados",), {"sum_initial": False, "temporada": temporada}),
+        ("get_dt_stats", cf.get_dt_stats, (), {}),
+        ("get_dt_stats[temporada]", cf.get_dt_stats, (), {"temporada": temporada}),
+        ("get_result_distribution", cf.get_result_distribution, (), {}),
+        ("get_recent_form", cf.get_recent_form, (), {}),
+        ("get_recent_form[torneo]", cf.get_recent_form, (), {"torneo_id": tid}),
+        ("get_head_to_head", cf.get_head_to_head, (), {}),
+        ("get_stats_against_rival", cf.get_stats_against_rival, (rid,), {}),
+        ("get_pivot[tecnico,condicion]", cf.get_pivot, (("tecnico", "condicion"),), {}),
+        ("get_pivot[rival|temporada]", cf.get_pivot, (("rival",),), {"temporada": temporada}),
+        ("get_dashboard_snapshot", cf.get_dashboard_snapshot, (), {}),
+        ("get_dashboard_snapshot[torneo]", cf.get_dashboard_snapshot, (), {"torneo_id": tid}),
+        ("get_dashboard_snapshot[temporada]", cf.get_dashboard_snapshot, (), {"temporada": temporada}),
+    ], (tid, jid, rid)
+
+def _timed_runs(func, repeat, setup=None):
+    """Corre `func` `repeat` veces (con `setup()` antes de cada una, sin medirlo) y retorna los segundos de cada corrida."""
+    runs = []
+    for i in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        func(i)
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+def _result(nombre, modo, tipo, runs):
+    ms = sorted(r * 1000 for r in runs)
+    return {
+        "nombre": nombre, "modo": modo, "tipo": tipo, "corridas": len(ms),
+        "mediana_ms": round(statistics.median(ms), 3),
+        "min_ms": round(ms[0], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+def run_benchmark(repeat, progress=print):
+    """
+    Mide lecturas, escrituras y el motor en memoria sobre la base ya preparada.
+    Cada lectura corre sin caché de Streamlit (se limpia antes de cada corrida), en modo
+    'base' y, si el motor en memoria la responde, también en modo 'memoria'.
+    """
+    import streamlit as st
+    import cava_functions as cf
+
+    conn = get_connection()
+    try:
+        readers, (tid, jid, rid) = _reader_calls(conn)
+    finally:
+        close_connection(conn)
+
+    results = []
+
+    # Motor en memoria: carga completa en frío
+    cf.FACT_STORE_ENABLED = True
+    runs = _timed_runs(lambda i: cf.get_fact_store(), repeat,
+                       setup=lambda: (cf._fact_store.clear(), st.cache_data.clear()))
+    results.append(_result("fact_store.load", "memoria", "motor", runs))
+    progress(f"   fact_store.load{'':<27}{results[-1]['mediana_ms']:10.1f} ms")
+
+    for modo, enabled in (("base", False), ("memoria", True)):
+        cf.FACT_STORE_ENABLED = enabled
+        for nombre, func, args, kwargs in readers:
+            if enabled and nombre.split("[")[0] not in STORE_READERS:
+                continue
+            runs = _timed_runs(lambda i: func(*args, **kwargs), repeat, setup=st.cache_data.clear)
+            results.append(_result(nombre, modo, "lectura", runs))
+            progress(f"   {nombre:<34}{modo:<8}{results[-1]['mediana_ms']:10.1f} ms")
+
+    # Escrituras: agregan datos a la base de benchmark (un partido o usuario nuevo por corrida)
+    cf.FACT_STORE_ENABLED = False
+    conn = get_connection()
+    try:
+        c = conn.cursor()
+        ph = get_placeholder(conn)
+        c.execute(f"SELECT id_jugador FROM stats WHERE id_partido = (SELECT MAX(id) FROM partidos WHERE id_torneo = {ph})", (tid,))
+        plantel = [row[0] for row in c.fetchall()]
+    finally:
+        close_connection(conn)
+    df_stats = pd.DataFrame({
+        "id": plantel,
+        "minutos": [90 if i < TITULARES else 20 for i in range(len(plantel))],
+        "goles": [1 if i == 9 else 0 for i in range(len(plantel))],
+        "goles_recibidos": [1 if i == 0 else 0 for i in range(len(plantel))],
+        "amarillas": [1 if i == 3 else 0 for i in range(len(plantel))],
+        "rojas": [0] * len(plantel),
+    })
+    match = {"id_torneo": tid, "id_rival": rid, "fecha": "F99", "condicion": "L", "gf": 2, "gc": 1}
+
+    def save(i):
+        ok, msg = cf.save_match(match, df_stats)
+        if not ok:
+            raise RuntimeError(msg)
+    results.append(_result("save_match", "base", "escritura", _timed_runs(save, repeat)))
+    progress(f"   {'save_match':<34}{'base':<8}{results[-1]['mediana_ms']:10.1f} ms")
+
+    prefix = f"bench{time.time_ns()}"
+    def create(i):
+        ok, msg = cf.create_user(f"{prefix}_{i}", "x", "Benchmark")
+        if not ok:
+            raise RuntimeError(msg)
+    results.append(_result("create_user", "base", "escritura", _timed_runs(create, repeat)))
+    progress(f"   {'create_user':<34}{'base':<8}{results[-1]['mediana_ms']:10.1f} ms")
+
+    # Motor en memoria: refresco incremental después de guardar un partido
+    cf.FACT_STORE_ENABLED = True
+    cf.get_fact_store()
+    def after_save():
+        save(0)
+        st.cache_data.clear()
+    runs = _timed_runs(lambda i: cf.get_fact_store(), repeat, setup=after_save)
+    results.append(_result("fact_store.sync", "memoria", "motor", runs))
+    progress(f"   fact_store.sync{'':<27}{results[-1]['mediana_ms']:10.1f} ms")
+    return results
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    Compara las medianas con las de `baseline` (la salida JSON de una corrida anterior).
+    Retorna la lista de regresiones: (nombre, modo, mediana anterior, mediana actual).
+    """
+    previous = {(r["nombre"], r["modo"]): r["mediana_ms"] for r in baseline["resultados"]}
+    regressions = []
+    for r in results:
+        before = previous.get((r["nombre"], r["modo"]))
+        if before is None:
+            continue
+        now = r["mediana_ms"]
+        if now > before * threshold and now - before > min_delta_ms:
+            regressions.append((r["nombre"], r["modo"], before, now))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de cava_functions sobre datos sintéticos.")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="tamaño predefinido de los datos")
+    parser.add_argument("--seasons", type=int, help="temporadas (dos torneos cada una)")
+    parser.add_argument("--players", type=int, help="jugadores")
+    parser.add_argument("--matches", type=int, help="partidos en total")
+    parser.add_argument("--stats-per-match", type=int, help="jugadores con stats en cada partido")
+    parser.add_argument("--seed", type=int, default=0, help="semilla de los datos")
+    parser.add_argument("--repeat", type=int, default=5, help="corridas por medición")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "cava_bench.db"),
+                        help="archivo SQLite de benchmark (sin [supabase] en los secrets)")
+    parser.add_argument("--reuse", action="store_true", help="reutilizar la base si ya tiene los mismos datos (las escrituras medidas le suman partidos)")
+    parser.add_argument("--output", help="archivo donde guardar los resultados en JSON")
+    parser.add_argument("--baseline", help="resultados JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args(argv)
+
+    params = dict(SCALES[args.scale])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    params["seed"] = args.seed
+
+    # Sin servidor de Streamlit la caché avisa en cada llamada que no hay contexto
+    logging.disable(logging.WARNING)
+
+    print(f"Preparando datos: {params}")
+    backend, counts, generation = prepare_database(params, args.db, reuse=args.reuse)
+    print(f"Backend: {backend} | filas: {counts} | generación: {generation:.1f}s")
+
+    results = run_benchmark(args.repeat)
+    report = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "backend": backend,
+        "parametros": params,
+        "filas": counts,
+        "generacion_s": round(generation, 3),
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "resultados": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("parametros") != params or baseline.get("backend") != backend:
+            print("⚠️ La corrida anterior usó otros datos o backend: la comparación es orientativa.")
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            for nombre, modo, before, now in regressions:
+                print(f"❌ {nombre} ({modo}): {before:.1f} ms -> {now:.1f} ms")
+            return 1
+        print("✅ Sin regresiones respecto de la corrida anterior.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
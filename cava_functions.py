@@ -1,29 +1,142 @@
+import os
 import sqlite3
+import functools
+import inspect
+from dataclasses import dataclass
 import pandas as pd
 import streamlit as st
-from db_config import get_connection, get_placeholder, close_connection
+from db_config import db_connection, get_placeholder, bump_data_versions
+from fact_store import FactStore, STAT_COLUMNS, INITIAL_COLUMNS
+
+# ==============================================================================
+# VERSIONES DE DATOS (INVALIDACIÓN SELECTIVA DE LA CACHÉ)
+# ==============================================================================
+
+# Segundos que otra instancia de la app puede tardar en ver una escritura ajena
+VERSIONS_TTL = 5
+
+@st.cache_data(ttl=VERSIONS_TTL, show_spinner=False)
+def load_data_versions():
+    """
+    Retorna {alcance: versión} de la tabla data_versions (vacío si todavía no existe).
+    """
+    with db_connection(readonly=True) as conn:
+        if not conn: return {}
+        try:
+            c = conn.cursor()
+            c.execute("SELECT scope, version FROM data_versions")
+            return dict(c.fetchall())
+        except Exception:
+            return {}
+
+def versioned_cache(depends_on, ttl=3600):
+    """
+    Igual que st.cache_data, pero la clave de caché incluye la versión de los datos
+    de los que depende la función. `depends_on` recibe los argumentos de la llamada
+    (dict nombre -> valor) y retorna el alcance, o la lista de alcances, de data_versions
+    que afectan el resultado; 'global' (lo incrementa el ETL) se agrega siempre.
+    Una escritura que incrementa uno de esos alcances fuerza a recalcular solo las
+    entradas que dependen de él; el resto de la caché sigue sirviendo.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cached(data_version, *args, **kwargs):
+            return func(*args, **kwargs)
+        # st.cache_data identifica cada función por su nombre: cada lectura tiene su propia caché
+        cached.__module__ = func.__module__
+        cached.__qualname__ = func.__qualname__
+        cached = st.cache_data(ttl=ttl, show_spinner=False)(cached)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            scopes = depends_on(bound.arguments)
+            if isinstance(scopes, str):
+                scopes = [scopes]
+            versions = load_data_versions()
+            data_version = tuple(versions.get(scope, 0) for scope in ["global", *scopes])
+            return cached(data_version, *bound.args, **bound.kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+def _filter_scope(args):
+    """
+    Alcance de una lectura filtrada por torneo y/o temporada: el torneo si lo hay
+    (sus partidos ya están dentro de la temporada), si no la temporada, si no todos los partidos.
+    """
+    torneo_id = args.get('torneo_id')
+    temporada = args.get('temporada')
+    if torneo_id and torneo_id != "Todos":
+        return f"torneo:{torneo_id}"
+    if temporada and temporada != "Todas":
+        return f"temporada:{temporada}"
+    return "partidos"
+
+# ==============================================================================
+# MOTOR EN MEMORIA (LECTURAS DEL DASHBOARD SIN IR A LA BASE)
+# ==============================================================================
+
+def _fact_store_setting():
+    """
+    True si el motor en memoria está habilitado: variable de entorno CAVA_FACT_STORE o,
+    si no está, `fact_store` en los secrets (ej. fact_store = true). Por defecto apagado.
+    """
+    value = os.environ.get("CAVA_FACT_STORE")
+    if value is None:
+        try:
+            value = st.secrets.get("fact_store")
+        except Exception:
+            # Sin archivo secrets.toml
+            value = None
+    return str(value).strip().lower() in ("1", "true", "yes", "si", "sí")
+
+# Con False todas las lecturas van a la base (ej. para revisar sus planes de ejecución)
+FACT_STORE_ENABLED = _fact_store_setting()
+
+@st.cache_resource(show_spinner=False)
+def _fact_store():
+    return FactStore()
+
+def get_fact_store():
+    """
+    Retorna el FactData (fact_store) al día con data_versions, o None si está deshabilitado
+    o no se pudo cargar: en ese caso las lecturas del dashboard consultan la base.
+    """
+    if not FACT_STORE_ENABLED: return None
+    try:
+        return _fact_store().sync(load_data_versions())
+    except Exception as e:
+        print(f"⚠️ Error cargando el motor en memoria: {e}. Consultando la base.")
+        return None
+
+# ==============================================================================
+# LECTURAS
+# ==============================================================================
+
+# Filas por página de los listados paginados (partidos y log de partidos de un jugador)
+PAGE_SIZE = 50
 
 def load_torneos():
     """
     Carga la lista completa de torneos registrados en la base de datos.
     Retorna un DataFrame de Pandas.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         return pd.read_sql("SELECT * FROM torneos ORDER BY temporada DESC, nombre", conn)
-    finally:
-        close_connection(conn)
 
-@st.cache_data(ttl=600, show_spinner=False)
+@versioned_cache(_filter_scope)
 def load_partidos(torneo_id=None):
     """
     Carga los partidos de la base de datos, opcionalmente filtrados por torneo.
     Retorna los datos unidos con los nombres de los rivales y torneos.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         ph = get_placeholder(conn)
         query = """
             SELECT p.*, r.nombre as rival_nombre, t.nombre as torneo_nombre 
@@ -33,22 +146,56 @@ def load_partidos(torneo_id=None):
         """
         params = []
         if torneo_id:
-            query += f" WHERE p.id_torneo = {torneo_id}" # ID numérico, seguro
+            query += f" WHERE p.id_torneo = {ph}"
+            params.append(torneo_id)
         query += " ORDER BY p.id DESC"
-        
-        # Para read_sql con psycopg2, a veces es mejor pasar params vacíos si no se usan
-        return pd.read_sql(query, conn)
-    finally:
-        close_connection(conn)
+        return pd.read_sql(query, conn, params=params)
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@versioned_cache(_filter_scope)
+def load_partidos_page(torneo_id=None, temporada=None, before_id=None, page_size=PAGE_SIZE):
+    """
+    Una página del listado de partidos filtrado por torneo y/o temporada, del más nuevo
+    al más viejo: los `page_size` partidos de id menor a `before_id` (None = desde el último).
+    Paginación por clave (id), así pedir más páginas no relee las anteriores.
+    Retorna (df, cursor de la página siguiente o None si no hay más).
+    """
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame(), None
+        ph = get_placeholder(conn)
+        where, params, _ = _match_filters(ph, torneo_id, temporada)
+        if before_id is not None:
+            where += f" AND p.id < {ph}"
+            params.append(before_id)
+        # Se pide una fila de más para saber si hay otra página
+        df = pd.read_sql(f"""
+            SELECT p.*, r.nombre as rival_nombre, t.nombre as torneo_nombre
+            FROM partidos p
+            JOIN rivales r ON p.id_rival = r.id
+            JOIN torneos t ON p.id_torneo = t.id
+            WHERE 1=1 {where}
+            {_newest_first(torneo_id, temporada)}
+            LIMIT {ph}
+        """, conn, params=params + [page_size + 1])
+    return _page(df, "id", page_size)
+
+def count_partidos(torneo_id=None, temporada=None):
+    """Cantidad de partidos del listado filtrado (sale del récord cacheado de get_global_stats)."""
+    return get_global_stats(torneo_id, temporada).get('pj', 0)
+
+def _page(df, cursor_col, page_size):
+    """Recorta una consulta de `page_size` + 1 filas y retorna (página, cursor siguiente o None)."""
+    if len(df) <= page_size:
+        return df, None
+    df = df.iloc[:page_size]
+    return df, int(df[cursor_col].iloc[-1])
+
+@versioned_cache(lambda args: "jugadores")
 def load_jugadores():
     """
     Carga la ficha de todos los jugadores unidos con su nombre de posición.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         query = """
             SELECT j.*, p.nombre as posicion_nombre 
             FROM jugadores j
@@ -56,72 +203,44 @@ def load_jugadores():
             ORDER BY j.apellido, j.nombre
         """
         return pd.read_sql(query, conn)
-    finally:
-        close_connection(conn)
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@versioned_cache(lambda args: "rivales")
 def load_rivales():
     """
     Retorna la lista de todos los rivales únicos.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         return pd.read_sql("SELECT * FROM rivales ORDER BY nombre", conn)
-    finally:
-        close_connection(conn)
 
-@st.cache_data(ttl=60, show_spinner=False)
+@versioned_cache(lambda args: f"jugador:{args['jugador_id']}")
 def get_player_stats(jugador_id):
     """
-    Calcula las estadísticas totales de un jugador sumando detalle y estático.
+    Retorna las estadísticas totales de un jugador (saldo inicial + detalle)
+    leyendo su fila de la tabla materializada player_totals.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         ph = get_placeholder(conn)
-        # Obtenemos los saldos iniciales del jugador
-        df_j = pd.read_sql(f"SELECT * FROM jugadores WHERE id = {ph}", conn, params=(jugador_id,))
-        if df_j.empty: return pd.DataFrame()
-        j = df_j.iloc[0]
-
-        # Sumamos el rendimiento detallado de la tabla stats
         query = f"""
-            SELECT COUNT(*) as pj, 
-                   SUM(CASE WHEN es_titular THEN 1 ELSE 0 END) as titular,
-                   SUM(minutos_jugados) as minutos,
-                   SUM(goles_marcados) as goles,
-                   SUM(goles_recibidos) as recibidos,
-                   SUM(amarillas) as amarillas,
-                   SUM(rojas) as rojas
-            FROM stats
+            SELECT pj + pj_inicial as pj,
+                   titular + titular_inicial as titular,
+                   minutos_jugados as minutos,
+                   goles_marcados + goles_marcados_inicial as goles,
+                   goles_recibidos + goles_recibidos_inicial as recibidos,
+                   amarillas + amarillas_inicial as amarillas,
+                   rojas + rojas_inicial as rojas
+            FROM player_totals
             WHERE id_jugador = {ph}
         """
-        df_stats = pd.read_sql(query, conn, params=(jugador_id,))
-        
-        # Combinamos historial con detalle actual
-        res = df_stats.iloc[0].to_dict()
-        def clean_val(val): return val if val is not None else 0
-        
-        res['pj'] = clean_val(res.get('pj')) + j['pj_inicial']
-        res['titular'] = clean_val(res.get('titular')) + j['titular_inicial']
-        res['goles'] = clean_val(res.get('goles')) + j['goles_marcados_inicial']
-        res['recibidos'] = clean_val(res.get('recibidos')) + j['goles_recibidos_inicial']
-        res['amarillas'] = clean_val(res.get('amarillas')) + j['amarillas_inicial']
-        res['rojas'] = clean_val(res.get('rojas')) + j['rojas_inicial']
-        res['minutos'] = clean_val(res.get('minutos'))
-        
-        return pd.DataFrame([res])
-    finally:
-        close_connection(conn)
+        return pd.read_sql(query, conn, params=(jugador_id,))
 
 def get_player_matches(jugador_id):
     """
     Retorna la lista detallada de todos los partidos donde participó un jugador.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         ph = get_placeholder(conn)
         query = f"""
             SELECT p.nro_fecha, r.nombre as rival, t.nombre as torneo,
@@ -135,16 +254,54 @@ def get_player_matches(jugador_id):
             ORDER BY p.id DESC
         """
         return pd.read_sql(query, conn, params=(jugador_id,))
-    finally:
-        close_connection(conn)
+
+@versioned_cache(lambda args: f"jugador:{args['jugador_id']}")
+def get_player_matches_page(jugador_id, before_id=None, page_size=PAGE_SIZE):
+    """
+    Una página del log de partidos de un jugador (mismas columnas que get_player_matches
+    más id_partido), del más nuevo al más viejo: los `page_size` partidos de id menor
+    a `before_id` (None = desde el último). Recorre el índice de stats por jugador.
+    Retorna (df, cursor de la página siguiente o None si no hay más).
+    """
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame(), None
+        ph = get_placeholder(conn)
+        where = f"s.id_jugador = {ph}"
+        params = [jugador_id]
+        if before_id is not None:
+            where += f" AND s.id_partido < {ph}"
+            params.append(before_id)
+        df = pd.read_sql(f"""
+            SELECT s.id_partido, p.nro_fecha, r.nombre as rival, t.nombre as torneo,
+                   s.minutos_jugados, s.es_titular, s.goles_marcados as goles,
+                   s.goles_recibidos, s.amarillas, s.rojas
+            FROM stats s
+            JOIN partidos p ON s.id_partido = p.id
+            JOIN rivales r ON p.id_rival = r.id
+            JOIN torneos t ON p.id_torneo = t.id
+            WHERE {where}
+            ORDER BY s.id_partido DESC
+            LIMIT {ph}
+        """, conn, params=params + [page_size + 1])
+    return _page(df, "id_partido", page_size)
+
+@versioned_cache(lambda args: f"jugador:{args['jugador_id']}")
+def count_player_matches(jugador_id):
+    """Cantidad de partidos del log de un jugador (leída de player_totals, sin contar stats)."""
+    with db_connection(readonly=True) as conn:
+        if not conn: return 0
+        ph = get_placeholder(conn)
+        c = conn.cursor()
+        c.execute(f"SELECT pj FROM player_totals WHERE id_jugador = {ph}", (jugador_id,))
+        row = c.fetchone()
+        return int(row[0] or 0) if row else 0
 
 def login_user(username, password):
     """
     Verifica las credenciales de un usuario.
     """
-    conn = get_connection()
-    if not conn: return False, "Error de conexión"
-    try:
+    with db_connection(readonly=True) as conn:
+        if not conn: return False, "Error de conexión"
         ph = get_placeholder(conn)
         c = conn.cursor()
         c.execute(f"SELECT * FROM usuarios WHERE username = {ph} AND password = {ph}", (username, password))
@@ -156,95 +313,134 @@ def login_user(username, password):
             'rol': user[3],
             'nombre': user[4]
         }
-    finally:
-        close_connection(conn)
 
 # ========================================
 # FUNCIONES DE ANALÍTICA PARA EL DASHBOARD
 # ========================================
 
-@st.cache_data(ttl=60, show_spinner=False)
+def _match_record(conn, where="", params=(), join_torneos=False):
+    """
+    Récord agregado (PJ/PG/PE/PP/GF/GC) de los partidos que cumplen `where`,
+    resuelto en una sola fila por la base. Retorna un dict de enteros.
+    `where` puede referenciar p.* (partidos) y, con join_torneos=True, t.* (torneos).
+    """
+    join = "JOIN torneos t ON p.id_torneo = t.id" if join_torneos else ""
+    query = f"""
+        SELECT COUNT(*),
+               COALESCE(SUM(CASE WHEN p.goles_favor > p.goles_contra THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN p.goles_favor = p.goles_contra THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN p.goles_favor < p.goles_contra THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(p.goles_favor), 0),
+               COALESCE(SUM(p.goles_contra), 0)
+        FROM partidos p
+        {join}
+        WHERE 1=1 {where}
+    """
+    c = conn.cursor()
+    c.execute(query, tuple(params))
+    row = c.fetchone()
+    return dict(zip(["pj", "pg", "pe", "pp", "gf", "gc"], (int(v or 0) for v in row)))
+
+@versioned_cache(_filter_scope)
 def get_global_stats(torneo_id=None, temporada=None):
     """
     Calcula el récord global (G/E/P) filtrado.
     """
-    conn = get_connection()
-    if not conn: return {}
-    try:
+    store = get_fact_store()
+    if store is not None:
+        return store.match_record(torneo_id, temporada)
+
+    with db_connection(readonly=True) as conn:
+        if not conn: return {}
         ph = get_placeholder(conn)
-        query = "SELECT goles_favor, goles_contra FROM partidos p JOIN torneos t ON p.id_torneo = t.id WHERE 1=1"
+        where = ""
         params = []
         if torneo_id and torneo_id != "Todos":
-            query += f" AND t.id = {ph}"
+            where += f" AND p.id_torneo = {ph}"
             params.append(torneo_id)
         if temporada and temporada != "Todas":
-            query += f" AND t.temporada = {ph}"
+            where += f" AND t.temporada = {ph}"
             params.append(temporada)
             
-        df = pd.read_sql(query, conn, params=params)
-        if df.empty: return {"pj":0, "pg":0, "pe":0, "pp":0, "gf":0, "gc":0}
-        
-        pj = len(df)
-        pg = len(df[df['goles_favor'] > df['goles_contra']])
-        pp = len(df[df['goles_favor'] < df['goles_contra']])
-        pe = len(df[df['goles_favor'] == df['goles_contra']])
-        gf = df['goles_favor'].sum()
-        gc = df['goles_contra'].sum()
-        
-        return {"pj":pj, "pg":pg, "pe":pe, "pp":pp, "gf":gf, "gc":gc}
-    finally:
-        close_connection(conn)
+        # Solo unimos torneos cuando hace falta filtrar por temporada
+        return _match_record(conn, where, params, join_torneos=bool(temporada and temporada != "Todas"))
 
-@st.cache_data(ttl=60, show_spinner=False)
+@versioned_cache(_filter_scope)
 def get_top_stat(stat_col="goles_marcados", limit=10, sum_initial=True, torneo_id=None, temporada=None):
     """
     Retorna el ranking de los mejores jugadores filtrado.
+    `stat_col` tiene que ser una de las columnas acumuladas (STAT_COLUMNS).
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    if stat_col not in STAT_COLUMNS:
+        raise ValueError(f"Columna de ranking inválida: {stat_col}")
+
+    use_initial = sum_initial and (not torneo_id or torneo_id == "Todos") and (not temporada or temporada == "Todas")
+    use_initial = use_initial and stat_col in INITIAL_COLUMNS
+
+    store = get_fact_store()
+    if store is not None:
+        return store.top_players(stat_col, limit, torneo_id, temporada, initial=use_initial)
+
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         ph = get_placeholder(conn)
-        where_clause = "WHERE 1=1"
-        params = []
-        if torneo_id and torneo_id != "Todos":
-            where_clause += f" AND p.id_torneo = {ph}"
-            params.append(torneo_id)
-        if temporada and temporada != "Todas":
-            where_clause += f" AND t.temporada = {ph}"
-            params.append(temporada)
-            
-        join_clause = "LEFT JOIN stats s ON j.id = s.id_jugador LEFT JOIN partidos p ON s.id_partido = p.id LEFT JOIN torneos t ON p.id_torneo = t.id"
-        
-        use_initial = sum_initial and (not torneo_id or torneo_id == "Todos") and (not temporada or temporada == "Todas")
-        initial_col = f"j.{stat_col}_inicial" if stat_col in ["goles_marcados", "goles_recibidos"] and use_initial else "0"
-        
-        # Postgres puede tener problemas con IFNULL, usar COALESCE es estándar SQL
-        null_func = "COALESCE" 
-        
+        where, params = _rollup_filters(ph, torneo_id, temporada)
+
+        if not params:
+            # Sin filtros el ranking sale directo de los totales materializados
+            total = f"pt.{stat_col}"
+            if use_initial:
+                total += f" + pt.{stat_col}_inicial"
+            query = f"""
+                SELECT j.nombre || ' ' || j.apellido as "Jugador", {total} as "Total"
+                FROM player_totals pt
+                JOIN jugadores j ON j.id = pt.id_jugador
+                WHERE {total} > 0
+                ORDER BY {total} DESC, pt.id_jugador
+                LIMIT {ph}
+            """
+            return pd.read_sql(query, conn, params=(limit,))
+
+        # Con filtros: acumulados por torneo (a lo sumo una fila por jugador y torneo filtrado)
         query = f"""
-            SELECT j.nombre || ' ' || j.apellido as "Jugador",
-                   {null_func}(SUM(s.{stat_col}), 0) + {null_func}({initial_col}, 0) as "Total"
-            FROM jugadores j
-            {join_clause}
-            {where_clause}
-            GROUP BY j.id
-            HAVING {null_func}(SUM(s.{stat_col}), 0) + {null_func}({initial_col}, 0) > 0
-            ORDER BY "Total" DESC
+            SELECT j.nombre || ' ' || j.apellido as "Jugador", SUM(r.{stat_col}) as "Total"
+            FROM player_rollup r
+            JOIN jugadores j ON j.id = r.id_jugador
+            WHERE 1=1 {where}
+            GROUP BY j.id, j.nombre, j.apellido
+            HAVING SUM(r.{stat_col}) > 0
+            ORDER BY "Total" DESC, j.id
             LIMIT {ph}
         """
         params.append(limit)
         return pd.read_sql(query, conn, params=params)
-    finally:
-        close_connection(conn)
 
-@st.cache_data(ttl=60, show_spinner=False)
+def _rollup_filters(ph, torneo_id=None, temporada=None):
+    """
+    Arma el filtro por torneo/temporada sobre player_rollup r (sin JOIN: la temporada está en la tabla).
+    Retorna (where, params).
+    """
+    where = ""
+    params = []
+    if torneo_id and torneo_id != "Todos":
+        where += f" AND r.id_torneo = {ph}"
+        params.append(torneo_id)
+    if temporada and temporada != "Todas":
+        where += f" AND r.temporada = {ph}"
+        params.append(temporada)
+    return where, params
+
+@versioned_cache(_filter_scope)
 def get_dt_stats(torneo_id=None, temporada=None):
     """
     Calcula la efectividad de los DTs.
     """
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    try:
+    store = get_fact_store()
+    if store is not None:
+        return store.dt_stats(torneo_id, temporada)
+
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         ph = get_placeholder(conn)
         where = "WHERE 1=1"
         params = []
@@ -272,21 +468,25 @@ def get_dt_stats(torneo_id=None, temporada=None):
             ORDER BY "PJ" DESC
         """
         df = pd.read_sql(query, conn, params=params)
-        
-        # Postgres puede retornar Decimal/BigInt como object, forzamos numérico
-        cols_to_numeric = ['PJ', 'PG', 'PE', 'PP', 'GF', 'GC']
-        for col in cols_to_numeric:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        df['PTS'] = (df['PG'] * 3) + (df['PE'] * 1)
-        df['Efectividad'] = (df['PTS'] / (df['PJ'] * 3) * 100).round(1)
-        
-        return df.sort_values(by='Efectividad', ascending=False)
-    finally:
-        close_connection(conn)
+        return _dt_effectiveness(df)
+
+def _dt_effectiveness(df):
+    """Agrega puntos y efectividad a una tabla de récords por técnico y la ordena."""
+    # Postgres puede retornar Decimal/BigInt como object, forzamos numérico
+    cols_to_numeric = ['PJ', 'PG', 'PE', 'PP', 'GF', 'GC']
+    for col in cols_to_numeric:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    
+    df['PTS'] = (df['PG'] * 3) + (df['PE'] * 1)
+    df['Efectividad'] = (df['PTS'] / (df['PJ'] * 3) * 100).round(1)
+    
+    return df.sort_values(by='Efectividad', ascending=False)
 
 def get_result_distribution(torneo_id=None, temporada=None):
+    """
+    Distribución G/E/P para el gráfico de torta (reutiliza el agregado de get_global_stats).
+    """
     stats = get_global_stats(torneo_id, temporada)
     if not stats: return pd.DataFrame()
     return pd.DataFrame({
@@ -294,10 +494,14 @@ def get_result_distribution(torneo_id=None, temporada=None):
         'Cantidad': [stats['pg'], stats['pe'], stats['pp']]
     })
 
-@st.cache_data(ttl=60, show_spinner=False)
+@versioned_cache(_filter_scope)
 def get_recent_form(limit=5, torneo_id=None, temporada=None):
-    conn = get_connection()
-    try:
+    store = get_fact_store()
+    if store is not None:
+        return store.recent_form(limit, torneo_id, temporada)
+
+    with db_connection(readonly=True) as conn:
+        if not conn: return pd.DataFrame()
         ph = get_placeholder(conn)
         where = "WHERE 1=1"
         params = []
@@ -315,73 +519,369 @@ def get_recent_form(limit=5, torneo_id=None, temporada=None):
             JOIN rivales r ON p.id_rival = r.id
             JOIN torneos t ON p.id_torneo = t.id
             {where}
-            ORDER BY p.id DESC
+            {_newest_first(torneo_id, temporada)}
             LIMIT {ph}
         """
         params.append(limit)
         df = pd.read_sql(query, conn, params=params)
+        return _form_icons(df)
+
+def _form_icons(df):
+    """Agrega el ícono de resultado a los últimos partidos y los ordena por fecha."""
+    def get_icon(row):
+        if row['goles_favor'] > row['goles_contra']: return "✅" 
+        elif row['goles_favor'] == row['goles_contra']: return "➖" 
+        else: return "❌" 
         
-        def get_icon(row):
-            if row['goles_favor'] > row['goles_contra']: return "✅" 
-            elif row['goles_favor'] == row['goles_contra']: return "➖" 
-            else: return "❌" 
-            
-        if not df.empty:
-            df['Resultado'] = df.apply(get_icon, axis=1)
-            df = df.sort_values(by='nro_fecha') 
-        return df
-    finally:
-        close_connection(conn)
-
-@st.cache_data(ttl=600, show_spinner=False)
+    if not df.empty:
+        df['Resultado'] = df.apply(get_icon, axis=1)
+        df = df.sort_values(by='nro_fecha') 
+    return df
+
+H2H_COLS = ['PJ', 'PG', 'PE', 'PP', 'GF', 'GC', 'PJ_L', 'PG_L', 'PE_L', 'PP_L', 'PJ_V', 'PG_V', 'PE_V', 'PP_V']
+
+@versioned_cache(lambda args: "partidos")
+def get_head_to_head():
+    """
+    Historial contra todos los rivales en una sola pasada agrupada sobre partidos:
+    PJ/PG/PE/PP/GF/GC, el mismo récord separado en Local (_L) y Visitante (_V)
+    y el último enfrentamiento (el partido de mayor id contra cada rival).
+    Incluye a los rivales sin partidos (con ceros). Ordenado por nombre del rival.
+    """
+    store = get_fact_store()
+    if store is not None:
+        return store.head_to_head()
+
+    df = _head_to_head_sql()
+    if df is None: return pd.DataFrame()
+
+    # Postgres puede retornar Decimal/BigInt como object, forzamos numérico
+    df[H2H_COLS] = df[H2H_COLS].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
+    df['Efectividad'] = ((df['PG'] * 3 + df['PE']) / (df['PJ'] * 3).where(df['PJ'] > 0) * 100).round(1).fillna(0)
+
+    def last_meeting(row):
+        if pd.isna(row['ultimo_id']): return ""
+        return f"{row['ultimo_torneo']} {row['ultima_fecha']} ({int(row['ultimo_gf'])}-{int(row['ultimo_gc'])})"
+
+    df['Último'] = df.apply(last_meeting, axis=1) if not df.empty else ""
+    return df
+
+def _head_to_head_sql():
+    """Tabla de get_head_to_head resuelta por la base (sin Efectividad ni Último)."""
+    with db_connection(readonly=True) as conn:
+        if not conn: return None
+        return pd.read_sql("""
+            SELECT h.*, u.nro_fecha as ultima_fecha, tu.nombre as ultimo_torneo,
+                   u.goles_favor as ultimo_gf, u.goles_contra as ultimo_gc
+            FROM (
+                SELECT r.id as id_rival, r.nombre as "Rival",
+                       COUNT(p.id) as "PJ",
+                       SUM(CASE WHEN p.goles_favor > p.goles_contra THEN 1 ELSE 0 END) as "PG",
+                       SUM(CASE WHEN p.goles_favor = p.goles_contra THEN 1 ELSE 0 END) as "PE",
+                       SUM(CASE WHEN p.goles_favor < p.goles_contra THEN 1 ELSE 0 END) as "PP",
+                       SUM(p.goles_favor) as "GF",
+                       SUM(p.goles_contra) as "GC",
+                       SUM(CASE WHEN p.condicion = 'L' THEN 1 ELSE 0 END) as "PJ_L",
+                       SUM(CASE WHEN p.condicion = 'L' AND p.goles_favor > p.goles_contra THEN 1 ELSE 0 END) as "PG_L",
+                       SUM(CASE WHEN p.condicion = 'L' AND p.goles_favor = p.goles_contra THEN 1 ELSE 0 END) as "PE_L",
+                       SUM(CASE WHEN p.condicion = 'L' AND p.goles_favor < p.goles_contra THEN 1 ELSE 0 END) as "PP_L",
+                       SUM(CASE WHEN p.condicion = 'V' THEN 1 ELSE 0 END) as "PJ_V",
+                       SUM(CASE WHEN p.condicion = 'V' AND p.goles_favor > p.goles_contra THEN 1 ELSE 0 END) as "PG_V",
+                       SUM(CASE WHEN p.condicion = 'V' AND p.goles_favor = p.goles_contra THEN 1 ELSE 0 END) as "PE_V",
+                       SUM(CASE WHEN p.condicion = 'V' AND p.goles_favor < p.goles_contra THEN 1 ELSE 0 END) as "PP_V",
+                       MAX(p.id) as ultimo_id
+                FROM rivales r
+                LEFT JOIN partidos p ON p.id_rival = r.id
+                GROUP BY r.id, r.nombre
+            ) h
+            LEFT JOIN partidos u ON u.id = h.ultimo_id
+            LEFT JOIN torneos tu ON tu.id = u.id_torneo
+            ORDER BY h."Rival"
+        """, conn)
+
 def get_stats_against_rival(rival_id):
-    conn = get_connection()
-    if not conn: return {}
-    try:
+    """Récord contra un rival (pj, pg, pe, pp, gf, gc), leído de la tabla cacheada get_head_to_head()."""
+    df = get_head_to_head()
+    if df.empty: return {}
+    row = df[df['id_rival'] == rival_id]
+    if row.empty:
+        return {k: 0 for k in ['pj', 'pg', 'pe', 'pp', 'gf', 'gc']}
+    return {k.lower(): int(row[k].iloc[0]) for k in ['PJ', 'PG', 'PE', 'PP', 'GF', 'GC']}
+
+# ==============================================================================
+# PIVOT: RÉCORD AGRUPADO POR CUALQUIER COMBINACIÓN DE DIMENSIONES
+# ==============================================================================
+
+TORNEOS_JOIN = "JOIN torneos t ON p.id_torneo = t.id"
+
+# Dimensiones de get_pivot: nombre -> (columna del resultado, clave de agrupación, etiqueta, JOIN que necesita)
+PIVOT_DIMENSIONS = {
+    "tecnico": ("Tecnico", "p.id_tecnico", "tc.nombre", "LEFT JOIN tecnicos tc ON tc.id = p.id_tecnico"),
+    "rival": ("Rival", "p.id_rival", "r.nombre", "JOIN rivales r ON r.id = p.id_rival"),
+    "arbitro": ("Arbitro", "p.id_arbitro", "a.nombre", "LEFT JOIN arbitros a ON a.id = p.id_arbitro"),
+    "torneo": ("Torneo", "p.id_torneo", "t.nombre", TORNEOS_JOIN),
+    "temporada": ("Temporada", "t.temporada", "t.temporada", TORNEOS_JOIN),
+    "condicion": ("Condicion", "p.condicion", "p.condicion", ""),
+}
+
+PIVOT_MEASURES = ['PJ', 'PG', 'PE', 'PP', 'GF', 'GC']
+
+@versioned_cache(_filter_scope)
+def get_pivot(dimensions=(), torneo_id=None, temporada=None):
+    """
+    Récord (PJ/PG/PE/PP/GF/GC, PTS y Efectividad) de los partidos filtrados agrupado por
+    cualquier combinación de PIVOT_DIMENSIONS, ej. get_pivot(("arbitro", "condicion")).
+    Una columna por dimensión (None para los partidos sin DT/árbitro) y una fila por grupo
+    con partidos, ordenado por las dimensiones. Sin dimensiones: una fila con el récord total.
+    Se cachea por combinación de dimensiones y filtros.
+    """
+    dimensions = tuple(dimensions)
+    unknown = [d for d in dimensions if d not in PIVOT_DIMENSIONS]
+    if unknown or len(set(dimensions)) != len(dimensions):
+        raise ValueError(f"Dimensiones de pivot inválidas: {dimensions}")
+
+    store = get_fact_store()
+    if store is not None:
+        return store.pivot(dimensions, torneo_id, temporada).rename(
+            columns={d: PIVOT_DIMENSIONS[d][0] for d in dimensions})
+
+    df = _pivot_sql(dimensions, torneo_id, temporada)
+    if df is None: return pd.DataFrame()
+
+    columns = {PIVOT_DIMENSIONS[d][0]: df[d] for d in dimensions}
+    # Postgres puede retornar Decimal como object, forzamos enteros
+    columns.update({col: df[col].astype(int) for col in PIVOT_MEASURES})
+    columns['PTS'] = columns['PG'] * 3 + columns['PE']
+    columns['Efectividad'] = (columns['PTS'] / (columns['PJ'] * 3).where(columns['PJ'] > 0) * 100).round(1).fillna(0)
+    df = pd.DataFrame(columns)
+    if dimensions:
+        df = df.sort_values([PIVOT_DIMENSIONS[d][0] for d in dimensions], na_position='first', kind='stable')
+    return df.reset_index(drop=True)
+
+def _pivot_sql(dimensions, torneo_id, temporada):
+    """Tabla de get_pivot resuelta por la base en una sola consulta agrupada (sin PTS ni Efectividad)."""
+    with db_connection(readonly=True) as conn:
+        if not conn: return None
         ph = get_placeholder(conn)
-        query = f"SELECT goles_favor, goles_contra FROM partidos WHERE id_rival = {ph}"
-        df = pd.read_sql(query, conn, params=(rival_id,))
-        
-        if df.empty: return {"pj":0, "pg":0, "pe":0, "pp":0, "gf":0, "gc":0}
-        
-        return {
-            "pj": len(df),
-            "pg": len(df[df['goles_favor'] > df['goles_contra']]),
-            "pe": len(df[df['goles_favor'] == df['goles_contra']]),
-            "pp": len(df[df['goles_favor'] < df['goles_contra']]),
-            "gf": df['goles_favor'].sum(),
-            "gc": df['goles_contra'].sum()
-        }
-    finally:
-        close_connection(conn)
+        where, params, join_torneos = _match_filters(ph, torneo_id, temporada)
+
+        joins = [TORNEOS_JOIN] if join_torneos else []
+        for d in dimensions:
+            join = PIVOT_DIMENSIONS[d][3]
+            if join and join not in joins:
+                joins.append(join)
+        labels = "".join(f'{PIVOT_DIMENSIONS[d][2]} as "{d}", ' for d in dimensions)
+        group_by = ""
+        if dimensions:
+            group_by = "GROUP BY " + ", ".join(f"{PIVOT_DIMENSIONS[d][1]}, {PIVOT_DIMENSIONS[d][2]}" for d in dimensions)
+
+        return pd.read_sql(f"""
+            SELECT {labels}
+                   COUNT(*) as "PJ",
+                   COALESCE(SUM(CASE WHEN p.goles_favor > p.goles_contra THEN 1 ELSE 0 END), 0) as "PG",
+                   COALESCE(SUM(CASE WHEN p.goles_favor = p.goles_contra THEN 1 ELSE 0 END), 0) as "PE",
+                   COALESCE(SUM(CASE WHEN p.goles_favor < p.goles_contra THEN 1 ELSE 0 END), 0) as "PP",
+                   COALESCE(SUM(p.goles_favor), 0) as "GF",
+                   COALESCE(SUM(p.goles_contra), 0) as "GC"
+            FROM partidos p
+            {' '.join(joins)}
+            WHERE 1=1 {where}
+            {group_by}
+        """, conn, params=params)
+
+# ==============================================================================
+# SNAPSHOT DEL DASHBOARD (SOLAPA ANÁLISIS)
+# ==============================================================================
+
+@dataclass
+class DashboardSnapshot:
+    """Todos los datos de la solapa Análisis para una combinación de filtros."""
+    record: dict                 # pj, pg, pe, pp, gf, gc (enteros)
+    efectividad: float           # % de puntos obtenidos sobre los disputados
+    distribution: pd.DataFrame   # Resultado / Cantidad (torta de rendimiento)
+    top_goleadores: pd.DataFrame # Jugador / Total
+    top_minutos: pd.DataFrame    # Jugador / Total
+    recent_form: pd.DataFrame    # Últimos partidos con ícono de resultado
+    dt_stats: pd.DataFrame       # Efectividad por técnico
+
+def _match_filters(ph, torneo_id=None, temporada=None):
+    """
+    Arma el filtro por torneo/temporada sobre partidos p (y torneos t).
+    Retorna (where, params, join_torneos).
+    """
+    where = ""
+    params = []
+    if torneo_id and torneo_id != "Todos":
+        where += f" AND p.id_torneo = {ph}"
+        params.append(torneo_id)
+    join_torneos = bool(temporada and temporada != "Todas")
+    if join_torneos:
+        where += f" AND t.temporada = {ph}"
+        params.append(temporada)
+    return where, params, join_torneos
+
+def _newest_first(torneo_id=None, temporada=None):
+    """
+    ORDER BY del más nuevo al más viejo para partidos p filtrados por torneo/temporada.
+    Filtrando solo por temporada se ordena por `p.id + 0`: con ORDER BY p.id el planner de
+    Postgres recorre la clave primaria hacia atrás descartando los partidos de otras temporadas
+    (casi toda la tabla si la temporada es vieja); así junta los de la temporada por
+    idx_partidos_torneo y ordena solo esos.
+    """
+    if temporada and temporada != "Todas" and not (torneo_id and torneo_id != "Todos"):
+        return "ORDER BY p.id + 0 DESC"
+    return "ORDER BY p.id DESC"
+
+def _dashboard_tables_sql(torneo_id, temporada, form_limit):
+    """
+    Las tres tablas de get_dashboard_snapshot resueltas por la base: récord por técnico,
+    goles y minutos por jugador y racha reciente. Retorna (df_tec, df_players, df_form).
+    """
+    with db_connection(readonly=True) as conn:
+        if not conn: return None
+        ph = get_placeholder(conn)
+        where, params, join_torneos = _match_filters(ph, torneo_id, temporada)
+        join_t = "JOIN torneos t ON p.id_torneo = t.id" if join_torneos else ""
+
+        # 1. Récord por técnico (los partidos sin DT quedan en un grupo aparte)
+        df_tec = pd.read_sql(f"""
+            SELECT tc.nombre as "Tecnico",
+                   COUNT(*) as "PJ",
+                   SUM(CASE WHEN p.goles_favor > p.goles_contra THEN 1 ELSE 0 END) as "PG",
+                   SUM(CASE WHEN p.goles_favor = p.goles_contra THEN 1 ELSE 0 END) as "PE",
+                   SUM(CASE WHEN p.goles_favor < p.goles_contra THEN 1 ELSE 0 END) as "PP",
+                   SUM(p.goles_favor) as "GF",
+                   SUM(p.goles_contra) as "GC"
+            FROM partidos p
+            LEFT JOIN tecnicos tc ON p.id_tecnico = tc.id
+            {join_t}
+            WHERE 1=1 {where}
+            GROUP BY p.id_tecnico, tc.nombre
+        """, conn, params=params)
+
+        # 2. Goles y minutos por jugador (con filtros: acumulados por torneo;
+        #    sin filtros: totales materializados con saldo inicial).
+        #    Ordenado por jugador: nlargest deja primero al de menor id en los empates
+        if params:
+            rollup_where, rollup_params = _rollup_filters(ph, torneo_id, temporada)
+            df_players = pd.read_sql(f"""
+                SELECT j.nombre || ' ' || j.apellido as "Jugador",
+                       SUM(r.goles_marcados) as goles,
+                       SUM(r.minutos_jugados) as minutos
+                FROM player_rollup r
+                JOIN jugadores j ON j.id = r.id_jugador
+                WHERE 1=1 {rollup_where}
+                GROUP BY j.id, j.nombre, j.apellido
+                ORDER BY j.id
+            """, conn, params=rollup_params)
+        else:
+            df_players = pd.read_sql("""
+                SELECT j.nombre || ' ' || j.apellido as "Jugador",
+                       pt.goles_marcados + pt.goles_marcados_inicial as goles,
+                       pt.minutos_jugados as minutos
+                FROM player_totals pt
+                JOIN jugadores j ON j.id = pt.id_jugador
+                ORDER BY pt.id_jugador
+            """, conn)
+
+        # 3. Racha reciente
+        df_form = pd.read_sql(f"""
+            SELECT p.goles_favor, p.goles_contra, r.nombre as rival, 
+                   p.nro_fecha
+            FROM partidos p
+            JOIN rivales r ON p.id_rival = r.id
+            {join_t}
+            WHERE 1=1 {where}
+            {_newest_first(torneo_id, temporada)}
+            LIMIT {ph}
+        """, conn, params=params + [form_limit])
+    return df_tec, df_players, df_form
+
+@versioned_cache(_filter_scope)
+def get_dashboard_snapshot(torneo_id=None, temporada=None, top_limit=5, form_limit=5):
+    """
+    Calcula todo lo que muestra la solapa Análisis (récord, distribución, goleadores,
+    minutos, racha y DTs) con una sola conexión y tres consultas:
+    el récord global sale de sumar la tabla por técnico y ambos rankings de una misma agrupación.
+    Se cachea como una unidad, así la solapa se arma con un único acierto de caché.
+    Con el motor en memoria (get_fact_store) todo sale de ahí, ya armado y sin consultas.
+    """
+    store = get_fact_store()
+    if store is not None:
+        unfiltered = (not torneo_id or torneo_id == "Todos") and (not temporada or temporada == "Todas")
+        return _dashboard_snapshot(
+            store.match_record(torneo_id, temporada),
+            # Sin filtros los goles incluyen el saldo inicial (igual que player_totals)
+            top_goleadores=store.top_players("goles_marcados", top_limit, torneo_id, temporada, initial=unfiltered),
+            top_minutos=store.top_players("minutos_jugados", top_limit, torneo_id, temporada),
+            recent_form=store.recent_form(form_limit, torneo_id, temporada),
+            dt_stats=store.dt_stats(torneo_id, temporada),
+        )
+
+    tables = _dashboard_tables_sql(torneo_id, temporada, form_limit)
+    if tables is None: return None
+    df_tec, df_players, df_form = tables
+
+    totals = df_tec[["PJ", "PG", "PE", "PP", "GF", "GC"]].apply(pd.to_numeric, errors='coerce').fillna(0).sum()
+    record = {k.lower(): int(totals[k]) for k in ["PJ", "PG", "PE", "PP", "GF", "GC"]}
+
+    def top(col):
+        df = df_players[["Jugador", col]].rename(columns={col: "Total"})
+        df["Total"] = pd.to_numeric(df["Total"], errors='coerce').fillna(0).astype(int)
+        return df[df["Total"] > 0].nlargest(top_limit, "Total").reset_index(drop=True)
+
+    return _dashboard_snapshot(
+        record,
+        top_goleadores=top("goles"),
+        top_minutos=top("minutos"),
+        recent_form=_form_icons(df_form),
+        dt_stats=_dt_effectiveness(df_tec[df_tec["Tecnico"].notna()].reset_index(drop=True)),
+    )
+
+def _dashboard_snapshot(record, top_goleadores, top_minutos, recent_form, dt_stats):
+    """Arma el DashboardSnapshot con el récord global ({pj, pg, ...}) y las tablas ya terminadas."""
+    efectividad = 0.0
+    if record['pj'] > 0:
+        efectividad = (record['pg'] * 3 + record['pe']) / (record['pj'] * 3) * 100
+
+    return DashboardSnapshot(
+        record=record,
+        efectividad=efectividad,
+        distribution=pd.DataFrame({
+            'Resultado': ['Ganados', 'Empatados', 'Perdidos'],
+            'Cantidad': [record['pg'], record['pe'], record['pp']]
+        }),
+        top_goleadores=top_goleadores,
+        top_minutos=top_minutos,
+        recent_form=recent_form,
+        dt_stats=dt_stats,
+    )
 
 # ==============================================================================
 # FUNCIONES DE ESCRITURA (ADMIN)
 # ==============================================================================
 
 def create_user(username, password, nombre):
-    conn = get_connection()
-    if not conn: return False, "Error de conexión"
-    try:
-        ph = get_placeholder(conn)
-        ignore = "OR IGNORE" if "sqlite" in str(conn.__class__).lower() else ""
-        conflict = "ON CONFLICT DO NOTHING" if ignore == "" else ""
+    with db_connection() as conn:
+        if not conn: return False, "Error de conexión"
+        try:
+            ph = get_placeholder(conn)
+            ignore = "OR IGNORE" if "sqlite" in str(conn.__class__).lower() else ""
+            conflict = "ON CONFLICT DO NOTHING" if ignore == "" else ""
         
-        c = conn.cursor()
-        # Verificar si existe
-        c.execute(f"SELECT id FROM usuarios WHERE username = {ph}", (username,))
-        if c.fetchone():
-            return False, "El usuario ya existe"
+            c = conn.cursor()
+            # Verificar si existe
+            c.execute(f"SELECT id FROM usuarios WHERE username = {ph}", (username,))
+            if c.fetchone():
+                return False, "El usuario ya existe"
             
-        c.execute(f"INSERT {ignore} INTO usuarios (username, password, rol, nombre) VALUES ({ph}, {ph}, 'admin', {ph}) {conflict}",
-                 (username, password, nombre))
-        conn.commit()
-        return True, "Usuario creado exitosamente"
-    except Exception as e:
-        conn.rollback()
-        return False, f"Error DB: {e}"
-    finally:
-        close_connection(conn)
+            c.execute(f"INSERT {ignore} INTO usuarios (username, password, rol, nombre) VALUES ({ph}, {ph}, 'admin', {ph}) {conflict}",
+                     (username, password, nombre))
+            conn.commit()
+            return True, "Usuario creado exitosamente"
+        except Exception as e:
+            conn.rollback()
+            return False, f"Error DB: {e}"
 
 def save_match(match_data, df_stats):
     """
@@ -389,73 +889,130 @@ def save_match(match_data, df_stats):
     match_data: dict con keys (id_torneo, id_rival, fecha, condicion, gf, gc)
     df_stats: DataFrame con cols (id_jugador, minutos, goles, amarillas, rojas)
     """
-    conn = get_connection()
-    if not conn: return False, "Error de conexión"
-    
-    try:
-        ph = get_placeholder(conn)
-        c = conn.cursor()
+    with db_connection() as conn:
+        if not conn: return False, "Error de conexión"
         
-        # 1. Insertar Partido
-        query_match = f"""
-            INSERT INTO partidos (id_torneo, id_rival, nro_fecha, condicion, goles_favor, goles_contra)
-            VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-        """
-        # Postgres necesita RETURNING para obtener el ID insertado
-        if "psycopg2" in str(conn.__class__):
-            query_match += " RETURNING id"
-            c.execute(query_match, (
-                match_data['id_torneo'], match_data['id_rival'], match_data['fecha'],
-                match_data['condicion'], match_data['gf'], match_data['gc']
-            ))
-            match_id = c.fetchone()[0]
-        else:
-            # SQLite usa lastrowid
-            c.execute(query_match, (
-                match_data['id_torneo'], match_data['id_rival'], match_data['fecha'],
-                match_data['condicion'], match_data['gf'], match_data['gc']
-            ))
-            match_id = c.lastrowid
-
-        # 2. Preparar Stats
-        batch_stats = []
-        is_pg = "psycopg2" in str(conn.__class__)
+        try:
+            ph = get_placeholder(conn)
+            c = conn.cursor()
         
-        # Iteramos solo los jugadores que jugaron o fueron al banco (pj > 0 o suplente)
-        for _, row in df_stats.iterrows():
-            mins = int(row['minutos'])
-            if mins > 0 or row['rojas'] > 0 or row['amarillas'] > 0 or row['goles'] > 0: 
-                is_starter = (mins > 45) # Logica simple para MVP
+            # 1. Insertar Partido
+            query_match = f"""
+                INSERT INTO partidos (id_torneo, id_rival, nro_fecha, condicion, goles_favor, goles_contra)
+                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+            """
+            # Postgres necesita RETURNING para obtener el ID insertado
+            if "psycopg2" in str(conn.__class__):
+                query_match += " RETURNING id"
+                c.execute(query_match, (
+                    match_data['id_torneo'], match_data['id_rival'], match_data['fecha'],
+                    match_data['condicion'], match_data['gf'], match_data['gc']
+                ))
+                match_id = c.fetchone()[0]
+            else:
+                # SQLite usa lastrowid
+                c.execute(query_match, (
+                    match_data['id_torneo'], match_data['id_rival'], match_data['fecha'],
+                    match_data['condicion'], match_data['gf'], match_data['gc']
+                ))
+                match_id = c.lastrowid
+
+            # 2. Preparar Stats
+            batch_stats = []
+            is_pg = "psycopg2" in str(conn.__class__)
+        
+            # Iteramos solo los jugadores que jugaron o fueron al banco (pj > 0 o suplente)
+            for _, row in df_stats.iterrows():
+                mins = int(row['minutos'])
+                if mins > 0 or row['rojas'] > 0 or row['amarillas'] > 0 or row['goles'] > 0: 
+                    is_starter = (mins > 45) # Logica simple para MVP
                 
-                # Ajuste de tipos para Postgres
-                val_titular = bool(is_starter) if is_pg else (1 if is_starter else 0)
+                    # Ajuste de tipos para Postgres
+                    val_titular = bool(is_starter) if is_pg else (1 if is_starter else 0)
                 
-                batch_stats.append((
-                    match_id, 
-                    int(row['id']), # id_jugador
-                    mins,
-                    val_titular,
-                    int(row['goles']),
-                    int(row['goles_recibidos']) if 'goles_recibidos' in row else 0,
-                    int(row['amarillas']),
-                    int(row['rojas'])
-                ))
+                    batch_stats.append((
+                        match_id, 
+                        int(row['id']), # id_jugador
+                        mins,
+                        val_titular,
+                        int(row['goles']),
+                        int(row['goles_recibidos']) if 'goles_recibidos' in row else 0,
+                        int(row['amarillas']),
+                        int(row['rojas'])
+                    ))
 
-        if batch_stats:
-            query_stats = f"""
-                INSERT INTO stats (id_partido, id_jugador, minutos_jugados, es_titular, goles_marcados, goles_recibidos, amarillas, rojas)
-                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
-            """
-            c.executemany(query_stats, batch_stats)
+            if batch_stats:
+                query_stats = f"""
+                    INSERT INTO stats (id_partido, id_jugador, minutos_jugados, es_titular, goles_marcados, goles_recibidos, amarillas, rojas)
+                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+                """
+                c.executemany(query_stats, batch_stats)
+                
+                # 3. Actualizar totales materializados (misma transacción que el partido)
+                query_totals = f"""
+                    INSERT INTO player_totals (
+                        id_jugador, pj_inicial, goles_marcados_inicial, goles_recibidos_inicial,
+                        asistencias_inicial, amarillas_inicial, rojas_inicial, titular_inicial, suplente_inicial,
+                        pj, titular, minutos_jugados, goles_marcados, goles_recibidos, amarillas, rojas
+                    )
+                    SELECT j.id, COALESCE(j.pj_inicial, 0), COALESCE(j.goles_marcados_inicial, 0),
+                           COALESCE(j.goles_recibidos_inicial, 0), COALESCE(j.asistencias_inicial, 0),
+                           COALESCE(j.amarillas_inicial, 0), COALESCE(j.rojas_inicial, 0),
+                           COALESCE(j.titular_inicial, 0), COALESCE(j.suplente_inicial, 0),
+                           1, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}
+                    FROM jugadores j
+                    WHERE j.id = {ph}
+                    ON CONFLICT (id_jugador) DO UPDATE SET
+                        pj = player_totals.pj + excluded.pj,
+                        titular = player_totals.titular + excluded.titular,
+                        minutos_jugados = player_totals.minutos_jugados + excluded.minutos_jugados,
+                        goles_marcados = player_totals.goles_marcados + excluded.goles_marcados,
+                        goles_recibidos = player_totals.goles_recibidos + excluded.goles_recibidos,
+                        amarillas = player_totals.amarillas + excluded.amarillas,
+                        rojas = player_totals.rojas + excluded.rojas
+                """
+                c.executemany(query_totals, [
+                    (1 if titular else 0, mins, goles, recibidos, amarillas, rojas, jid)
+                    for (_, jid, mins, titular, goles, recibidos, amarillas, rojas) in batch_stats
+                ])
+
+                # 4. Acumulados por torneo del jugador (player_rollup)
+                query_rollup = f"""
+                    INSERT INTO player_rollup (
+                        id_torneo, id_jugador, temporada,
+                        minutos_jugados, goles_marcados, goles_recibidos, amarillas, rojas
+                    )
+                    SELECT t.id, {ph}, t.temporada, {ph}, {ph}, {ph}, {ph}, {ph}
+                    FROM torneos t
+                    WHERE t.id = {ph}
+                    ON CONFLICT (id_torneo, id_jugador) DO UPDATE SET
+                        minutos_jugados = player_rollup.minutos_jugados + excluded.minutos_jugados,
+                        goles_marcados = player_rollup.goles_marcados + excluded.goles_marcados,
+                        goles_recibidos = player_rollup.goles_recibidos + excluded.goles_recibidos,
+                        amarillas = player_rollup.amarillas + excluded.amarillas,
+                        rojas = player_rollup.rojas + excluded.rojas
+                """
+                c.executemany(query_rollup, [
+                    (jid, mins, goles, recibidos, amarillas, rojas, match_data['id_torneo'])
+                    for (_, jid, mins, titular, goles, recibidos, amarillas, rojas) in batch_stats
+                ])
             
-        conn.commit()
-        # Invalidar cache de Streamlit para que se refresquen los datos
-        st.cache_data.clear()
+            # 5. Versiones de datos: invalida solo las lecturas cacheadas que este partido afecta
+            c.execute(f"SELECT temporada FROM torneos WHERE id = {ph}", (match_data['id_torneo'],))
+            row = c.fetchone()
+            scopes = ["partidos", f"torneo:{match_data['id_torneo']}"]
+            if row:
+                scopes.append(f"temporada:{row[0]}")
+            scopes += [f"jugador:{jid}" for (_, jid, *_) in batch_stats]
+            bump_data_versions(conn, scopes)
+
+            conn.commit()
+            # Esta instancia ve las versiones nuevas al instante; las demás, en VERSIONS_TTL segundos
+            load_data_versions.clear()
         
-        return True, f"Partido guardado con ID {match_id}"
+            return True, f"Partido guardado con ID {match_id}"
         
-    except Exception as e:
-        conn.rollback()
-        return False, f"Error guardando partido: {e}"
-    finally:
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            return False, f"Error guardando partido: {e}"
+
@@ -1,5 +1,9 @@
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
 import streamlit as st
 
 # Nombre del archivo de la base de datos SQLite (Fallback local)
@@ -7,54 +11,285 @@ DB_NAME = "cava_stats_v2.db"
 SCHEMA_FILE_SQLITE = "cava_schema.sql"
 SCHEMA_FILE_POSTGRES = "cava_schema_postgres.sql"
 
-@st.cache_resource
-def _get_cached_connection():
-    """Retorna una conexión única cacheada."""
-    # 1. Intentar conexión a Supabase (Postgres)
-    if "supabase" in st.secrets:
+# Parámetros por defecto del pool de Postgres (se pueden pisar desde [supabase] en secrets)
+POOL_MIN_SIZE = 1        # Conexiones que se abren al crear el pool
+POOL_MAX_SIZE = 10       # Tope de conexiones simultáneas contra Supabase
+POOL_TIMEOUT = 30        # Segundos que espera una sesión si el pool está lleno
+POOL_CHECK_AFTER = 60    # Segundos de inactividad a partir de los cuales se verifica la conexión
+
+# Ajustes de las conexiones SQLite (se aplican una sola vez, al abrir cada conexión)
+SQLITE_BUSY_TIMEOUT = 5  # Segundos que espera una escritura si la base está bloqueada
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",   # Seguro con WAL y mucho más rápido que FULL
+    "PRAGMA mmap_size = 268435456",  # 256 MB mapeados en memoria para lecturas
+    "PRAGMA cache_size = -65536",    # 64 MB de caché de páginas (valor negativo = KiB)
+    "PRAGMA temp_store = MEMORY",    # Tablas temporales de GROUP BY / ORDER BY en RAM
+)
+
+class PoolTimeoutError(Exception):
+    """No se liberó ninguna conexión del pool dentro del tiempo de espera."""
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe con tamaño acotado (min/max).
+    Cada sesión/hilo pide una conexión con `connection()` y la devuelve al salir del bloque,
+    así varias sesiones de Streamlit pueden consultar en paralelo sin compartir el mismo socket.
+    Las conexiones inactivas o sospechosas se verifican con un SELECT 1 antes de entregarse
+    y se reemplazan por una nueva si el servidor las cortó.
+    """
+
+    def __init__(self, connect, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 timeout=POOL_TIMEOUT, check_after=POOL_CHECK_AFTER):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.check_after = check_after
+        self._cond = threading.Condition()
+        self._idle = []  # Pila de (conexión, instante de último uso)
+        self._size = 0   # Conexiones abiertas (prestadas + libres)
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reservamos el lugar y abrimos la conexión fuera del lock
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No hay conexiones libres (máximo {self.max_size}).")
+                self._cond.wait(remaining)
+
         try:
-            import psycopg2
-            secrets = st.secrets["supabase"]
-            conn = psycopg2.connect(
-                host=secrets["host"],
-                database=secrets["dbname"],
-                user=secrets["user"],
-                password=secrets["password"],
-                port=secrets["port"]
-            )
-            return conn
-        except Exception as e:
-            print(f"⚠️ Error conectando a Supabase: {e}. Usando SQLite local.")
-            return None
+            if conn is not None and self._is_healthy(conn, last_used):
+                return conn
+            if conn is not None:
+                _close_quietly(conn)
+            return self._connect()
+        except Exception:
+            # No se pudo reconectar: liberamos el lugar reservado
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _is_healthy(self, conn, last_used):
+        if getattr(conn, 'closed', False):
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            c = conn.cursor()
+            c.execute("SELECT 1")
+            c.fetchone()
+            c.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _checkin(self, conn, suspect=False):
+        try:
+            # Cerramos cualquier transacción abierta (los SELECT también abren una en psycopg2)
+            conn.rollback()
+        except Exception:
+            suspect = True
+        with self._cond:
+            if getattr(conn, 'closed', False):
+                self._size -= 1
+            else:
+                # Si hubo un error, forzamos el health check en el próximo checkout
+                self._idle.append((conn, float('-inf') if suspect else time.monotonic()))
+            self._cond.notify()
+        if getattr(conn, 'closed', False):
+            _close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """Presta una conexión del pool durante el bloque `with` y la devuelve al terminar."""
+        conn = self._checkout()
+        suspect = False
+        try:
+            yield conn
+        except BaseException:
+            suspect = True
+            raise
+        finally:
+            self._checkin(conn, suspect)
+
+    def close_all(self):
+        """Cierra las conexiones libres (las prestadas se cierran al devolverse)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+def _supabase_secrets():
+    """Retorna la sección [supabase] de los secrets, o None si no está configurada."""
+    try:
+        if "supabase" in st.secrets:
+            return st.secrets["supabase"]
+    except Exception:
+        # Sin archivo secrets.toml: trabajamos con SQLite local
+        pass
     return None
 
-def get_connection():
+def _connect_postgres(secrets):
+    import psycopg2
+    return psycopg2.connect(
+        host=secrets["host"],
+        database=secrets["dbname"],
+        user=secrets["user"],
+        password=secrets["password"],
+        port=secrets["port"]
+    )
+
+def _connect_sqlite(readonly=False):
     """
-    Wrapper que gestiona la conexión cacheada.
-    Verifica si está cerrada y reconecta si es necesario.
+    Abre una conexión SQLite con los pragmas de SQLITE_PRAGMAS aplicados.
+    En modo solo lectura se abre por URI (mode=ro): no puede escribir ni crear el archivo.
     """
-    # 1. Intentar obtener conexión Postgres cacheada
-    conn = _get_cached_connection()
-    
-    # Si existe y está abierta, retornarla
-    if conn and not conn.closed:
-        return conn
-        
-    # Si está cerrada (o es None y falló cache), limpiamos cache y reintentamos
-    if conn and conn.closed:
-        st.cache_resource.clear()
-        conn = _get_cached_connection()
-        if conn and not conn.closed:
-            return conn
-
-    # 2. Fallback a SQLite (No cacheamos SQLite local porque es rápido)
     try:
-        conn = sqlite3.connect(DB_NAME)
+        if readonly:
+            uri = f"file:{pathname2url(os.path.abspath(DB_NAME))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=SQLITE_BUSY_TIMEOUT)
+        else:
+            conn = sqlite3.connect(DB_NAME, timeout=SQLITE_BUSY_TIMEOUT)
+            # WAL queda grabado en el archivo: lectores y escritor dejan de bloquearse entre sí
+            conn.execute("PRAGMA journal_mode = WAL")
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
         return conn
     except Exception as e:
         print(f"Error conectando a SQLite: {e}")
         return None
 
+class SQLiteConnectionManager:
+    """
+    Mantiene una conexión SQLite persistente por hilo (una de lectura/escritura y otra de
+    solo lectura), así cada rerun de Streamlit reutiliza la conexión en lugar de abrir el
+    archivo y aplicar los pragmas en cada consulta.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, readonly=False):
+        key = "readonly" if readonly else "readwrite"
+        conn = getattr(self._local, key, None)
+        if conn is None:
+            conn = _connect_sqlite(readonly)
+            if conn is not None:
+                setattr(self._local, key, conn)
+        return conn
+
+    def release(self, conn):
+        """Descarta lo que haya quedado sin commitear; la conexión sigue abierta para el hilo."""
+        if conn.in_transaction:
+            conn.rollback()
+
+    def close(self):
+        """Cierra las conexiones del hilo actual."""
+        for key in ("readonly", "readwrite"):
+            conn = getattr(self._local, key, None)
+            if conn is not None:
+                _close_quietly(conn)
+                setattr(self._local, key, None)
+
+_sqlite_connections = SQLiteConnectionManager()
+
+_pool = None
+_pool_resolved = False
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """
+    Retorna el pool de conexiones a Supabase compartido por todas las sesiones (None si no hay).
+    Se resuelve una sola vez por proceso: db_connection() lo consulta en cada query y debe ser barato.
+    """
+    global _pool, _pool_resolved
+    if _pool_resolved:
+        return _pool
+    with _pool_lock:
+        if not _pool_resolved:
+            _pool = _create_pool()
+            _pool_resolved = True
+    return _pool
+
+def _create_pool():
+    secrets = _supabase_secrets()
+    if secrets is None:
+        return None
+    try:
+        return ConnectionPool(
+            lambda: _connect_postgres(secrets),
+            min_size=int(secrets.get("pool_min_size", POOL_MIN_SIZE)),
+            max_size=int(secrets.get("pool_max_size", POOL_MAX_SIZE)),
+            timeout=float(secrets.get("pool_timeout", POOL_TIMEOUT)),
+        )
+    except Exception as e:
+        print(f"⚠️ Error conectando a Supabase: {e}. Usando SQLite local.")
+        return None
+
+@contextmanager
+def db_connection(readonly=False):
+    """
+    Entrega una conexión lista para usar dentro de un bloque `with`:
+
+        with db_connection(readonly=True) as conn:
+            pd.read_sql(query, conn)
+
+    Con Supabase la conexión sale del pool y vuelve a él al terminar el bloque
+    (haciendo rollback de lo que no se haya commiteado). Con SQLite se usa la conexión
+    persistente del hilo; `readonly=True` la abre en modo solo lectura (dashboard público).
+    Si no hay base disponible entrega None.
+    """
+    pool = _get_pool()
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+
+    conn = _sqlite_connections.get(readonly)
+    try:
+        yield conn
+    finally:
+        if conn:
+            _sqlite_connections.release(conn)
+
+def get_connection():
+    """
+    Abre una conexión dedicada (fuera del pool y de las conexiones persistentes)
+    para procesos largos como el ETL o init_db.
+    Quien la pide es responsable de cerrarla con close_connection().
+    """
+    # 1. Intentar conexión a Supabase (Postgres)
+    secrets = _supabase_secrets()
+    if secrets is not None:
+        try:
+            return _connect_postgres(secrets)
+        except Exception as e:
+            print(f"⚠️ Error conectando a Supabase: {e}. Usando SQLite local.")
+
+    # 2. Fallback a SQLite
+    return _connect_sqlite()
+
 def is_postgres(conn):
     return hasattr(conn, 'dsn') # psycopg2 objects have 'dsn' attribute
 
@@ -75,6 +310,123 @@ def get_conflict_clause(conn):
         return "ON CONFLICT DO NOTHING"
     return ""
 
+def execute_many(conn, query, rows, page_size=500):
+    """
+    Ejecuta `query` para cada tupla de `rows`. En Postgres agrupa las sentencias de a
+    `page_size` por viaje al servidor (executemany de psycopg2 hace uno por fila);
+    en SQLite no hay red de por medio y executemany alcanza.
+    """
+    c = conn.cursor()
+    if is_postgres(conn):
+        from psycopg2.extras import execute_batch
+        execute_batch(c, query, rows, page_size=page_size)
+    else:
+        c.executemany(query, rows)
+
+def _copy_value(value):
+    """Representa un valor en el formato de texto de COPY (None como \\N, con escapes)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def bulk_insert(conn, table, columns, rows):
+    """
+    Inserta `rows` (tuplas en el orden de `columns`) en `table` como carga masiva.
+    En Postgres las filas viajan en un único COPY FROM STDIN armado en memoria, y si se
+    cargaron ids explícitos se reposicionan después las secuencias; en SQLite alcanza con executemany.
+    COPY no admite ON CONFLICT: quien llama debe pasar solo filas que no choquen con las existentes.
+    """
+    if not rows:
+        return
+    c = conn.cursor()
+    cols = ", ".join(columns)
+    if is_postgres(conn):
+        import io
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(v) for v in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        c.copy_expert(f"COPY {table} ({cols}) FROM STDIN", buffer)
+        if "id" in columns:
+            reset_sequences(conn, [table])
+    else:
+        c.executemany(f"INSERT INTO {table} ({cols}) VALUES ({', '.join('?' * len(columns))})", rows)
+
+def insert_returning_ids(conn, table, columns, rows, page_size=500):
+    """
+    Inserta `rows` (tuplas en el orden de `columns`) en `table` con INSERT ... VALUES
+    (...), (...) RETURNING id, de a `page_size` filas por sentencia, y retorna los ids
+    generados en orden. Son solo los de estas filas aunque otra conexión inserte en la
+    misma tabla al mismo tiempo (RETURNING: Postgres o SQLite 3.35 en adelante).
+    """
+    if not rows:
+        return []
+    c = conn.cursor()
+    cols = ", ".join(columns)
+    if is_postgres(conn):
+        from psycopg2.extras import execute_values
+        ids = execute_values(c, f"INSERT INTO {table} ({cols}) VALUES %s RETURNING id", rows,
+                             page_size=page_size, fetch=True)
+    else:
+        ids = []
+        row_sql = f"({', '.join('?' * len(columns))})"
+        for start in range(0, len(rows), page_size):
+            page = rows[start:start + page_size]
+            c.execute(f"INSERT INTO {table} ({cols}) VALUES {', '.join([row_sql] * len(page))} RETURNING id",
+                      [value for row in page for value in row])
+            ids.extend(c.fetchall())
+    return sorted(row[0] for row in ids)
+
+def reset_sequences(conn, tables, schema=None):
+    """
+    (Postgres) Posiciona las secuencias de las columnas serial o identity de `tables` después
+    del mayor id cargado, para que los próximos INSERT no choquen con ids cargados explícitamente.
+    Sin `schema` cada tabla se resuelve con el search_path (como en las consultas del ETL).
+    """
+    c = conn.cursor()
+    for table in tables:
+        qualified = f"{schema}.{table}" if schema else table
+        c.execute("""
+            SELECT attname, pg_get_serial_sequence(%s, attname) FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+              AND pg_get_serial_sequence(%s, attname) IS NOT NULL
+        """, (qualified, qualified, qualified))
+        for column, sequence in c.fetchall():
+            c.execute(f"SELECT setval(%s, COALESCE(MAX({column}), 0) + 1, false) FROM {qualified}", (sequence,))
+
+def bump_data_versions(conn, scopes):
+    """
+    Incrementa el contador de data_versions de cada alcance de `scopes`.
+    No hace commit: debe llamarse dentro de la transacción que modifica los datos,
+    así ninguna lectura ve la versión nueva antes que los datos nuevos.
+    """
+    ph = get_placeholder(conn)
+    execute_many(conn, f"""
+        INSERT INTO data_versions (scope, version) VALUES ({ph}, 1)
+        ON CONFLICT (scope) DO UPDATE SET version = data_versions.version + 1
+    """, [(scope,) for scope in dict.fromkeys(scopes)])
+
+def write_db_metadata(conn, values):
+    """
+    Guarda los pares {clave: valor} de `values` en db_metadata (ver migración 005).
+    No hace commit: queda en la transacción de quien llama.
+    """
+    ph = get_placeholder(conn)
+    execute_many(conn, f"""
+        INSERT INTO db_metadata (clave, valor, actualizada_en) VALUES ({ph}, {ph}, CURRENT_TIMESTAMP)
+        ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor, actualizada_en = excluded.actualizada_en
+    """, [(clave, str(valor)) for clave, valor in values.items()])
+
+def read_db_metadata(conn):
+    """Retorna db_metadata como {clave: valor}."""
+    c = conn.cursor()
+    c.execute("SELECT clave, valor FROM db_metadata")
+    return dict(c.fetchall())
+
 def init_db():
     """
     Inicializa la base de datos.
@@ -117,9 +469,8 @@ def init_db():
 
 def close_connection(conn):
     """
-    Cierra la conexión SOLO si es SQLite (local).
-    Si es Postgres (Supabase), la dejamos abierta porque está cacheada por Streamlit.
+    Cierra una conexión obtenida con get_connection().
+    Las conexiones del pool no se cierran: vuelven solas al salir de db_connection().
     """
     if conn:
-        if not is_postgres(conn):
-            conn.close()
+        conn.close()
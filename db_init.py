@@ -1,8 +1,10 @@
 from db_config import init_db
+from db_migrations import apply_migrations
 
 def main():
     print("--- Inicializando Proyecto CAVA ---")
     init_db()
+    apply_migrations()
     print("--- Proceso finalizado ---")
 
 if __name__ == '__main__':
@@ -0,0 +1,306 @@
+import json
+import os
+import re
+import sys
+import db_config
+from db_config import get_connection, close_connection, is_postgres, get_placeholder, write_db_metadata
+
+# Carpeta con las migraciones versionadas: NNN_descripcion.sql (se aplican en orden de NNN)
+MIGRATIONS_DIR = "migrations"
+
+# Migración que crea db_metadata (antes no hay dónde registrar la versión del esquema)
+METADATA_VERSION = 5
+
+# Tablas de hechos que nunca deberían recorrerse completas en las consultas filtradas
+FACT_TABLES = ("partidos", "stats", "player_rollup")
+
+def list_migrations():
+    """
+    Retorna la lista ordenada de migraciones disponibles como tuplas (version, nombre, ruta).
+    """
+    migrations = []
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return migrations
+    for fname in os.listdir(MIGRATIONS_DIR):
+        m = re.match(r"^(\d+)_(\w+)\.sql$", fname)
+        if m:
+            migrations.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, fname)))
+    return sorted(migrations)
+
+def latest_version():
+    """Versión de la última migración disponible en el código (0 si no hay)."""
+    migrations = list_migrations()
+    return migrations[-1][0] if migrations else 0
+
+def _ensure_migrations_table(conn):
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+def applied_versions(conn):
+    """Retorna el conjunto de versiones ya aplicadas en la base."""
+    _ensure_migrations_table(conn)
+    c = conn.cursor()
+    c.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in c.fetchall()}
+
+def apply_migrations(conn=None):
+    """
+    Aplica, en orden y cada una en su propia transacción, las migraciones pendientes.
+    Funciona igual sobre SQLite y Postgres. Retorna la lista de versiones aplicadas.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    if not conn:
+        print("Error: no hay conexión para aplicar migraciones.")
+        return []
+
+    applied = []
+    try:
+        done = applied_versions(conn)
+        ph = get_placeholder(conn)
+        for version, nombre, path in list_migrations():
+            if version in done:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                script = f.read()
+
+            if is_postgres(conn):
+                c = conn.cursor()
+                try:
+                    c.execute(script)
+                    c.execute(f"INSERT INTO schema_migrations (version, nombre) VALUES ({ph}, {ph})", (version, nombre))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            else:
+                # executescript hace commit de lo pendiente y corre en autocommit:
+                # envolvemos la migración y su registro en una única transacción explícita
+                try:
+                    conn.executescript(
+                        "BEGIN;\n" + script +
+                        f"\nINSERT INTO schema_migrations (version, nombre) VALUES ({version}, '{nombre}');\nCOMMIT;"
+                    )
+                except Exception:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    raise
+            print(f"  Migración {version:03d} ({nombre}) aplicada.")
+            applied.append(version)
+
+        # La app compara esta versión con latest_version() al arrancar
+        current = max(done | set(applied), default=0)
+        if current >= METADATA_VERSION:
+            write_db_metadata(conn, {"schema_version": current})
+            conn.commit()
+    finally:
+        if own_conn:
+            close_connection(conn)
+    return applied
+
+# ==============================================================================
+# CONTROL DE PLANES DE EJECUCIÓN
+# ==============================================================================
+
+def _hot_path_calls(conn):
+    """
+    Lecturas de cava_functions que deben resolverse por índice, invocadas con filtros
+    tomados de los datos reales (el torneo y jugador con más registros).
+    Cada una es (nombre, función, args, kwargs, tablas que puede recorrer completas): solo
+    los agregados sin filtro, que por definición leen todos los partidos, declaran alguna.
+    """
+    import cava_functions as cf
+    # Las lecturas del dashboard deben ir a la base (no al motor en memoria) para ver sus planes
+    cf.FACT_STORE_ENABLED = False
+
+    c = conn.cursor()
+    c.execute("SELECT id_torneo FROM partidos GROUP BY id_torneo ORDER BY COUNT(*) DESC LIMIT 1")
+    row = c.fetchone()
+    tid = row[0] if row else 1
+    ph = get_placeholder(conn)
+    c.execute(f"SELECT temporada FROM torneos WHERE id = {ph}", (tid,))
+    row = c.fetchone()
+    temporada = row[0] if row else "2024"
+    c.execute("SELECT id_jugador FROM stats GROUP BY id_jugador ORDER BY COUNT(*) DESC LIMIT 1")
+    row = c.fetchone()
+    jid = row[0] if row else 1
+
+    return [
+        ("load_partidos", cf.load_partidos, (tid,), {}, ()),
+        ("get_player_stats", cf.get_player_stats, (jid,), {}, ()),
+        ("get_player_matches", cf.get_player_matches, (jid,), {}, ()),
+        ("load_partidos_page[torneo]", cf.load_partidos_page, (tid,), {"before_id": 10**9, "page_size": 10}, ()),
+        ("load_partidos_page[temporada]", cf.load_partidos_page, (None, temporada), {"page_size": 10}, ()),
+        ("get_player_matches_page", cf.get_player_matches_page, (jid,), {"before_id": 10**9, "page_size": 10}, ()),
+        ("count_player_matches", cf.count_player_matches, (jid,), {}, ()),
+        ("get_global_stats[torneo]", cf.get_global_stats, (), {"torneo_id": tid}, ()),
+        ("get_global_stats[temporada]", cf.get_global_stats, (), {"temporada": temporada}, ()),
+        ("get_top_stat[torneo]", cf.get_top_stat, ("goles_marcados",), {"torneo_id": tid}, ()),
+        ("get_top_stat[temporada]", cf.get_top_stat, ("minutos_jugados",), {"sum_initial": False, "temporada": temporada}, ()),
+        ("get_dt_stats[torneo]", cf.get_dt_stats, (), {"torneo_id": tid}, ()),
+        ("get_dt_stats[temporada]", cf.get_dt_stats, (), {"temporada": temporada}, ()),
+        ("get_recent_form[torneo]", cf.get_recent_form, (), {"torneo_id": tid}, ()),
+        ("get_recent_form[temporada]", cf.get_recent_form, (), {"temporada": temporada}, ()),
+        ("get_global_stats", cf.get_global_stats, (), {}, ("partidos",)),
+        ("get_dt_stats", cf.get_dt_stats, (), {}, ("partidos",)),
+        ("get_head_to_head", cf.get_head_to_head, (), {}, ("partidos",)),
+        ("get_pivot", cf.get_pivot, (("tecnico",),), {}, ("partidos",)),
+        ("get_dashboard_snapshot[torneo]", cf.get_dashboard_snapshot, (), {"torneo_id": tid}, ()),
+        ("get_dashboard_snapshot[temporada]", cf.get_dashboard_snapshot, (), {"temporada": temporada}, ()),
+        ("get_pivot[torneo]", cf.get_pivot, (("tecnico", "condicion"),), {"torneo_id": tid}, ()),
+        ("get_pivot[temporada]", cf.get_pivot, (("rival",),), {"temporada": temporada}, ()),
+    ]
+
+def _capture_statements(func, args, kwargs):
+    """
+    Ejecuta una función de cava_functions salteando la caché de Streamlit y
+    retorna los SELECT que mandó a la base, con los parámetros ya expandidos.
+    """
+    statements = []
+    target = getattr(func, "__wrapped__", func)
+    pool = db_config._get_pool()
+
+    if pool is None:
+        conns = [db_config._sqlite_connections.get(readonly) for readonly in (True, False)]
+        for conn in conns:
+            conn.set_trace_callback(statements.append)
+        try:
+            target(*args, **kwargs)
+        finally:
+            for conn in conns:
+                conn.set_trace_callback(None)
+    else:
+        import psycopg2.extensions
+
+        class RecordingCursor(psycopg2.extensions.cursor):
+            def execute(self, query, vars=None):
+                statements.append(self.mogrify(query, vars).decode())
+                return super().execute(query, vars)
+
+        # El pool entrega primero la última conexión devuelta: la marcamos y la devolvemos
+        with pool.connection() as conn:
+            previous = conn.cursor_factory
+            conn.cursor_factory = RecordingCursor
+        try:
+            target(*args, **kwargs)
+        finally:
+            conn.cursor_factory = previous
+
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+def _table_aliases(sql):
+    """Mapea alias -> tabla a partir de las cláusulas FROM/JOIN de una consulta."""
+    aliases = {}
+    keywords = {"WHERE", "JOIN", "LEFT", "INNER", "ON", "GROUP", "ORDER", "LIMIT"}
+    for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I):
+        aliases[table.lower()] = table.lower()
+        if alias and alias.upper() not in keywords:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+def full_scans(conn, sql, allowed=()):
+    """
+    Corre EXPLAIN (Postgres) o EXPLAIN QUERY PLAN (SQLite) sobre `sql` y retorna
+    las líneas del plan que recorren completa alguna tabla de FACT_TABLES que no esté en `allowed`.
+    Recorrer un índice entero también cuenta (SQLite: SCAN ... USING [COVERING] INDEX;
+    Postgres: Index Scan cuya Index Cond no fija la primera columna del índice): solo se
+    acepta SEARCH en SQLite y una condición sobre la primera columna en Postgres.
+    """
+    c = conn.cursor()
+    problems = []
+    if is_postgres(conn):
+        # Con tablas chicas el planner prefiere Seq Scan (o recorrer entera una tabla para un
+        # hash/merge join) aunque exista índice: lo desalentamos para ver si la consulta
+        # *puede* resolverse por índice
+        for setting in ("enable_seqscan", "enable_hashjoin", "enable_mergejoin"):
+            c.execute(f"SET {setting} = off")
+        try:
+            c.execute("EXPLAIN (FORMAT JSON) " + sql)
+            plan = c.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = [plan[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                nodes.extend(node.get("Plans", []))
+                kind = node["Node Type"]
+                if kind == "Seq Scan":
+                    table, full = node["Relation Name"].lower(), True
+                elif "Index Name" in node:
+                    # Una condición que no fija la primera columna del índice lo recorre entero
+                    table, column = _index_leading_column(conn, node["Index Name"])
+                    condition = node.get("Index Cond", "")
+                    full = not re.search(rf"\(\(?{re.escape(column)}\b", condition)  # "(col =" o "((col)::text ="
+                else:
+                    continue
+                if full and table in FACT_TABLES and table not in allowed:
+                    index = f" using {node['Index Name']}" if "Index Name" in node else ""
+                    problems.append(f"{kind}{index} on {table}")
+        finally:
+            conn.rollback()
+    else:
+        aliases = _table_aliases(sql)
+        c.execute("EXPLAIN QUERY PLAN " + sql)
+        for row in c.fetchall():
+            detail = row[-1]
+            m = re.match(r"SCAN (\w+)", detail)
+            table = aliases.get(m.group(1).lower()) if m else None
+            if table in FACT_TABLES and table not in allowed:
+                problems.append(detail)
+    return problems
+
+def _index_leading_column(conn, index):
+    """(Postgres) Retorna (tabla, primera columna) del índice `index`."""
+    c = conn.cursor()
+    c.execute("""
+        SELECT t.relname, a.attname
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indexrelid = %s::regclass
+    """, (index,))
+    table, column = c.fetchone()
+    return table.lower(), column
+
+def check_query_plans():
+    """
+    Verifica que las consultas filtradas de cava_functions usen índices.
+    Retorna una lista de (nombre, sql, líneas del plan con scans completos); vacía si todo OK.
+    """
+    failures = []
+    conn = get_connection()
+    try:
+        for name, func, args, kwargs, allowed in _hot_path_calls(conn):
+            for sql in _capture_statements(func, args, kwargs):
+                problems = full_scans(conn, sql, allowed)
+                if problems:
+                    failures.append((name, sql, problems))
+    finally:
+        close_connection(conn)
+    return failures
+
+def main():
+    if "--check" in sys.argv:
+        failures = check_query_plans()
+        if not failures:
+            print("✅ Todas las consultas filtradas usan índices.")
+            return 0
+        for name, sql, problems in failures:
+            print(f"❌ {name}: scan completo -> {'; '.join(problems)}")
+            print(f"   {' '.join(sql.split())}")
+        return 1
+
+    applied = apply_migrations()
+    print(f"✅ Esquema en versión {latest_version()} ({len(applied)} migraciones aplicadas).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
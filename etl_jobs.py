@@ -0,0 +1,92 @@
+import threading
+import time
+from etl_process import ETL_STAGES
+
+# Etapas de una carga lanzada desde la app: crear la estructura y luego las del ETL
+JOB_STAGES = [("estructura", "Estructura de la base")] + ETL_STAGES
+
+class EtlJob:
+    """
+    Una inicialización de la base (init_db + ETL completo) corriendo en un hilo de fondo.
+    El hilo solo actualiza el estado del job; la UI lo consulta con `snapshot()` en cada
+    rerun, así ninguna sesión de Streamlit queda bloqueada mientras dura la carga.
+    """
+
+    def __init__(self, source):
+        """`source` es la ruta del Excel o su contenido en bytes (ej. un archivo subido)."""
+        self.source = source
+        self.estado = "pendiente"  # pendiente -> corriendo -> ok | error
+        self.etapa = None
+        self.eventos = []          # (segundos desde el inicio, etapa)
+        self.error = None
+        self._inicio = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="etl-job", daemon=True)
+
+    def start(self):
+        self._inicio = time.monotonic()
+        self.estado = "corriendo"
+        self._thread.start()
+
+    def _progress(self, etapa):
+        with self._lock:
+            self.etapa = etapa
+            self.eventos.append((time.monotonic() - self._inicio, etapa))
+
+    def _run(self):
+        from db_init import main as init_db
+        from etl_process import main as run_etl
+        try:
+            self._progress("estructura")
+            init_db()
+            # En un hilo del servidor de Streamlit no forkeamos procesos: extracción secuencial
+            run_etl(workers=1, source=self.source, progress=self._progress)
+            estado, error = "ok", None
+        except Exception as e:
+            estado, error = "error", f"{type(e).__name__}: {e}"
+        with self._lock:
+            self.estado, self.error = estado, error
+            self.source = None  # Liberamos el Excel (puede ser el archivo subido entero)
+
+    @property
+    def running(self):
+        return self.estado in ("pendiente", "corriendo")
+
+    def snapshot(self):
+        """
+        Estado actual del job para mostrar en la UI: dict con estado, etapa, etiqueta de la
+        etapa, avance (0 a 1), segundos transcurridos, eventos y error.
+        """
+        with self._lock:
+            stages = [key for key, _ in JOB_STAGES]
+            done = stages.index(self.etapa) if self.etapa in stages else 0
+            if self.estado == "ok":
+                done = len(stages)
+            return {
+                "estado": self.estado,
+                "etapa": self.etapa,
+                "etiqueta": dict(JOB_STAGES).get(self.etapa, ""),
+                "avance": done / len(stages),
+                "segundos": time.monotonic() - self._inicio if self._inicio else 0,
+                "eventos": list(self.eventos),
+                "error": self.error,
+            }
+
+_jobs_lock = threading.Lock()
+_current_job = None
+
+def start_etl_job(source):
+    """
+    Lanza la inicialización en segundo plano y retorna su EtlJob. Si ya hay una corriendo
+    en este proceso (ej. otra sesión llegó antes) retorna esa en lugar de lanzar otra.
+    """
+    global _current_job
+    with _jobs_lock:
+        if _current_job is None or not _current_job.running:
+            _current_job = EtlJob(source)
+            _current_job.start()
+        return _current_job
+
+def current_etl_job():
+    """El último job lanzado en este proceso (None si no hubo ninguno)."""
+    return _current_job
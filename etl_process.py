@@ -2,12 +2,31 @@ import pandas as pd
 import sqlite3
 import re
 import os
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from db_config import get_connection, get_placeholder, get_ignore_clause, get_conflict_clause, is_postgres
+from db_config import get_connection, get_placeholder, get_ignore_clause, get_conflict_clause, is_postgres, bump_data_versions, execute_many, bulk_insert, insert_returning_ids, write_db_metadata
+from db_migrations import apply_migrations
+from etl_workbook import Workbook, rows_to_frame, sheet_fingerprint
+from etl_staging import open_staging, index_staging, publish_staging, discard_staging
 
 # Nombre del archivo Excel principal de donde se extraen los datos
 EXCEL_FILE = "Estadísticas CAVA_v3_original.xlsx"
 
+# Etapas de la recarga completa, en orden (main() las informa a su callback `progress`)
+ETL_STAGES = [
+    ("posiciones", "Posiciones"),
+    ("jugadores", "Jugadores"),
+    ("resultados", "Resultados"),
+    ("stats", "Estadísticas de planteles"),
+    ("goles", "Goleadores"),
+    ("publicacion", "Publicación"),
+]
+
+# Procesos para extraer las hojas PLANTEL en paralelo (None = uno por núcleo, 1 = sin pool)
+ETL_WORKERS = None
+
 def date_converter(val):
     """
     Convierte diferentes formatos de fecha del Excel a un formato estándar YYYY-MM-DD.
@@ -27,58 +46,18 @@ def date_converter(val):
     # Si no coincide con ningún formato, retornamos None para que se guarde como NULL en la DB
     return None
 
-def clean_database():
-    """
-    Borra todo el contenido de las tablas de la base de datos para realizar una
-    carga limpia desde cero. También reinicia los contadores de ID.
-    """
-    conn = get_connection()
-    c = conn.cursor()
-    tables = ["stats", "partidos", "jugadores", "rivales", "torneos", "arbitros", "tecnicos", "posiciones"]
-    
-    if is_postgres(conn):
-        # Postgres: TRUNCATE vacía tablas y reinicia secuencias en cascada
-        try:
-            # Desactivar constraints temporalmente si fuera necesario, pero CASCADE suele bastar
-            for table in tables:
-                try:
-                    c.execute(f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE")
-                except Exception as e:
-                    print(f"Error truncating {table}: {e}")
-            conn.commit()
-        except Exception as e:
-            print(f"Error general limpiando DB Postgres: {e}")
-            conn.rollback()
-    else:
-        # SQLite: DELETE FROM + sqlite_sequence
-        for table in tables:
-            try:
-                c.execute(f"DELETE FROM {table}")
-                c.execute(f"DELETE FROM sqlite_sequence WHERE name='{table}'")
-            except: pass
-        conn.commit()
-        
-    conn.close()
-    print("Base de datos limpia para carga desde V3.")
-
-def migrate_posiciones(conn):
+def migrate_posiciones(conn, workbook, commit=True):
     print("Migrando Posiciones...")
-    df = pd.read_excel(EXCEL_FILE, sheet_name="Jugadores", header=1)
+    df = workbook.frame("Jugadores", header=1)
     df = df[df['APELLIDO'].notna() & (df['APELLIDO'] != 'APELLIDO')]
     posiciones = df['POS'].dropna().unique()
-    
-    c = conn.cursor()
-    ph = get_placeholder(conn)
-    ignore = get_ignore_clause(conn)
-    conflict = get_conflict_clause(conn)
-    
-    for pos in posiciones:
-        c.execute(f"INSERT {ignore} INTO posiciones (nombre) VALUES ({ph}) {conflict}", (str(pos).strip().upper(),))
-    conn.commit()
+    resolve_dimension(conn, "posiciones", ["nombre"], [(str(pos).strip().upper(),) for pos in posiciones])
+    if commit:
+        conn.commit()
 
-def migrate_jugadores(conn):
+def migrate_jugadores(conn, workbook, commit=True):
     print("Migrando Jugadores desde V3...")
-    df = pd.read_excel(EXCEL_FILE, sheet_name="Jugadores", header=1)
+    df = workbook.frame("Jugadores", header=1)
     df = df[df['APELLIDO'].notna()]
     
     c = conn.cursor()
@@ -86,7 +65,10 @@ def migrate_jugadores(conn):
     
     c.execute("SELECT id, nombre FROM posiciones")
     pos_map = {name: id for id, name in c.fetchall()}
+    c.execute("SELECT id_excel FROM jugadores")
+    existing = {row[0] for row in c.fetchall()}
     
+    fichas = {}  # id_excel -> ficha (si se repite un id_excel vale la última fila)
     for _, row in df.iterrows():
         id_excel = str(row.get('ID_Jugador', '')).strip()
         ap = str(row['APELLIDO']).strip()
@@ -118,42 +100,77 @@ def migrate_jugadores(conn):
             try: return int(float(v)) if pd.notna(v) else 0
             except: return 0
 
-        # Para Postgres, id_excel es UNIQUE, podríamos tener conflicto si re-corremos
-        # pero clean_database() ya limpió todo.
-        c.execute(f"""
-            INSERT INTO jugadores (
-                id_excel, nombre, apellido, id_posicion, 
-                pj_inicial, goles_marcados_inicial, goles_recibidos_inicial, 
-                asistencias_inicial, amarillas_inicial, rojas_inicial,
-                titular_inicial, suplente_inicial,
-                fecha_debut, rival_debut, resultado_debut, comentarios_gf
-            ) VALUES ({ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph})
-        """, (
+        fichas[id_excel] = (
             id_excel, nom, ap, id_pos,
             to_i(row.get('PJ')), g_marcados, g_recibidos,
             to_i(row.get('ASISTENCIAS')), to_i(row.get('AMARILLAS')), to_i(row.get('ROJAS')),
             to_i(row.get('TITULAR')), to_i(row.get('SUPLENTE')),
             f_debut, r_debut, res_debut, com_final
-        ))
-    conn.commit()
+        )
 
-def migrate_resultados(conn):
-    print("Migrando Resultados (Partidos detallados)...")
-    df = pd.read_excel(EXCEL_FILE, sheet_name="Resultados", header=1)
-    
+    columns = [
+        "id_excel", "nombre", "apellido", "id_posicion",
+        "pj_inicial", "goles_marcados_inicial", "goles_recibidos_inicial",
+        "asistencias_inicial", "amarillas_inicial", "rojas_inicial",
+        "titular_inicial", "suplente_inicial",
+        "fecha_debut", "rival_debut", "resultado_debut", "comentarios_gf",
+    ]
+    # Jugadores nuevos: carga masiva
+    bulk_insert(conn, "jugadores", columns, [f for key, f in fichas.items() if key not in existing])
+    # id_excel es UNIQUE: en una recarga incremental actualizamos la ficha existente
+    # y el jugador conserva su id (stats y totales siguen apuntando a él)
+    updates = [f for key, f in fichas.items() if key in existing]
+    if updates:
+        execute_many(conn, f"""
+            UPDATE jugadores SET {', '.join(f"{col} = {ph}" for col in columns[1:])}
+            WHERE id_excel = {ph}
+        """, [(*f[1:], f[0]) for f in updates])
+    if commit:
+        conn.commit()
+
+def resolve_dimension(conn, table, columns, values):
+    """
+    Inserta en bloque (bulk_insert) los valores distintos de una tabla de dimensión
+    (rivales, torneos, ...) que todavía no existen y retorna {valor: id}.
+    `values` son tuplas con una posición por cada columna de `columns`; si hay una sola
+    columna las claves del resultado son el valor suelto en lugar de la tupla.
+    """
     c = conn.cursor()
-    ph = get_placeholder(conn)
-    ignore = get_ignore_clause(conn)
-    conflict = get_conflict_clause(conn)
+    cols = ", ".join(columns)
+
+    def read_ids():
+        c.execute(f"SELECT id, {cols} FROM {table}")
+        return {tuple(row[1:]): row[0] for row in c.fetchall()}
+
+    ids = read_ids()
+    # Distintos y todavía no cargados, en orden de aparición (ids estables)
+    new = [v for v in dict.fromkeys(values) if v not in ids]
+    if new:
+        bulk_insert(conn, table, columns, new)
+        ids = read_ids()
+
+    if len(columns) == 1:
+        return {key[0]: id for key, id in ids.items()}
+    return ids
+
+def migrate_resultados(conn, workbook, start=0, commit=True):
+    """
+    Carga los partidos de la hoja Resultados. Con `start` se saltean los primeros partidos
+    de la hoja (ya cargados) y solo se insertan los siguientes.
+    Retorna los ids de los partidos insertados, en el orden de la hoja.
+    """
+    print("Migrando Resultados (Partidos detallados)...")
+    df = workbook.frame("Resultados", header=1)
 
+    def clean_val(v): return int(v) if pd.notna(v) and str(v).replace('.','').isdigit() else 0
+    def clean_txt(v): return str(v).strip() if pd.notna(v) and str(v) != '--------' else None
+
+    # 1. Primera pasada: parseamos las filas y juntamos los valores de cada dimensión
+    rows = []
     for _, row in df.iterrows():
         rival_str = str(row.get('EQUIPO', '')).strip().upper()
         if not rival_str or rival_str == 'NAN' or rival_str == 'EQUIPO': continue
         
-        c.execute(f"INSERT {ignore} INTO rivales (nombre) VALUES ({ph}) {conflict}", (rival_str,))
-        c.execute(f"SELECT id FROM rivales WHERE nombre={ph}", (rival_str,))
-        rid = c.fetchone()[0]
-        
         t_nombre = str(row.get('TORNEO', 'Campeonato')).strip()
         m4 = re.search(r"(\d{4})", t_nombre)
         m2 = re.search(r"\b(\d{2})$| (\d{2})\b", t_nombre)
@@ -164,28 +181,13 @@ def migrate_resultados(conn):
             t_temp = "20" + año_corto
         else: t_temp = "Desconocida"
         
-        # Insertamos Torneo
-        c.execute(f"INSERT {ignore} INTO torneos (nombre, temporada) VALUES ({ph},{ph}) {conflict}", (t_nombre, t_temp))
-        c.execute(f"SELECT id FROM torneos WHERE nombre={ph} AND temporada={ph}", (t_nombre, t_temp))
-        tid = c.fetchone()[0]
-        
         # Árbitros
         arb_nom = str(row.get('ÁRBITRO', '')).strip()
-        aid = None
-        if arb_nom and arb_nom != 'nan' and arb_nom != '--------':
-            c.execute(f"INSERT {ignore} INTO arbitros (nombre) VALUES ({ph}) {conflict}", (arb_nom,))
-            c.execute(f"SELECT id FROM arbitros WHERE nombre={ph}", (arb_nom,))
-            try: aid = c.fetchone()[0]
-            except: pass
+        if not arb_nom or arb_nom == 'nan' or arb_nom == '--------': arb_nom = None
 
         # DTs
         dt_nom = str(row.get('DT', '')).strip()
-        tecid = None
-        if dt_nom and dt_nom != 'nan' and dt_nom != '--------':
-            c.execute(f"INSERT {ignore} INTO tecnicos (nombre) VALUES ({ph}) {conflict}", (dt_nom,))
-            c.execute(f"SELECT id FROM tecnicos WHERE nombre={ph}", (dt_nom,))
-            try: tecid = c.fetchone()[0]
-            except: pass
+        if not dt_nom or dt_nom == 'nan' or dt_nom == '--------': dt_nom = None
 
         res_str = str(row.get('RESULTADO', '0-0'))
         match = re.search(r"(\d+)-(\d+)", res_str)
@@ -194,182 +196,495 @@ def migrate_resultados(conn):
         cond = str(row.get('local/visitante', 'L')).strip().upper()
         nro_fecha = str(row.get('nro_fecha', row.get('fecha', ''))).strip()
         if nro_fecha == 'nan': nro_fecha = ''
-        
-        def clean_val(v): return int(v) if pd.notna(v) and str(v).replace('.','').isdigit() else 0
-        def clean_txt(v): return str(v).strip() if pd.notna(v) and str(v) != '--------' else None
-
-        c.execute(f"""
-            INSERT INTO partidos (
-                nro_fecha, id_torneo, id_rival, id_arbitro, id_tecnico, 
-                condicion, goles_favor, goles_contra, goles_detalle,
-                rojas_cava, rojas_rival, expulsados_nombres,
-                penales_favor, penales_favor_detalle,
-                penales_contra, penales_contra_detalle
-            ) VALUES ({ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph},{ph})
-        """, (
-            nro_fecha, tid, rid, aid, tecid,
-            cond[0] if cond else 'L', gf, gc, clean_txt(row.get('GOLES')),
+
+        rows.append((rival_str, (t_nombre, t_temp), arb_nom, dt_nom, (
+            nro_fecha, cond[0] if cond else 'L', gf, gc, clean_txt(row.get('GOLES')),
             clean_val(row.get('ROJAS VICTORIANO')), clean_val(row.get('ROJAS RIVALES')), 
             clean_txt(row.get('ROJAS')),
             clean_val(row.get('PENALES A FAVOR')), clean_txt(row.get('DESCRIPCIÓN PENALES A/F')),
             clean_val(row.get('PENALES EN CONTRA')), clean_txt(row.get('DESCRIPCIÓN PENALES E/C'))
+        )))
+
+    rows = rows[start:]
+    if not rows:
+        return []
+
+    # 2. Dimensiones: un insert en bloque y una lectura de ids por tabla
+    rival_ids = resolve_dimension(conn, "rivales", ["nombre"], [(r[0],) for r in rows])
+    torneo_ids = resolve_dimension(conn, "torneos", ["nombre", "temporada"], [r[1] for r in rows])
+    arbitro_ids = resolve_dimension(conn, "arbitros", ["nombre"], [(r[2],) for r in rows if r[2]])
+    tecnico_ids = resolve_dimension(conn, "tecnicos", ["nombre"], [(r[3],) for r in rows if r[3]])
+
+    # 3. Partidos en lote, en el mismo orden de la hoja. Los ids se generan en ese orden: ordenados
+    # (como los retorna insert_returning_ids) quedan en el orden de la hoja
+    batch = []
+    for rival_str, torneo, arb_nom, dt_nom, data in rows:
+        nro_fecha, *rest = data
+        batch.append((
+            nro_fecha, torneo_ids[torneo], rival_ids[rival_str],
+            arbitro_ids.get(arb_nom), tecnico_ids.get(dt_nom), *rest
         ))
-    conn.commit()
 
-def migrate_stats(conn):
+    # RETURNING: la carga incremental escribe con la app en línea (puede haber un save_match a la vez)
+    ids = insert_returning_ids(conn, "partidos", [
+        "nro_fecha", "id_torneo", "id_rival", "id_arbitro", "id_tecnico",
+        "condicion", "goles_favor", "goles_contra", "goles_detalle",
+        "rojas_cava", "rojas_rival", "expulsados_nombres",
+        "penales_favor", "penales_favor_detalle",
+        "penales_contra", "penales_contra_detalle",
+    ], batch)
+    if commit:
+        conn.commit()
+    return ids
+
+def normalize_name(text):
+    """
+    Normaliza un nombre para comparar: mayúsculas, sin tildes ni puntuación
+    y con espacios simples ('Ctral. Córdoba' -> 'CTRAL CORDOBA').
+    """
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode().upper()
+    return " ".join(re.findall(r"[A-Z0-9]+", text))
+
+def _is_abbreviation(short, full):
+    """True si `short` abrevia a `full`: misma inicial y sus letras en orden ('CTRAL' -> 'CENTRAL')."""
+    if not short or not full or short[0] != full[0]:
+        return False
+    rest = iter(full)
+    return all(ch in rest for ch in short)
+
+def _rival_matches(header_rival, rival):
+    """Compara un rival de encabezado con uno de la base (ambos normalizados)."""
+    if header_rival in rival or rival in header_rival:
+        return True
+    h_words, r_words = header_rival.split(), rival.split()
+    return len(h_words) == len(r_words) and all(_is_abbreviation(h, r) for h, r in zip(h_words, r_words))
+
+def parse_match_header(header):
+    """
+    Descompone un encabezado de partido de una hoja PLANTEL
+    ('FECHA 3: 1-0 VS CTRAL. CÓRDOBA (L)') en
+    (rival normalizado, (gf, gc) o None, nro de fecha o None, condición 'L'/'V' o None).
+    """
+    parts = header.split("VS")
+    rival_part = parts[1].strip() if len(parts) > 1 else header
+    rival_part = re.sub(r"\(.*\)", "", rival_part).strip() 
+    rival_part = re.sub(r"\d+-\d+", "", rival_part).strip() 
+    rival_part = re.sub(r"FECHA\s+\d+", "", rival_part).strip()
+    
+    score_match = re.search(r"(\d+)-(\d+)", header)
+    score = (int(score_match.group(1)), int(score_match.group(2))) if score_match else None
+    fecha_match = re.search(r"FECHA\s+(\d+)", header)
+    fecha = int(fecha_match.group(1)) if fecha_match else None
+    cond_match = re.search(r"\((L|V)\)", header)
+    condicion = cond_match.group(1) if cond_match else None
+    return normalize_name(rival_part), score, fecha, condicion
+
+class MatchIndex:
+    """
+    Índice en memoria de los partidos ya cargados, armado con una sola consulta por corrida,
+    para resolver los encabezados de las hojas PLANTEL sin volver a la base.
+    Los candidatos salen del par (rival, resultado); entre varios se prefiere, en este orden,
+    el de la temporada de la hoja, el de la misma fecha, el de la misma condición y el de menor id.
+    Las resoluciones se memorizan y los encabezados ambiguos o sin partido quedan registrados.
+    """
+
+    def __init__(self, conn):
+        c = conn.cursor()
+        c.execute("""
+            SELECT p.id, r.nombre, p.goles_favor, p.goles_contra, t.temporada, p.nro_fecha, p.condicion
+            FROM partidos p
+            JOIN rivales r ON p.id_rival = r.id
+            JOIN torneos t ON p.id_torneo = t.id
+            ORDER BY p.id
+        """)
+        self._by_score = {}  # (rival, gf, gc) -> [(id, temporada, nro_fecha, condicion), ...] ordenados por id
+        self._by_rival = {}  # rival -> ídem, para encabezados sin resultado legible
+        for m_id, r_name, gf, gc, temporada, nro_fecha, condicion in c.fetchall():
+            rival = normalize_name(r_name)
+            entry = (m_id, str(temporada), str(nro_fecha or ""), condicion)
+            self._by_score.setdefault((rival, gf, gc), []).append(entry)
+            self._by_rival.setdefault(rival, []).append(entry)
+        self._rival_names = {}  # rival de encabezado -> rivales de la base que lo matchean
+        self._resolved = {}
+        self.ambiguous = []  # (hoja, encabezado, ids candidatos)
+        self.unmatched = []  # (hoja, encabezado)
+
+    def _rivals_for(self, header_rival):
+        if header_rival not in self._rival_names:
+            self._rival_names[header_rival] = [r for r in self._by_rival if _rival_matches(header_rival, r)]
+        return self._rival_names[header_rival]
+
+    def resolve(self, header, sheet="", seasons=()):
+        """Retorna el id del partido de un encabezado (None si no hay ninguno)."""
+        key = (header, tuple(seasons))
+        if key not in self._resolved:
+            self._resolved[key] = self._resolve(header, sheet, seasons)
+        return self._resolved[key]
+
+    def _resolve(self, header, sheet, seasons):
+        rival_part, score, fecha, condicion = parse_match_header(header)
+        candidates = []
+        for rival in self._rivals_for(rival_part):
+            if score is not None:
+                candidates += self._by_score.get((rival, *score), [])
+            else:
+                candidates += self._by_rival[rival]
+        if seasons:
+            candidates = [m for m in candidates if m[1] in seasons]
+        if len(candidates) > 1 and fecha is not None:
+            candidates = [m for m in candidates if m[2] == f"F{fecha}"] or candidates
+        if len(candidates) > 1 and condicion is not None:
+            candidates = [m for m in candidates if m[3] == condicion] or candidates
+        candidates.sort()
+
+        if not candidates:
+            self.unmatched.append((sheet, header))
+            return None
+        if len(candidates) > 1:
+            self.ambiguous.append((sheet, header, [m[0] for m in candidates]))
+        return candidates[0][0]
+
+    def report(self):
+        """Imprime los encabezados que no se pudieron resolver de forma única."""
+        for sheet, header, ids in self.ambiguous:
+            print(f"    ⚠️ Encabezado ambiguo en {sheet}: '{header}' -> partidos {ids} (se usa {ids[0]})")
+        for sheet, header in self.unmatched:
+            print(f"    ⚠️ Encabezado sin partido en {sheet}: '{header}'")
+
+def plantel_sheets(workbook):
+    return [s for s in workbook.sheet_names if "PLANTEL" in s.upper()]
+
+def extract_plantel_sheet(workbook, sheet, jug_db, match_index):
+    """
+    Extrae y transforma una hoja PLANTEL sin tocar la base (puede correr en otro proceso).
+    Retorna un dict con el lote de stats `batch` [(id_partido, id_jugador, minutos, es_titular)],
+    los ids de partidos de la hoja y su huella / cantidad de filas.
+    """
+    # Temporadas que cubre la hoja ('Plantel 2019-2020' -> 2019 y 2020)
+    seasons = re.findall(r"\d{4}", sheet)
+    # La hoja se lee una sola vez: encabezados y datos salen de las mismas filas
+    rows = workbook.rows(sheet)
+    header_row = 0
+    for i, row in enumerate(rows[:10]):
+        if any("APELLIDO" in str(val).upper() for val in row):
+            header_row = i
+            break
+    
+    match_headers_row = header_row - 1
+    df_data = rows_to_frame(rows, header=header_row)
+    
+    batch_data = [] # Inicializamos lista para lote
+    filled_matches = []
+    curr = None
+    for val in rows[match_headers_row]:
+        v_str = str(val).upper()
+        if "FECHA" in v_str or "VS" in v_str:
+            curr = v_str
+        filled_matches.append(curr)
+        
+    col_to_match = {}
+    for idx, m_header in enumerate(filled_matches):
+        if not m_header: continue
+        m_id = match_index.resolve(m_header, sheet, seasons)
+        if m_id is not None:
+            col_to_match[idx] = m_id
+    
+    for _, row in df_data.iterrows():
+        nom = str(row.get('NOMBRE', '')).strip().upper()
+        ape = str(row.get('APELLIDO', '')).strip().upper()
+        jid = jug_db.get((nom, ape))
+        if not jid: continue
+        
+        for col_idx, mid in col_to_match.items():
+            if col_idx >= len(row): continue
+            val = row.iloc[col_idx]
+            if pd.isna(val) or str(val).strip() == "": continue
+            
+            v_str = str(val).strip().upper()
+            mins = 90 if v_str == 'X' else (int(v_str) if v_str.isdigit() else 0)
+            if mins >= 0:
+                is_starter = (mins > 45)
+                batch_data.append((mid, jid, mins, is_starter))
+
+    return {
+        'sheet': sheet,
+        'batch': batch_data,
+        'partidos': sorted(set(col_to_match.values())),
+        'fingerprint': workbook.fingerprints[sheet],
+        'row_count': workbook.row_counts[sheet],
+    }
+
+# Estado de cada proceso del pool: abrir el libro cuesta más que leer una hoja,
+# así que cada proceso lo abre una sola vez y lo reutiliza para todas sus tareas
+_worker_state = {}
+
+def _init_plantel_worker(source, jug_db, match_index):
+    _worker_state.update(workbook=Workbook(source), jug_db=jug_db, match_index=match_index)
+
+def _extract_plantel_worker(sheet):
+    # El índice del proceso es una copia: los encabezados problemáticos de esta hoja
+    # vuelven junto con el resultado para reportarlos desde el proceso principal
+    match_index = _worker_state['match_index']
+    match_index.ambiguous, match_index.unmatched = [], []
+    result = extract_plantel_sheet(_worker_state['workbook'], sheet, _worker_state['jug_db'], match_index)
+    return result, match_index.ambiguous, match_index.unmatched
+
+def migrate_stats(conn, workbook, sheets=None, previous=None, workers=None, commit=True):
+    """
+    Carga las stats de las hojas PLANTEL (todas, o solo las de `sheets`).
+    La extracción de cada hoja corre en un pool de `workers` procesos (por defecto ETL_WORKERS;
+    con 1, o una sola hoja, corre en este mismo proceso) y la carga se hace en una única transacción.
+    `previous` ({hoja: ids de partidos}) indica una recarga: antes de insertar se borran
+    las stats de los partidos que la hoja había cargado y de los que carga ahora.
+    Retorna {hoja: ids de partidos cuyas stats cargó}.
+    """
     print("Migrando Estadísticas (Planteles desde V3)...")
-    xls = pd.ExcelFile(EXCEL_FILE)
-    sheets = [s for s in xls.sheet_names if "PLANTEL" in s.upper()]
+    if sheets is None:
+        sheets = plantel_sheets(workbook)
+    if workers is None:
+        workers = ETL_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, len(sheets)))
     
     c = conn.cursor()
     ph = get_placeholder(conn)
-    ignore = get_ignore_clause(conn)
-    conflict = get_conflict_clause(conn)
     
     c.execute("SELECT id, nombre, apellido FROM jugadores")
     jug_db = {(row[1].upper(), row[2].upper()): row[0] for row in c.fetchall()}
+    match_index = MatchIndex(conn)
 
-    for sheet in sheets:
-        print(f"  Procesando {sheet}...")
-        df_raw = pd.read_excel(xls, sheet_name=sheet, header=None, nrows=10)
-        header_row = 0
-        for i, row in df_raw.iterrows():
-            if "APELLIDO" in str(row.values).upper():
-                header_row = i
-                break
-        
-        match_headers_row = header_row - 1
-        df_matches = pd.read_excel(xls, sheet_name=sheet, header=None, skiprows=match_headers_row, nrows=1)
-        df_data = pd.read_excel(xls, sheet_name=sheet, header=header_row)
-        
-        batch_data = [] # Inicializamos lista para lote
-        filled_matches = []
-        curr = None
-        for val in df_matches.values[0]:
-            v_str = str(val).upper()
-            if "FECHA" in v_str or "VS" in v_str:
-                curr = v_str
-            filled_matches.append(curr)
-            
-        col_to_match = {}
-        for idx, m_header in enumerate(filled_matches):
-            if not m_header: continue
-            
-            parts = m_header.split("VS")
-            rival_part = parts[1].strip() if len(parts) > 1 else m_header
-            rival_part = re.sub(r"\(.*\)", "", rival_part).strip() 
-            rival_part = re.sub(r"\d+-\d+", "", rival_part).strip() 
-            rival_part = re.sub(r"FECHA\s+\d+", "", rival_part).strip()
-            
-            score_match = re.search(r"(\d+)-(\d+)", m_header)
-            gf_h, gc_h = (int(score_match.group(1)), int(score_match.group(2))) if score_match else (None, None)
-            
-            c.execute("SELECT p.id, r.nombre, p.goles_favor, p.goles_contra FROM partidos p JOIN rivales r ON p.id_rival = r.id")
-            for m_id, r_name, p_gf, p_gc in c.fetchall():
-                if rival_part in r_name.upper() or r_name.upper() in rival_part:
-                    if gf_h is not None:
-                        if p_gf == gf_h and p_gc == gc_h:
-                            col_to_match[idx] = m_id
-                            break
-                    else:
-                        col_to_match[idx] = m_id
-        
-        for _, row in df_data.iterrows():
-            nom = str(row.get('NOMBRE', '')).strip().upper()
-            ape = str(row.get('APELLIDO', '')).strip().upper()
-            jid = jug_db.get((nom, ape))
-            if not jid: continue
-            
-            for col_idx, mid in col_to_match.items():
-                if col_idx >= len(row): continue
-                val = row.iloc[col_idx]
-                if pd.isna(val) or str(val).strip() == "": continue
-                
-                v_str = str(val).strip().upper()
-                mins = 90 if v_str == 'X' else (int(v_str) if v_str.isdigit() else 0)
-                if mins >= 0:
-                    # Agregamos a la lista para insertar en lote
-                    # Postgres requiere True/False para columnas booleanas, no 1/0
-                    is_starter = (mins > 45)
-                    batch_data.append((mid, jid, mins, is_starter))
-        
-        if batch_data:
-            print(f"    Insertando lote de {len(batch_data)} registros...")
-            
-            # Determinamos si estamos en Postgres (para ajuste de tipos)
-            is_pg = is_postgres(conn)
-            if is_pg:
-                print("    [DEBUG] Modo Postgres activado para inserción.")
-            
-            # Ajuste final de tipos para garantizar compatibilidad
-            final_batch = []
-            for (mid, jid, mins, is_start_bool) in batch_data:
-                # Si es Postgres enviamos True/False nativo, si es SQLite enviamos 1/0
-                val_titular = bool(is_start_bool) if is_pg else (1 if is_start_bool else 0)
-                final_batch.append((mid, jid, mins, val_titular))
-
-            try:
-                # Query estándar
-                c.executemany(f"""
-                    INSERT {ignore} INTO stats (id_partido, id_jugador, minutos_jugados, es_titular)
-                    VALUES ({ph},{ph},{ph},{ph}) {conflict}
-                """, final_batch)
-                conn.commit() 
-            except Exception as e:
-                print(f"Error en batch insert: {e}")
-                conn.rollback() 
-        else:
-            print(f"    ⚠️ No se encontraron datos para insertar en {sheet} (Batch vacío).")
-                
-    conn.commit()
+    # 1. Extracción y transformación (CPU): una hoja por tarea
+    if workers == 1:
+        results = []
+        for sheet in sheets:
+            print(f"  Procesando {sheet}...")
+            results.append(extract_plantel_sheet(workbook, sheet, jug_db, match_index))
+    else:
+        print(f"  Procesando {len(sheets)} hojas en {workers} procesos...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_plantel_worker,
+                                 initargs=(workbook.source, jug_db, match_index)) as pool:
+            results = []
+            for result, ambiguous, unmatched in pool.map(_extract_plantel_worker, sheets):
+                match_index.ambiguous += ambiguous
+                match_index.unmatched += unmatched
+                # Huella registrada como si la hoja se hubiera leído acá (la usa save_etl_state)
+                workbook.fingerprints[result['sheet']] = result['fingerprint']
+                workbook.row_counts[result['sheet']] = result['row_count']
+                results.append(result)
+
+    # 2. Carga: todas las hojas en una sola transacción
+    # Postgres requiere True/False para columnas booleanas, no 1/0
+    is_pg = is_postgres(conn)
+    final_batch = {}  # (id_partido, id_jugador) -> fila; si se repite vale la primera
+    replaced = set()
+    for result in results:
+        if not result['batch']:
+            print(f"    ⚠️ No se encontraron datos para insertar en {result['sheet']} (Batch vacío).")
+        for (mid, jid, mins, is_start) in result['batch']:
+            final_batch.setdefault((mid, jid), (mid, jid, mins, bool(is_start) if is_pg else (1 if is_start else 0)))
+        if previous is not None:
+            replaced |= set(previous.get(result['sheet'], [])) | set(result['partidos'])
+
+    try:
+        if replaced:
+            replaced = sorted(replaced)
+            c.execute(f"DELETE FROM stats WHERE id_partido IN ({', '.join([ph] * len(replaced))})", replaced)
+        # La carga masiva no ignora duplicados: descartamos los pares que ya tienen stats
+        # (otra hoja que no se recargó puede haber cargado el mismo partido)
+        partidos = sorted({mid for mid, _ in final_batch})
+        if partidos:
+            c.execute(f"SELECT id_partido, id_jugador FROM stats WHERE id_partido IN ({', '.join([ph] * len(partidos))})", partidos)
+            for key in c.fetchall():
+                final_batch.pop(tuple(key), None)
+        if final_batch:
+            print(f"    Insertando lote de {len(final_batch)} registros...")
+            bulk_insert(conn, "stats", ["id_partido", "id_jugador", "minutos_jugados", "es_titular"],
+                        list(final_batch.values()))
+        if commit:
+            conn.commit()
+    except Exception as e:
+        # Se propaga: en la recarga completa main() descarta el staging en lugar de publicarlo
+        print(f"Error en batch insert: {e}")
+        conn.rollback()
+        raise
+
+    match_index.report()
     # Verificación final
     try:
         c.execute("SELECT count(*) FROM stats")
         count = c.fetchone()[0]
         print(f"✅ Migración de Stats finalizada. Total registros en DB: {count}")
     except: pass
+    return {result['sheet']: result['partidos'] for result in results}
+
+SCORER_COUNT_RE = re.compile(r'\(?\bX\s*(\d+)\)?')
+
+class ScorerMatcher:
+    """
+    Índice de apellidos para atribuir goles: cada apellido normalizado (sin tildes, en tokens)
+    se indexa por su primera palabra, así resolver un fragmento ('Nahuel Gómez (x2)') es una
+    pasada lineal por sus palabras. Entre varios jugadores posibles se prefiere el del apellido
+    más largo ('SOTO DUARTE' antes que 'SOTO') y luego el que además coincide en el nombre.
+    """
 
-def parse_goals_from_results(conn):
+    def __init__(self, jugadores):
+        self._index = {}  # primera palabra del apellido -> [(palabras del apellido, palabras del nombre, id)]
+        for jid, nombre, apellido in jugadores:
+            surname = normalize_name(apellido).split()
+            if surname:
+                self._index.setdefault(surname[0], []).append((surname, set(normalize_name(nombre).split()), jid))
+
+    def match(self, fragment, players=None):
+        """
+        Retorna (id, candidatos) para un fragmento de goles_detalle. Con `players`
+        solo se consideran esos ids (los que jugaron el partido). Si no hay una única
+        mejor opción el id es None y `candidatos` trae los empatados.
+        """
+        tokens = normalize_name(fragment).split()
+        scored = {}
+        for i, token in enumerate(tokens):
+            for surname, first_names, jid in self._index.get(token, ()):
+                if players is not None and jid not in players: continue
+                if tokens[i:i + len(surname)] == surname:
+                    score = (len(surname), bool(first_names & set(tokens)))
+                    scored[jid] = max(scored.get(jid, score), score)
+        if not scored:
+            return None, []
+        best = max(scored.values())
+        candidates = sorted(jid for jid, score in scored.items() if score == best)
+        return (candidates[0] if len(candidates) == 1 else None), candidates
+
+def parse_goals_from_results(conn, match_ids=None, commit=True):
+    """
+    Asigna los goles de cada partido (o solo de `match_ids`) a partir de su detalle de goleadores.
+    Cada nombre se busca primero entre los jugadores que tienen stats en ese partido y, si no
+    aparece, en todo el plantel. Las escrituras van en un único upsert en lote y al final se
+    reportan los nombres que no se pudieron atribuir.
+    """
     print("Parsing goleadores detallados desde Resultados...")
     c = conn.cursor()
     ph = get_placeholder(conn)
     
-    c.execute("SELECT id, goles_favor, goles_detalle FROM partidos WHERE goles_favor > 0")
+    match_filter = ""
+    params = []
+    if match_ids is not None:
+        params = sorted(match_ids)
+        if not params: return
+        match_filter = f" AND p.id IN ({', '.join([ph] * len(params))})"
+    c.execute(f"SELECT p.id, p.goles_detalle FROM partidos p WHERE p.goles_favor > 0{match_filter}", params)
     matches = c.fetchall()
     
-    c.execute("SELECT id, apellido FROM jugadores")
-    jugadores = {row[1].upper(): row[0] for row in c.fetchall()}
+    # Jugadores de cada partido (una sola consulta)
+    c.execute(f"SELECT s.id_partido, s.id_jugador FROM stats s JOIN partidos p ON p.id = s.id_partido WHERE p.goles_favor > 0{match_filter}", params)
+    players_by_match = {}
+    for mid, jid in c.fetchall():
+        players_by_match.setdefault(mid, set()).add(jid)
     
-    for mid, gf, detalle in matches:
+    c.execute("SELECT id, nombre, apellido FROM jugadores")
+    matcher = ScorerMatcher(c.fetchall())
+    
+    goals = {}  # (id_partido, id_jugador) -> goles
+    unresolved = []
+    for mid, detalle in matches:
         if not detalle or detalle == '--------': continue
         
-        parts = re.split(r' y |,|\s-\s', detalle)
+        parts = re.split(r' y |,|\s-\s', detalle, flags=re.I)
         for part in parts:
             part = part.strip().upper()
             if not part: continue
             
+            # Goles múltiples: '(X2)', 'X2' o 'X 2'
             count = 1
-            m = re.search(r'\(X(\d+)\)', part)
+            m = SCORER_COUNT_RE.search(part)
             if m:
                 count = int(m.group(1))
-                part = re.sub(r'\(X\d+\)', '', part).strip()
+                part = SCORER_COUNT_RE.sub('', part).strip()
             
-            found_jid = None
-            for apellido, jid in jugadores.items():
-                if apellido in part:
-                    found_jid = jid
-                    break
+            found_jid, candidates = matcher.match(part, players_by_match.get(mid, set()))
+            if found_jid is None and not candidates:
+                found_jid, candidates = matcher.match(part)
             
             if found_jid:
-                # Actualizamos la estadística del jugador para ese partido
-                c.execute(f"SELECT 1 FROM stats WHERE id_partido={ph} AND id_jugador={ph}", (mid, found_jid))
-                if not c.fetchone():
-                    c.execute(f"INSERT INTO stats (id_partido, id_jugador, goles_marcados) VALUES ({ph},{ph},{ph})", 
-                              (mid, found_jid, count))
-                else:
-                    c.execute(f"UPDATE stats SET goles_marcados = {ph} WHERE id_partido={ph} AND id_jugador={ph}",
-                              (count, mid, found_jid))
-    conn.commit()
+                goals[(mid, found_jid)] = goals.get((mid, found_jid), 0) + count
+            else:
+                unresolved.append((mid, part, candidates))
+
+    # Actualizamos la estadística de cada goleador (o la creamos si no figuraba en el plantel)
+    if goals:
+        execute_many(conn, f"""
+            INSERT INTO stats (id_partido, id_jugador, goles_marcados) VALUES ({ph},{ph},{ph})
+            ON CONFLICT (id_partido, id_jugador) DO UPDATE SET goles_marcados = excluded.goles_marcados
+        """, [(mid, jid, count) for (mid, jid), count in goals.items()])
+    if commit:
+        conn.commit()
+
+    print(f"  {sum(goals.values())} goles atribuidos en {len(matches)} partidos.")
+    for mid, part, candidates in unresolved:
+        detail = f"ambiguo entre jugadores {candidates}" if candidates else "sin jugador"
+        print(f"    ⚠️ Goleador sin resolver en partido {mid}: '{part}' ({detail})")
+
+def rebuild_player_totals(conn, commit=True):
+    """
+    Reconstruye en bloque la tabla player_totals (saldos iniciales + acumulado de stats)
+    con un único INSERT ... SELECT agrupado.
+    """
+    print("Reconstruyendo totales por jugador...")
+    c = conn.cursor()
+    c.execute("DELETE FROM player_totals")
+    c.execute("""
+        INSERT INTO player_totals (
+            id_jugador,
+            pj_inicial, goles_marcados_inicial, goles_recibidos_inicial, asistencias_inicial,
+            amarillas_inicial, rojas_inicial, titular_inicial, suplente_inicial,
+            pj, titular, minutos_jugados, goles_marcados, goles_recibidos, asistencias, amarillas, rojas
+        )
+        SELECT j.id,
+               COALESCE(j.pj_inicial, 0), COALESCE(j.goles_marcados_inicial, 0), COALESCE(j.goles_recibidos_inicial, 0),
+               COALESCE(j.asistencias_inicial, 0), COALESCE(j.amarillas_inicial, 0), COALESCE(j.rojas_inicial, 0),
+               COALESCE(j.titular_inicial, 0), COALESCE(j.suplente_inicial, 0),
+               COALESCE(s.pj, 0), COALESCE(s.titular, 0), COALESCE(s.minutos_jugados, 0), COALESCE(s.goles_marcados, 0),
+               COALESCE(s.goles_recibidos, 0), COALESCE(s.asistencias, 0), COALESCE(s.amarillas, 0), COALESCE(s.rojas, 0)
+        FROM jugadores j
+        LEFT JOIN (
+            SELECT id_jugador,
+                   COUNT(*) AS pj,
+                   SUM(CASE WHEN es_titular THEN 1 ELSE 0 END) AS titular,
+                   SUM(minutos_jugados) AS minutos_jugados,
+                   SUM(goles_marcados) AS goles_marcados,
+                   SUM(goles_recibidos) AS goles_recibidos,
+                   SUM(asistencias) AS asistencias,
+                   SUM(amarillas) AS amarillas,
+                   SUM(rojas) AS rojas
+            FROM stats
+            GROUP BY id_jugador
+        ) s ON s.id_jugador = j.id
+    """)
+    if commit:
+        conn.commit()
+
+def rebuild_player_rollup(conn, commit=True):
+    """
+    Reconstruye en bloque la tabla player_rollup (suma de stats por jugador y torneo,
+    con la temporada del torneo) con un único INSERT ... SELECT agrupado.
+    """
+    print("Reconstruyendo acumulados por torneo...")
+    c = conn.cursor()
+    c.execute("DELETE FROM player_rollup")
+    c.execute("""
+        INSERT INTO player_rollup (
+            id_torneo, id_jugador, temporada,
+            minutos_jugados, goles_marcados, goles_recibidos, asistencias, amarillas, rojas
+        )
+        SELECT p.id_torneo, s.id_jugador, t.temporada,
+               COALESCE(SUM(s.minutos_jugados), 0), COALESCE(SUM(s.goles_marcados), 0),
+               COALESCE(SUM(s.goles_recibidos), 0), COALESCE(SUM(s.asistencias), 0),
+               COALESCE(SUM(s.amarillas), 0), COALESCE(SUM(s.rojas), 0)
+        FROM stats s
+        JOIN partidos p ON p.id = s.id_partido
+        JOIN torneos t ON t.id = p.id_torneo
+        GROUP BY p.id_torneo, s.id_jugador, t.temporada
+    """)
+    if commit:
+        conn.commit()
 
 def seed_admin_user(conn):
     """
@@ -386,19 +701,184 @@ def seed_admin_user(conn):
               ('admin', 'cava2024'))
     conn.commit()
 
-def main():
-    clean_database()
+def record_load_metadata(conn, commit=True):
+    """Registra en db_metadata la fecha de la carga y las filas resultantes (lo lee la app al arrancar)."""
+    c = conn.cursor()
+    values = {"ultima_carga": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    for table in ("partidos", "stats", "jugadores"):
+        c.execute(f"SELECT COUNT(*) FROM {table}")
+        values[f"filas_{table}"] = c.fetchone()[0]
+    write_db_metadata(conn, values)
+    if commit:
+        conn.commit()
+
+def load_etl_state(conn):
+    """Retorna {hoja: (huella, filas, ids de partidos)} de la última carga registrada."""
+    c = conn.cursor()
+    c.execute("SELECT hoja, huella, filas, partidos FROM etl_state")
+    return {
+        hoja: (huella, filas, [int(i) for i in partidos.split(",") if i] if partidos else [])
+        for hoja, huella, filas, partidos in c.fetchall()
+    }
+
+def save_etl_state(conn, workbook, partidos_por_hoja, full=False, commit=True):
+    """
+    Registra la huella de las hojas de `partidos_por_hoja` ({hoja: ids de partidos}).
+    Con full=True reemplaza el estado completo (después de una recarga desde cero).
+    """
+    c = conn.cursor()
+    ph = get_placeholder(conn)
+    if full:
+        c.execute("DELETE FROM etl_state")
+    execute_many(conn, f"""
+        INSERT INTO etl_state (hoja, huella, filas, partidos, actualizada_en)
+        VALUES ({ph}, {ph}, {ph}, {ph}, CURRENT_TIMESTAMP)
+        ON CONFLICT (hoja) DO UPDATE SET
+            huella = excluded.huella, filas = excluded.filas,
+            partidos = excluded.partidos, actualizada_en = excluded.actualizada_en
+    """, [
+        (hoja, workbook.fingerprints[hoja], workbook.row_counts[hoja],
+         ",".join(str(i) for i in ids))
+        for hoja, ids in partidos_por_hoja.items()
+    ])
+    if commit:
+        conn.commit()
+
+def run_incremental(conn, workbook, workers=None):
+    """
+    Recarga solo las hojas cuyo contenido cambió desde la última carga (según etl_state),
+    sin tocar el resto de los datos ni sus ids:
+      - Resultados: solo se admiten partidos agregados al final; se insertan los nuevos.
+      - Jugadores: posiciones nuevas y fichas actualizadas por id_excel.
+      - PLANTEL: se reemplazan las stats de los partidos de la hoja.
+    Retorna False si hace falta una recarga completa (sin estado previo, hojas eliminadas
+    o cambios en Resultados que no son solo partidos nuevos).
+    Todo va en una única transacción, confirmada recién junto con etl_state: si la carga
+    falla no queda nada a medias (ni partidos insertados que un reintento volvería a
+    insertar) y las lecturas no ven stats nuevas con totales viejos.
+    """
+    try:
+        done = _run_incremental(conn, workbook, workers)
+        conn.commit()
+        return done
+    except Exception:
+        conn.rollback()
+        raise
+
+def _run_incremental(conn, workbook, workers=None):
+    """Cuerpo de run_incremental: escribe sin hacer commit."""
+    state = load_etl_state(conn)
+    if "Resultados" not in state or any(hoja not in workbook.sheet_names for hoja in state):
+        return False
+
+    changed = {}
+    goal_matches = set()
+
+    # 1. Resultados (primero: las hojas PLANTEL pueden referenciar los partidos nuevos)
+    rows = workbook.rows("Resultados")
+    huella, filas, ids = state["Resultados"]
+    if workbook.fingerprints["Resultados"] != huella:
+        if len(rows) < filas or sheet_fingerprint(rows[:filas]) != huella:
+            print("  Resultados tiene cambios en partidos ya cargados.")
+            return False
+        new_ids = migrate_resultados(conn, workbook, start=len(ids), commit=False)
+        print(f"  {len(new_ids)} partidos nuevos.")
+        changed["Resultados"] = ids + new_ids
+        goal_matches.update(new_ids)
+
+    # 2. Jugadores
+    workbook.rows("Jugadores")
+    if workbook.fingerprints["Jugadores"] != state.get("Jugadores", (None,))[0]:
+        migrate_posiciones(conn, workbook, commit=False)
+        migrate_jugadores(conn, workbook, commit=False)
+        changed["Jugadores"] = []
+        goal_matches = None  # Goleadores se resuelven por apellido: se reprocesan todos
+
+    # 3. PLANTEL
+    sheets = []
+    for sheet in plantel_sheets(workbook):
+        workbook.rows(sheet)
+        if workbook.fingerprints[sheet] != state.get(sheet, (None,))[0]:
+            sheets.append(sheet)
+    if sheets:
+        previous = {sheet: state.get(sheet, (None, 0, []))[2] for sheet in sheets}
+        loaded = migrate_stats(conn, workbook, sheets, previous, workers=workers, commit=False)
+        changed.update(loaded)
+        if goal_matches is not None:
+            for sheet in sheets:
+                goal_matches.update(previous[sheet])
+                goal_matches.update(loaded[sheet])
+
+    if not changed:
+        print("✅ Sin cambios en el Excel desde la última carga.")
+        return True
+
+    print(f"  Hojas recargadas: {', '.join(changed)}")
+    parse_goals_from_results(conn, goal_matches, commit=False)
+    rebuild_player_totals(conn, commit=False)
+    rebuild_player_rollup(conn, commit=False)
+    bump_data_versions(conn, ["global"])
+    save_etl_state(conn, workbook, changed, commit=False)
+    record_load_metadata(conn, commit=False)
+    print("✅ ETL incremental finalizado.")
+    return True
+
+def main(incremental=False, workers=None, source=None, progress=None):
+    """
+    Corre el ETL sobre `source` (ruta del Excel o su contenido en bytes; por defecto EXCEL_FILE).
+    `progress(etapa)` se llama al comenzar cada etapa de ETL_STAGES de una recarga completa.
+    """
+    if source is None:
+        source = EXCEL_FILE
+    if progress is None:
+        progress = lambda etapa: None
+    apply_migrations()
+    if incremental:
+        conn = get_connection()
+        workbook = Workbook(source)
+        try:
+            if run_incremental(conn, workbook, workers):
+                return
+            print("⚠️ No se puede cargar de forma incremental: se hace una recarga completa.")
+        finally:
+            workbook.close()
+            conn.close()
+
+    # Recarga completa: se arma en staging y se publica de una vez, así la app
+    # sigue mostrando los datos anteriores (completos) mientras dura la carga
     conn = get_connection()
+    workbook = Workbook(source)
+    staging = open_staging(conn)
     try:
-        migrate_posiciones(conn)
-        migrate_jugadores(conn)
-        migrate_resultados(conn)
-        migrate_stats(conn)
-        parse_goals_from_results(conn)
+        progress("posiciones")
+        migrate_posiciones(staging, workbook)
+        progress("jugadores")
+        migrate_jugadores(staging, workbook)
+        progress("resultados")
+        partidos = migrate_resultados(staging, workbook)
+        progress("stats")
+        loaded = migrate_stats(staging, workbook, workers=workers)
+        index_staging(conn, staging)
+        progress("goles")
+        parse_goals_from_results(staging)
+        rebuild_player_totals(staging)
+        rebuild_player_rollup(staging)
+        save_etl_state(staging, workbook, {"Resultados": partidos, "Jugadores": [], **loaded}, full=True)
+        progress("publicacion")
+        print("Publicando la carga...")
+        publish_staging(conn, staging)
+        record_load_metadata(conn)
         seed_admin_user(conn)
         print("✅ ETL Finalizado con éxito (Goles detallados incluidos).")
+    except Exception:
+        discard_staging(conn, staging)
+        raise
     finally:
+        workbook.close()
         conn.close()
 
 if __name__ == "__main__":
-    main()
+    workers = None
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    main(incremental="--incremental" in sys.argv, workers=workers)
@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import db_config
+from db_config import is_postgres, bump_data_versions, reset_sequences
+
+# Tablas que el ETL completo vuelve a cargar desde cero (en orden de borrado: hijas primero).
+# usuarios, data_versions y schema_migrations quedan como están en la base en uso.
+STAGED_TABLES = ["player_rollup", "player_totals", "stats", "partidos", "jugadores", "rivales", "torneos",
+                 "arbitros", "tecnicos", "posiciones", "etl_state"]
+
+# SQLite: la carga se arma en un archivo aparte junto a la base en uso
+SHADOW_SUFFIX = ".etl"
+SQLITE_BULK_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",        # Sin journal: si la carga falla el archivo se descarta
+    "PRAGMA synchronous = OFF",         # Sin fsync en cada commit
+    "PRAGMA locking_mode = EXCLUSIVE",  # Nadie más abre el archivo de staging
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Postgres: la carga se arma en un schema aparte
+STAGING_SCHEMA = "etl_staging"
+
+def shadow_path():
+    return db_config.DB_NAME + SHADOW_SUFFIX
+
+def open_staging(conn):
+    """
+    Prepara un área de staging vacía con la estructura de STAGED_TABLES y retorna la
+    conexión sobre la que debe correr la carga (las consultas del ETL no cambian):
+      - SQLite: un archivo nuevo (shadow_path) sin índices secundarios y con SQLITE_BULK_PRAGMAS.
+      - Postgres: el schema STAGING_SCHEMA (tablas sin índices hasta index_staging), con
+        search_path apuntando primero a él.
+    La base en uso no se toca hasta publish_staging().
+    """
+    if is_postgres(conn):
+        return _open_staging_postgres(conn)
+    return _open_staging_sqlite(conn)
+
+def index_staging(conn, staging):
+    """
+    (Postgres) Agrega a las tablas de staging sus PRIMARY KEY y UNIQUE, que usan los ON CONFLICT
+    de las etapas que siguen (goles, etl_state). Se llama después de la carga masiva de stats:
+    así el COPY no mantiene índices fila a fila. En SQLite no hace nada (las PK van en el CREATE TABLE).
+    """
+    if not is_postgres(conn):
+        return
+    c = conn.cursor()
+    for table in STAGED_TABLES:
+        c.execute("""
+            SELECT pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u')
+        """, (f"public.{table}",))
+        for (definition,) in c.fetchall():
+            c.execute(f"ALTER TABLE {STAGING_SCHEMA}.{table} ADD {definition}")
+    conn.commit()
+
+def publish_staging(conn, staging):
+    """
+    Reemplaza el contenido de STAGED_TABLES en la base en uso por el de staging en una única
+    transacción e invalida la caché de lecturas ('global'). Los lectores ven los datos
+    anteriores hasta el commit y los nuevos completos después; nunca tablas a medio cargar.
+    """
+    if is_postgres(conn):
+        _publish_postgres(conn)
+    else:
+        staging.commit()
+        staging.close()
+        _publish_sqlite(conn)
+    discard_staging(conn, staging)
+
+def discard_staging(conn, staging):
+    """Elimina el área de staging (después de publicarla o si la carga falló)."""
+    if is_postgres(conn):
+        conn.rollback()
+        c = conn.cursor()
+        c.execute(f"DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE")
+        c.execute("SET search_path TO DEFAULT")
+        conn.commit()
+    else:
+        staging.close()
+        if os.path.exists(shadow_path()):
+            os.remove(shadow_path())
+
+# ------------------------------------------------------------------------------
+# SQLite
+# ------------------------------------------------------------------------------
+
+def _open_staging_sqlite(conn):
+    if os.path.exists(shadow_path()):
+        os.remove(shadow_path())  # Restos de una carga anterior interrumpida
+
+    c = conn.cursor()
+    c.execute(f"SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(STAGED_TABLES))})",
+              STAGED_TABLES)
+    tables = [row[0] for row in c.fetchall()]
+
+    staging = sqlite3.connect(shadow_path())
+    for pragma in SQLITE_BULK_PRAGMAS:
+        staging.execute(pragma)
+    # Solo las tablas (con sus PK/UNIQUE, que usan los ON CONFLICT del ETL):
+    # los índices secundarios no hacen falta en staging
+    staging.executescript(";\n".join(tables) + ";")
+    return staging
+
+def _publish_sqlite(conn):
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS etl", (shadow_path(),))
+    try:
+        # BEGIN IMMEDIATE toma el lock de escritura al inicio; con WAL los lectores siguen leyendo
+        conn.execute("BEGIN IMMEDIATE")
+        for table in STAGED_TABLES:
+            conn.execute(f"DELETE FROM main.{table}")
+        # Los AUTOINCREMENT retoman desde el máximo id copiado (igual que una carga desde cero)
+        conn.execute(f"DELETE FROM main.sqlite_sequence WHERE name IN ({', '.join('?' * len(STAGED_TABLES))})",
+                     STAGED_TABLES)
+        for table in reversed(STAGED_TABLES):
+            conn.execute(f"INSERT INTO main.{table} SELECT * FROM etl.{table}")
+        bump_data_versions(conn, ["global"])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE etl")
+
+# ------------------------------------------------------------------------------
+# Postgres
+# ------------------------------------------------------------------------------
+
+def _open_staging_postgres(conn):
+    c = conn.cursor()
+    c.execute(f"DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE")
+    c.execute(f"CREATE SCHEMA {STAGING_SCHEMA}")
+    for table in STAGED_TABLES:
+        # Sin índices (ni los de PK/UNIQUE): los agrega index_staging() después de la carga masiva.
+        # Las columnas identity (las de Supabase) reciben una secuencia propia, desde 1
+        c.execute(f"""
+            CREATE TABLE {STAGING_SCHEMA}.{table}
+            (LIKE public.{table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY)
+        """)
+        # LIKE copia los DEFAULT nextval() de las columnas serial, que apuntan a las secuencias
+        # de public: cada tabla de staging numera con su propia secuencia, desde 1
+        c.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s AND column_default LIKE 'nextval(%%'
+        """, (table,))
+        for (column,) in c.fetchall():
+            seq = f"{STAGING_SCHEMA}.{table}_{column}_seq"
+            c.execute(f"CREATE SEQUENCE {seq} OWNED BY {STAGING_SCHEMA}.{table}.{column}")
+            c.execute(f"ALTER TABLE {STAGING_SCHEMA}.{table} ALTER COLUMN {column} SET DEFAULT nextval('{seq}')")
+    # El ETL usa nombres sin schema: las tablas de staging tapan a las de public
+    c.execute(f"SET search_path TO {STAGING_SCHEMA}, public")
+    conn.commit()
+    return conn
+
+def _publish_postgres(conn):
+    c = conn.cursor()
+    try:
+        # DELETE en lugar de TRUNCATE: TRUNCATE bloquea a los lectores hasta el commit
+        for table in STAGED_TABLES:
+            c.execute(f"DELETE FROM public.{table}")
+        for table in reversed(STAGED_TABLES):
+            c.execute(f"INSERT INTO public.{table} SELECT * FROM {STAGING_SCHEMA}.{table}")
+        reset_sequences(conn, STAGED_TABLES, schema="public")
+        bump_data_versions(conn, ["global"])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,114 @@
+import io
+import hashlib
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+class Workbook:
+    """
+    Lector del Excel para el ETL. Abre el libro una sola vez en modo read_only
+    (openpyxl va leyendo el XML de cada hoja a medida que se recorre, sin cargar el libro entero)
+    y recorre cada hoja una única vez.
+
+    Las filas de la última hoja leída quedan en memoria para que varios pasos del ETL la compartan
+    sin volver a parsearla (posiciones y jugadores leen ambos 'Jugadores'); al pedir otra hoja
+    la anterior se descarta, así nunca hay más de una hoja cargada a la vez.
+    De cada hoja leída quedan su huella en `fingerprints` (ver sheet_fingerprint) y su
+    cantidad de filas en `row_counts`.
+    """
+
+    def __init__(self, source):
+        """`source` puede ser la ruta del archivo o su contenido en bytes (ej. un archivo subido)."""
+        self.source = source
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        self._book = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False)
+        self.sheet_names = self._book.sheetnames
+        self._sheet = None
+        self._rows = None
+        self.fingerprints = {}
+        self.row_counts = {}
+
+    def rows(self, sheet):
+        """
+        Retorna las filas de la hoja como listas de valores, convertidos igual que en
+        pandas.read_excel: celdas vacías como "", números enteros como int y errores como NaN.
+        """
+        if sheet != self._sheet:
+            self._sheet, self._rows = None, None  # Liberamos la hoja anterior antes de leer la nueva
+            self._rows = _read_sheet(self._book[sheet])
+            self._sheet = sheet
+            self.fingerprints[sheet] = sheet_fingerprint(self._rows)
+            self.row_counts[sheet] = len(self._rows)
+        return self._rows
+
+    def frame(self, sheet, header=0):
+        """
+        DataFrame de la hoja tomando la fila `header` como encabezado,
+        equivalente a pd.read_excel(archivo, sheet_name=sheet, header=header).
+        """
+        return rows_to_frame(self.rows(sheet), header)
+
+    def close(self):
+        self._sheet, self._rows = None, None
+        self._book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _convert_cell(cell):
+    # Misma conversión que el lector openpyxl de pandas
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+def _read_sheet(ws):
+    # Las hojas en modo read_only pueden traer mal calculadas sus dimensiones
+    ws.reset_dimensions()
+    data = []
+    last_row_with_data = -1
+    for row_number, row in enumerate(ws.iter_rows()):
+        converted = [_convert_cell(cell) for cell in row]
+        while converted and converted[-1] == "":
+            converted.pop()
+        if converted:
+            last_row_with_data = row_number
+        data.append(converted)
+    data = data[:last_row_with_data + 1]
+
+    # Todas las filas con el mismo ancho (el de la fila más larga)
+    width = max((len(row) for row in data), default=0)
+    return [row + [""] * (width - len(row)) for row in data]
+
+def sheet_fingerprint(rows):
+    """
+    Huella (sha256) del contenido de una hoja ya leída. No depende del ancho con que se
+    rellenaron las filas, así la huella de las primeras N filas no cambia si se agregan filas
+    más anchas al final (lo usa el ETL incremental para detectar partidos agregados).
+    """
+    digest = hashlib.sha256()
+    for row in rows:
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        digest.update(repr(row).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def rows_to_frame(rows, header=0):
+    """Arma un DataFrame a partir de filas ya leídas, con las mismas reglas de tipos que read_excel."""
+    if not rows:
+        return pd.DataFrame()
+    return TextParser(rows, header=header).read()
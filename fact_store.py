@@ -0,0 +1,437 @@
+import copy
+import threading
+import numpy as np
+import pandas as pd
+from db_config import db_connection, get_placeholder
+
+# Columnas numéricas de stats que se guardan en memoria y en player_rollup (las que suman los rankings)
+STAT_COLUMNS = ("minutos_jugados", "goles_marcados", "goles_recibidos", "asistencias", "amarillas", "rojas")
+
+# Alcances de data_versions que obligan a recargar todo (con 'partidos' alcanza con agregar)
+FULL_RELOAD_SCOPES = ("global", "jugadores", "rivales")
+
+# Dimensiones de FactData.pivot (mismos nombres que cava_functions.PIVOT_DIMENSIONS)
+PIVOT_DIMENSIONS = ("tecnico", "rival", "arbitro", "torneo", "temporada", "condicion")
+
+# Columnas de stats que tienen saldo inicial en jugadores (<columna>_inicial)
+INITIAL_COLUMNS = ("goles_marcados", "goles_recibidos")
+
+def _effectiveness(by):
+    """
+    (PTS, Efectividad) de un récord de record_by: puntos y porcentaje de los posibles con un
+    decimal, 0 sin partidos. Mismas cuentas que las versiones en pandas de cava_functions.
+    """
+    pts = by["PG"] * 3 + by["PE"]
+    efectividad = np.zeros(len(pts))
+    played = by["PJ"] > 0
+    efectividad[played] = np.round(pts[played] / (by["PJ"][played] * 3) * 100, 1)
+    return pts, efectividad
+
+def _label_rank(labels):
+    """
+    Posición de cada etiqueta en orden alfabético, con None primero (como el sort_values de
+    get_pivot): las etiquetas iguales comparten posición.
+    """
+    keys = [(label is not None, "" if label is None else label) for label in labels]
+    position = {key: i for i, key in enumerate(sorted(set(keys)))}
+    return np.array([position[key] for key in keys], dtype=np.int64)
+
+class FactData:
+    """
+    Foto de partidos y stats en arrays de NumPy (una posición por partido), con las
+    dimensiones como códigos enteros. Las consultas son máscaras y bincount sobre estos
+    arrays y nunca los modifican.
+    Las stats se guardan sumadas en un cubo jugador x torneo por columna (el equivalente
+    en memoria de player_rollup), del que salen los rankings.
+    Los partidos nuevos se agregan con extended(), sin volver a armar lo ya cargado.
+    """
+
+    def __init__(self, torneos, rivales, tecnicos, arbitros, jugadores, partidos, stats):
+        # Dimensiones (DataFrames chicos, indexados por id)
+        self.torneos = torneos
+        self.rivales = rivales
+        self.tecnicos = tecnicos
+        self.arbitros = arbitros
+        self.jugadores = jugadores
+
+        # Torneos (código = posición en orden de id) y su temporada
+        self.torneo_ids = torneos.index.to_numpy(np.int64)
+        self.torneo_temporadas = torneos["temporada"].astype(str).to_numpy(object)
+        self.temporadas, self.temporada_code = np.unique(self.torneo_temporadas, return_inverse=True)
+        # Condiciones cargadas ("" = sin condición); un partido con otra obliga a recargar (ver covers)
+        self.condiciones = np.unique(partidos["condicion"].fillna("").to_numpy(str)).astype(object)
+
+        # Nombres por código, listos para armar los resultados (técnico: el código 0 es "sin DT")
+        self.tecnico_nombres = np.array([None, *tecnicos["nombre"]], dtype=object)
+        self.arbitro_nombres = np.array([None, *arbitros["nombre"]], dtype=object)  # Ídem
+        self.rival_nombres = rivales["nombre"].to_numpy(object)
+        self.jugador_nombres = jugadores["Jugador"].to_numpy(object)
+        self.torneo_nombres = torneos["nombre"].to_numpy(object)
+        self.jugador_inicial = {col: jugadores[f"{col}_inicial"].to_numpy(np.int64) for col in INITIAL_COLUMNS}
+        # Rivales en el orden de get_head_to_head (por nombre)
+        self.rival_order = np.argsort(self.rival_nombres.astype(str), kind="stable")
+
+        # Partidos (ordenados por id): cada array es una vista de los primeros `size` lugares de su buffer
+        self._buffers = self._match_arrays(partidos)
+        self._set_size(len(self._buffers["partido_id"]))
+
+        # Cubo jugador x torneo por columna y su total por jugador (ranking histórico)
+        shape = (len(jugadores), len(torneos))
+        cell = self._stats_cells(stats)
+        self.cube = {col: np.bincount(cell, weights=stats[col].fillna(0).to_numpy(np.int64), minlength=shape[0] * shape[1])
+                            .astype(np.int64).reshape(shape)
+                     for col in STAT_COLUMNS}
+        self.cube_totals = {col: cube.sum(axis=1) for col, cube in self.cube.items()}
+
+    def _match_arrays(self, partidos):
+        """Arrays por partido de `partidos` (ordenados por id), con las dimensiones ya cargadas como códigos."""
+        partidos = partidos.sort_values("id")
+        return {
+            "partido_id": partidos["id"].to_numpy(np.int64),
+            "torneo_code": self.torneos.index.get_indexer(partidos["id_torneo"]).astype(np.int32),
+            "rival_code": self.rivales.index.get_indexer(partidos["id_rival"]).astype(np.int32),
+            # Técnico: código 0 = partido sin DT, de 1 en adelante los técnicos en orden de id
+            "tecnico_code": self.tecnicos.index.get_indexer(partidos["id_tecnico"].fillna(-1)).astype(np.int32) + 1,
+            "arbitro_code": self.arbitros.index.get_indexer(partidos["id_arbitro"].fillna(-1)).astype(np.int32) + 1,  # Ídem
+            "condicion_code": np.searchsorted(self.condiciones, partidos["condicion"].fillna("").to_numpy(object)).astype(np.int32),
+            "goles_favor": partidos["goles_favor"].fillna(0).to_numpy(np.int64),
+            "goles_contra": partidos["goles_contra"].fillna(0).to_numpy(np.int64),
+            "nro_fecha": partidos["nro_fecha"].to_numpy(object),
+        }
+
+    def _set_size(self, size):
+        self.size = size
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:size])
+
+    def _stats_cells(self, stats):
+        """Celda del cubo (aplanado) de cada fila de `stats`; sus partidos ya tienen que estar cargados."""
+        partido = np.searchsorted(self.partido_id, stats["id_partido"].to_numpy(np.int64))
+        jugador = self.jugadores.index.get_indexer(stats["id_jugador"]).astype(np.int64)
+        return jugador * len(self.torneos) + self.torneo_code[partido]
+
+    def extended(self, partidos, stats):
+        """
+        FactData con `partidos` (de id mayor a los cargados, ver covers) y sus `stats` agregados.
+        Comparte con este las dimensiones y los buffers de los arrays por partido: las filas
+        nuevas se escriben a continuación de las que este ve, que no cambian; si no entran se
+        pasan a un buffer del doble de capacidad. Al cubo se le suman solo las stats nuevas,
+        sobre una copia (cuesta jugadores x torneos, no lo que crece con el historial).
+        Solo se puede extender el último FactData, como hace FactStore.sync bajo su lock.
+        """
+        data = copy.copy(self)
+        size, added = self.size, len(partidos)
+        data._buffers = {}
+        for name, values in self._match_arrays(partidos).items():
+            buffer = self._buffers[name]
+            # Los buffers de la carga son los arrays de pandas (pueden ser de solo lectura)
+            if size + added > len(buffer) or not buffer.flags.writeable:
+                grown = np.empty(max(2 * len(buffer), size + added), dtype=buffer.dtype)
+                grown[:size] = buffer[:size]
+                buffer = grown
+            buffer[size:size + added] = values
+            data._buffers[name] = buffer
+        data._set_size(size + added)
+
+        cell = data._stats_cells(stats)
+        data.cube, data.cube_totals = {}, {}
+        for col in STAT_COLUMNS:
+            values = stats[col].fillna(0).to_numpy(np.int64)
+            cube, totals = self.cube[col].copy(), self.cube_totals[col].copy()
+            np.add.at(cube.reshape(-1), cell, values)
+            np.add.at(totals, cell // len(self.torneos), values)
+            data.cube[col], data.cube_totals[col] = cube, totals
+        return data
+
+    @property
+    def max_partido_id(self):
+        return int(self.partido_id[-1]) if self.size else 0
+
+    def covers(self, partidos, stats):
+        """True si todas las dimensiones que referencian `partidos` y `stats` ya están cargadas."""
+        return (partidos["id_torneo"].isin(self.torneos.index).all()
+                and partidos["id_rival"].isin(self.rivales.index).all()
+                and partidos["id_tecnico"].dropna().isin(self.tecnicos.index).all()
+                and partidos["id_arbitro"].dropna().isin(self.arbitros.index).all()
+                and partidos["condicion"].fillna("").isin(self.condiciones).all()
+                and stats["id_jugador"].isin(self.jugadores.index).all())
+
+    # --------------------------------------------------------------------------
+    # Filtros y agregados
+    # --------------------------------------------------------------------------
+
+    def torneo_mask(self, torneo_id=None, temporada=None):
+        """
+        Máscara de torneos con los mismos filtros que _match_filters de cava_functions
+        (None si no hay filtros).
+        """
+        mask = None
+        if torneo_id and torneo_id != "Todos":
+            mask = self.torneo_ids == int(torneo_id)
+        if temporada and temporada != "Todas":
+            by_temporada = self.torneo_temporadas == str(temporada)
+            mask = by_temporada if mask is None else mask & by_temporada
+        return mask
+
+    def mask(self, torneo_id=None, temporada=None):
+        """Máscara de partidos de los torneos filtrados."""
+        torneos = self.torneo_mask(torneo_id, temporada)
+        if torneos is None:
+            return np.ones(self.size, dtype=bool)
+        return torneos[self.torneo_code]
+
+    def condicion_mask(self, condicion):
+        """Máscara de partidos jugados con `condicion` ('L', 'V', ...)."""
+        code = np.flatnonzero(self.condiciones == condicion)
+        if not len(code):
+            return np.zeros(self.size, dtype=bool)
+        return self.condicion_code == code[0]
+
+    def dimension(self, name):
+        """(código por partido, etiqueta por código) de la dimensión `name` de PIVOT_DIMENSIONS."""
+        if name == "tecnico":
+            return self.tecnico_code, self.tecnico_nombres
+        if name == "rival":
+            return self.rival_code, self.rival_nombres
+        if name == "arbitro":
+            return self.arbitro_code, self.arbitro_nombres
+        if name == "torneo":
+            return self.torneo_code, self.torneo_nombres
+        if name == "temporada":
+            return self.temporada_code[self.torneo_code], self.temporadas
+        return self.condicion_code, np.where(self.condiciones == "", None, self.condiciones)
+
+    def _results(self, mask):
+        gf, gc = self.goles_favor[mask], self.goles_contra[mask]
+        return gf, gc, gf > gc, gf == gc, gf < gc
+
+    def match_record(self, torneo_id=None, temporada=None):
+        """Récord {pj, pg, pe, pp, gf, gc} de los partidos filtrados."""
+        gf, gc, won, drawn, lost = self._results(self.mask(torneo_id, temporada))
+        return {"pj": int(len(gf)), "pg": int(won.sum()), "pe": int(drawn.sum()), "pp": int(lost.sum()),
+                "gf": int(gf.sum()), "gc": int(gc.sum())}
+
+    def record_by(self, codes, size, mask):
+        """
+        PJ/PG/PE/PP/GF/GC de los partidos de `mask` por código de dimensión (códigos de 0 a
+        size-1). Retorna un dict de arrays de largo `size`.
+        """
+        codes = codes[mask]
+        gf, gc, won, drawn, lost = self._results(mask)
+
+        def count(weights=None):
+            return np.bincount(codes, weights=weights, minlength=size).astype(np.int64)
+        return {"PJ": count(), "PG": count(won), "PE": count(drawn), "PP": count(lost),
+                "GF": count(gf), "GC": count(gc)}
+
+    def dt_stats(self, torneo_id=None, temporada=None):
+        """
+        Tabla de get_dt_stats: récord por técnico (Tecnico, PJ, PG, PE, PP, GF, GC, PTS,
+        Efectividad) de los que dirigieron algún partido filtrado, por Efectividad y a igual
+        efectividad por PJ (de mayor a menor; después por id del técnico).
+        """
+        by = self.record_by(self.tecnico_code, len(self.tecnico_nombres), self.mask(torneo_id, temporada))
+        rows = np.flatnonzero(by["PJ"] > 0)
+        rows = rows[rows > 0]  # Sin los partidos sin DT (código 0)
+        by = {col: v[rows] for col, v in by.items()}
+        by["PTS"], by["Efectividad"] = _effectiveness(by)
+        order = np.lexsort((-by["PJ"], -by["Efectividad"]))
+        return pd.DataFrame({"Tecnico": self.tecnico_nombres[rows[order]], **{col: v[order] for col, v in by.items()}})
+
+    def player_totals(self, column, torneo_id=None, temporada=None, initial=False):
+        """
+        Array con la suma de `column` por jugador (en orden de id) en los torneos filtrados,
+        leída del cubo: el costo depende de jugadores x torneos, no de la cantidad de stats.
+        """
+        torneos = self.torneo_mask(torneo_id, temporada)
+        if torneos is None:
+            total = self.cube_totals[column]
+        else:
+            total = self.cube[column][:, torneos].sum(axis=1)
+        if initial:
+            total = total + self.jugador_inicial[column]
+        return total
+
+    def top_players(self, column, limit=10, torneo_id=None, temporada=None, initial=False):
+        """
+        Ranking (Jugador, Total) de los `limit` jugadores con mayor suma de `column`, sin los
+        que suman 0. Los empates se ordenan por id del jugador.
+        """
+        total = self.player_totals(column, torneo_id, temporada, initial)
+        candidates = total > 0
+        if 0 < limit < len(total):
+            # Selección parcial (O(n)): el valor del puesto `limit`; se ordenan solo los que lo alcanzan
+            candidates &= total >= np.partition(total, len(total) - limit)[len(total) - limit]
+        rows = np.flatnonzero(candidates)
+        rows = rows[np.argsort(-total[rows], kind="stable")][:limit]
+        return pd.DataFrame({"Jugador": self.jugador_nombres[rows], "Total": total[rows]})
+
+    def recent_form(self, limit=5, torneo_id=None, temporada=None):
+        """
+        Tabla de get_recent_form: los últimos `limit` partidos filtrados (por id) con
+        goles_favor, goles_contra, rival, nro_fecha y el ícono de Resultado (sin partidos,
+        sin esa columna), ordenados por fecha.
+        """
+        idx = np.flatnonzero(self.mask(torneo_id, temporada))[::-1][:limit]
+        gf, gc = self.goles_favor[idx], self.goles_contra[idx]
+        df = pd.DataFrame({
+            "goles_favor": gf,
+            "goles_contra": gc,
+            "rival": self.rival_nombres[self.rival_code[idx]],
+            "nro_fecha": self.nro_fecha[idx],
+        })
+        if df.empty:
+            return df
+        df["Resultado"] = np.select([gf > gc, gf == gc], ["✅", "➖"], "❌").astype(object)
+        return df.sort_values(by="nro_fecha")
+
+    def head_to_head(self):
+        """
+        Tabla de get_head_to_head: historial contra cada rival (ordenado por nombre) con las
+        mismas columnas que la consulta, más Efectividad y Último ('torneo fecha (gf-gc)').
+        """
+        size = len(self.rival_nombres)
+        order = self.rival_order
+        columns = {"id_rival": self.rivales.index.to_numpy()[order], "Rival": self.rival_nombres[order]}
+        by = self.record_by(self.rival_code, size, np.ones(self.size, dtype=bool))
+        columns.update({col: v[order] for col, v in by.items()})
+        for cond in ("L", "V"):
+            by = self.record_by(self.rival_code, size, self.condicion_mask(cond))
+            columns.update({f"{col}_{cond}": by[col][order] for col in ("PJ", "PG", "PE", "PP")})
+
+        # Último partido contra cada rival: el de mayor id (los arrays están ordenados por id)
+        last = np.full(size, -1, dtype=np.int64)
+        last[self.rival_code] = np.arange(self.size)
+        last = last[order]
+        played = last >= 0
+
+        def last_value(values):
+            out = np.full(size, None, dtype=object)
+            out[played] = values[last[played]]
+            return out
+        columns.update({
+            "ultimo_id": last_value(self.partido_id),
+            "ultima_fecha": last_value(self.nro_fecha),
+            "ultimo_torneo": last_value(self.torneo_nombres[self.torneo_code]),
+            "ultimo_gf": last_value(self.goles_favor),
+            "ultimo_gc": last_value(self.goles_contra),
+        })
+        columns["Efectividad"] = _effectiveness(columns)[1]
+        ultimo = np.full(size, "", dtype=object)
+        ultimo[played] = [f"{torneo} {fecha} ({gf}-{gc})" for torneo, fecha, gf, gc in zip(
+            columns["ultimo_torneo"][played], columns["ultima_fecha"][played],
+            columns["ultimo_gf"][played], columns["ultimo_gc"][played])]
+        columns["Último"] = ultimo
+        return pd.DataFrame(columns)
+
+    def pivot(self, dimensions, torneo_id=None, temporada=None):
+        """
+        Récord (PJ, PG, PE, PP, GF, GC, PTS, Efectividad) de los partidos filtrados agrupado
+        por `dimensions` (nombres de PIVOT_DIMENSIONS): una columna por dimensión con su
+        etiqueta (None para los partidos sin DT/árbitro/condición) y solo los grupos con
+        partidos, ordenados por las etiquetas como get_pivot.
+        Sin dimensiones retorna una única fila con el récord total.
+        """
+        # Clave de grupo por partido: los códigos de cada dimensión combinados en un entero
+        key = np.zeros(self.size, dtype=np.int64)
+        for dimension in dimensions:
+            codes, labels = self.dimension(dimension)
+            key = key * len(labels) + codes
+        if dimensions:
+            groups, group_code = np.unique(key, return_inverse=True)
+        else:
+            groups, group_code = np.zeros(1, dtype=np.int64), key  # Un único grupo
+        by = self.record_by(group_code.reshape(-1), len(groups), self.mask(torneo_id, temporada))
+        rows = np.flatnonzero(by["PJ"] > 0) if dimensions else np.arange(1)
+
+        # Etiquetas de cada grupo: se decodifican los códigos de la clave (en orden inverso)
+        keys, columns, ranks = groups[rows], {}, []
+        for dimension in reversed(dimensions):
+            codes, labels = self.dimension(dimension)
+            keys, code = np.divmod(keys, len(labels))
+            columns[dimension] = labels[code]
+            ranks.append(_label_rank(labels)[code])
+        by = {col: values[rows] for col, values in by.items()}
+        by["PTS"], by["Efectividad"] = _effectiveness(by)
+
+        # Por etiqueta, la primera dimensión primero (lexsort toma la última clave como principal)
+        order = np.lexsort(ranks) if ranks else np.arange(len(rows))
+        return pd.DataFrame({**{dimension: columns[dimension][order] for dimension in dimensions},
+                             **{col: values[order] for col, values in by.items()}})
+
+class FactStore:
+    """
+    Motor analítico en memoria para las lecturas del dashboard: carga partidos, stats y
+    dimensiones una vez y responde con operaciones vectorizadas, sin ir a la base.
+    `sync(versions)` lo mantiene al día con data_versions: si solo cambió 'partidos'
+    (un save_match) agrega los partidos nuevos; si cambió 'global' (ETL), 'jugadores' o
+    'rivales' recarga todo.
+    Es compartido por todas las sesiones del proceso: los refrescos son excluyentes y los
+    lectores siempre ven un FactData completo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.data = None
+        self._full_key = None
+        self._partidos_version = None
+
+    def sync(self, versions):
+        """Retorna el FactData al día con `versions` ({alcance: versión} de data_versions)."""
+        full_key = tuple(versions.get(scope, 0) for scope in FULL_RELOAD_SCOPES)
+        partidos_version = versions.get("partidos", 0)
+        if self.data is not None and full_key == self._full_key and partidos_version == self._partidos_version:
+            return self.data
+
+        with self._lock:
+            if self.data is None or full_key != self._full_key:
+                self.data = _load()
+            elif partidos_version != self._partidos_version:
+                self.data = _extend(self.data)
+            self._full_key, self._partidos_version = full_key, partidos_version
+        return self.data
+
+def _read_tables(conn, min_partido_id=None):
+    """Lee partidos y stats (todos, o solo los de id mayor a `min_partido_id`)."""
+    ph = get_placeholder(conn)
+    where, params = "", []
+    if min_partido_id is not None:
+        where, params = f" WHERE p.id > {ph}", [min_partido_id]
+    partidos = pd.read_sql(f"""
+        SELECT p.id, p.id_torneo, p.id_rival, p.id_tecnico, p.id_arbitro, p.condicion,
+               p.goles_favor, p.goles_contra, p.nro_fecha
+        FROM partidos p{where}
+    """, conn, params=params)
+    stats = pd.read_sql(f"""
+        SELECT s.id_partido, s.id_jugador, {', '.join(f's.{col}' for col in STAT_COLUMNS)}
+        FROM stats s JOIN partidos p ON p.id = s.id_partido{where}
+    """, conn, params=params)
+    return partidos, stats
+
+def _load():
+    with db_connection(readonly=True) as conn:
+        if not conn: return None
+        torneos = pd.read_sql("SELECT id, nombre, temporada FROM torneos ORDER BY id", conn, index_col="id")
+        rivales = pd.read_sql("SELECT id, nombre FROM rivales ORDER BY id", conn, index_col="id")
+        tecnicos = pd.read_sql("SELECT id, nombre FROM tecnicos ORDER BY id", conn, index_col="id")
+        arbitros = pd.read_sql("SELECT id, nombre FROM arbitros ORDER BY id", conn, index_col="id")
+        jugadores = pd.read_sql(f"""
+            SELECT id, nombre || ' ' || apellido as "Jugador",
+                   {', '.join(f'COALESCE({col}_inicial, 0) as {col}_inicial' for col in INITIAL_COLUMNS)}
+            FROM jugadores ORDER BY id
+        """, conn, index_col="id")
+        partidos, stats = _read_tables(conn)
+    return FactData(torneos, rivales, tecnicos, arbitros, jugadores, partidos, stats)
+
+def _extend(data):
+    """FactData con los partidos (y sus stats) agregados después del último cargado."""
+    with db_connection(readonly=True) as conn:
+        if not conn: return data
+        partidos, stats = _read_tables(conn, data.max_partido_id)
+    if partidos.empty:
+        return data
+    if not data.covers(partidos, stats):
+        # Referencian dimensiones (o condiciones) nuevas: recarga completa
+        return _load()
+
+    return data.extended(partidos, stats)
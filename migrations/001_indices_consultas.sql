@@ -0,0 +1,27 @@
+-- =============================================================================
+-- MIGRACIÓN 001: ÍNDICES PARA LAS CONSULTAS DEL DASHBOARD
+-- Cubren los accesos de cava_functions que antes recorrían tablas completas.
+-- Sintaxis válida tanto en SQLite como en Postgres.
+-- =============================================================================
+
+-- Ficha y log de partidos de un jugador (stats WHERE id_jugador = ?).
+-- Incluye las columnas sumadas para que la ficha se resuelva solo con el índice.
+CREATE INDEX IF NOT EXISTS idx_stats_jugador
+    ON stats (id_jugador, id_partido, es_titular, minutos_jugados, goles_marcados,
+              goles_recibidos, asistencias, amarillas, rojas);
+
+-- Historial contra un rival (partidos WHERE id_rival = ?)
+CREATE INDEX IF NOT EXISTS idx_partidos_rival
+    ON partidos (id_rival, goles_favor, goles_contra);
+
+-- Filtro por torneo (récord global, racha, listado de partidos)
+CREATE INDEX IF NOT EXISTS idx_partidos_torneo
+    ON partidos (id_torneo, goles_favor, goles_contra);
+
+-- Efectividad de DTs (JOIN por id_tecnico, opcionalmente filtrado por torneo)
+CREATE INDEX IF NOT EXISTS idx_partidos_tecnico
+    ON partidos (id_tecnico, id_torneo, goles_favor, goles_contra);
+
+-- Filtro por temporada (torneos WHERE temporada = ?)
+CREATE INDEX IF NOT EXISTS idx_torneos_temporada
+    ON torneos (temporada, id);
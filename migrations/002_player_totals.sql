@@ -0,0 +1,66 @@
+-- =============================================================================
+-- MIGRACIÓN 002: TOTALES MATERIALIZADOS POR JUGADOR
+-- Una fila por jugador con sus saldos iniciales del Excel y el acumulado de stats.
+-- La reconstruye el ETL (etl_process.rebuild_player_totals) y la actualiza
+-- save_match dentro de la misma transacción en la que guarda el partido.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS player_totals (
+    id_jugador INTEGER PRIMARY KEY,
+
+    -- Saldos iniciales (copia de las columnas *_inicial de jugadores)
+    pj_inicial INTEGER DEFAULT 0,
+    goles_marcados_inicial INTEGER DEFAULT 0,
+    goles_recibidos_inicial INTEGER DEFAULT 0,
+    asistencias_inicial INTEGER DEFAULT 0,
+    amarillas_inicial INTEGER DEFAULT 0,
+    rojas_inicial INTEGER DEFAULT 0,
+    titular_inicial INTEGER DEFAULT 0,
+    suplente_inicial INTEGER DEFAULT 0,
+
+    -- Acumulado de la tabla stats (mismos nombres de columna que stats)
+    pj INTEGER DEFAULT 0,
+    titular INTEGER DEFAULT 0,
+    minutos_jugados INTEGER DEFAULT 0,
+    goles_marcados INTEGER DEFAULT 0,
+    goles_recibidos INTEGER DEFAULT 0,
+    asistencias INTEGER DEFAULT 0,
+    amarillas INTEGER DEFAULT 0,
+    rojas INTEGER DEFAULT 0,
+
+    FOREIGN KEY (id_jugador) REFERENCES jugadores(id) ON DELETE CASCADE
+);
+
+-- Rankings históricos (sin filtros) de goles y minutos
+CREATE INDEX IF NOT EXISTS idx_player_totals_goles
+    ON player_totals ((goles_marcados + goles_marcados_inicial));
+CREATE INDEX IF NOT EXISTS idx_player_totals_minutos
+    ON player_totals (minutos_jugados);
+
+-- Carga inicial con los datos que ya existan en la base
+INSERT INTO player_totals (
+    id_jugador,
+    pj_inicial, goles_marcados_inicial, goles_recibidos_inicial, asistencias_inicial,
+    amarillas_inicial, rojas_inicial, titular_inicial, suplente_inicial,
+    pj, titular, minutos_jugados, goles_marcados, goles_recibidos, asistencias, amarillas, rojas
+)
+SELECT j.id,
+       COALESCE(j.pj_inicial, 0), COALESCE(j.goles_marcados_inicial, 0), COALESCE(j.goles_recibidos_inicial, 0),
+       COALESCE(j.asistencias_inicial, 0), COALESCE(j.amarillas_inicial, 0), COALESCE(j.rojas_inicial, 0),
+       COALESCE(j.titular_inicial, 0), COALESCE(j.suplente_inicial, 0),
+       COALESCE(s.pj, 0), COALESCE(s.titular, 0), COALESCE(s.minutos_jugados, 0), COALESCE(s.goles_marcados, 0),
+       COALESCE(s.goles_recibidos, 0), COALESCE(s.asistencias, 0), COALESCE(s.amarillas, 0), COALESCE(s.rojas, 0)
+FROM jugadores j
+LEFT JOIN (
+    SELECT id_jugador,
+           COUNT(*) AS pj,
+           SUM(CASE WHEN es_titular THEN 1 ELSE 0 END) AS titular,
+           SUM(minutos_jugados) AS minutos_jugados,
+           SUM(goles_marcados) AS goles_marcados,
+           SUM(goles_recibidos) AS goles_recibidos,
+           SUM(asistencias) AS asistencias,
+           SUM(amarillas) AS amarillas,
+           SUM(rojas) AS rojas
+    FROM stats
+    GROUP BY id_jugador
+) s ON s.id_jugador = j.id;
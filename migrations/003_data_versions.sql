@@ -0,0 +1,13 @@
+-- =============================================================================
+-- MIGRACIÓN 003: VERSIONES DE DATOS PARA INVALIDAR LA CACHÉ
+-- Un contador por alcance ('global', 'partidos', 'torneo:<id>', 'temporada:<t>',
+-- 'jugador:<id>') que se incrementa dentro de la misma transacción que modifica
+-- los datos. Las lecturas cacheadas de cava_functions usan como clave la versión
+-- de los alcances de los que dependen, así guardar un partido solo invalida lo
+-- que ese partido afecta. El ETL no vacía esta tabla: solo incrementa 'global'.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    scope VARCHAR(100) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
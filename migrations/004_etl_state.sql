@@ -0,0 +1,16 @@
+-- =============================================================================
+-- MIGRACIÓN 004: ESTADO DEL ETL INCREMENTAL
+-- Una fila por hoja del Excel que consume el ETL, con la huella (sha256) de su
+-- contenido en la última carga. `python etl_process.py --incremental` solo recarga
+-- las hojas cuya huella cambió. `partidos` guarda los ids de partidos que cargó
+-- la hoja (los creados por Resultados, o aquellos cuyas stats cargó cada PLANTEL),
+-- separados por coma.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS etl_state (
+    hoja VARCHAR(100) PRIMARY KEY,
+    huella VARCHAR(64) NOT NULL,
+    filas INTEGER NOT NULL DEFAULT 0,
+    partidos TEXT,
+    actualizada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
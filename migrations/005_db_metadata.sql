@@ -0,0 +1,20 @@
+-- =============================================================================
+-- MIGRACIÓN 005: METADATOS DE LA BASE
+-- Pares clave/valor que la app lee una vez por proceso al arrancar, en lugar de
+-- contar filas de stats en cada ejecución:
+--   schema_version       última migración aplicada (la escribe apply_migrations)
+--   ultima_carga         fecha y hora de la última carga del ETL
+--   filas_<tabla>        filas de partidos, stats y jugadores tras esa carga
+-- Las filas se inicializan con el contenido actual, así una base ya cargada
+-- sigue considerándose lista después de migrar.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS db_metadata (
+    clave VARCHAR(50) PRIMARY KEY,
+    valor TEXT,
+    actualizada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO db_metadata (clave, valor) SELECT 'filas_partidos', CAST(COUNT(*) AS TEXT) FROM partidos;
+INSERT INTO db_metadata (clave, valor) SELECT 'filas_stats', CAST(COUNT(*) AS TEXT) FROM stats;
+INSERT INTO db_metadata (clave, valor) SELECT 'filas_jugadores', CAST(COUNT(*) AS TEXT) FROM jugadores;
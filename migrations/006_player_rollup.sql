@@ -0,0 +1,44 @@
+-- =============================================================================
+-- MIGRACIÓN 006: ACUMULADOS POR JUGADOR, TORNEO Y TEMPORADA
+-- Una fila por jugador y torneo con la suma de cada columna numérica de stats
+-- (la temporada se copia del torneo para filtrar sin JOIN). Los rankings filtrados
+-- de get_top_stat leen de acá en lugar de agrupar stats.
+-- La reconstruye el ETL (etl_process.rebuild_player_rollup) y la actualiza
+-- save_match dentro de la misma transacción en la que guarda el partido.
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS player_rollup (
+    id_torneo INTEGER NOT NULL,
+    id_jugador INTEGER NOT NULL,
+    temporada VARCHAR(20) NOT NULL,
+
+    -- Mismos nombres de columna que stats
+    minutos_jugados INTEGER DEFAULT 0,
+    goles_marcados INTEGER DEFAULT 0,
+    goles_recibidos INTEGER DEFAULT 0,
+    asistencias INTEGER DEFAULT 0,
+    amarillas INTEGER DEFAULT 0,
+    rojas INTEGER DEFAULT 0,
+
+    PRIMARY KEY (id_torneo, id_jugador),
+    FOREIGN KEY (id_torneo) REFERENCES torneos(id) ON DELETE CASCADE,
+    FOREIGN KEY (id_jugador) REFERENCES jugadores(id) ON DELETE CASCADE
+);
+
+-- Rankings por temporada (el filtro por torneo usa la clave primaria)
+CREATE INDEX IF NOT EXISTS idx_player_rollup_temporada
+    ON player_rollup (temporada, id_jugador);
+
+-- Carga inicial con los datos que ya existan en la base
+INSERT INTO player_rollup (
+    id_torneo, id_jugador, temporada,
+    minutos_jugados, goles_marcados, goles_recibidos, asistencias, amarillas, rojas
+)
+SELECT p.id_torneo, s.id_jugador, t.temporada,
+       COALESCE(SUM(s.minutos_jugados), 0), COALESCE(SUM(s.goles_marcados), 0),
+       COALESCE(SUM(s.goles_recibidos), 0), COALESCE(SUM(s.asistencias), 0),
+       COALESCE(SUM(s.amarillas), 0), COALESCE(SUM(s.rojas), 0)
+FROM stats s
+JOIN partidos p ON p.id = s.id_partido
+JOIN torneos t ON t.id = p.id_torneo
+GROUP BY p.id_torneo, s.id_jugador, t.temporada;
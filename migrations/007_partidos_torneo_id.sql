@@ -0,0 +1,10 @@
+-- =============================================================================
+-- MIGRACIÓN 007: ÚLTIMOS PARTIDOS DE UN TORNEO POR ÍNDICE
+-- Racha, listado y páginas de partidos filtran por torneo y ordenan por id
+-- descendente. En SQLite idx_partidos_torneo ya lleva el rowid (= id) al final;
+-- en Postgres no, y sin este índice el planner recorre entera la clave primaria
+-- de atrás para adelante filtrando por torneo.
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_partidos_torneo_id
+    ON partidos (id_torneo, id);
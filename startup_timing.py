@@ -0,0 +1,49 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# Instante en que la app empezó a cargar (este módulo se importa al principio de app.py)
+_inicio = time.perf_counter()
+_mediciones = {}  # (tipo, nombre) -> segundos de la primera vez
+_reportado = False
+
+@contextmanager
+def timed(tipo, nombre):
+    """
+    Mide un bloque del arranque (un import, la primera consulta, ...). Solo cuenta la
+    primera vez por proceso, que es la del arranque en frío: en los reruns siguientes los
+    módulos ya están importados y las consultas cacheadas, y el bloque corre sin medirse.
+    """
+    key = (tipo, nombre)
+    if key in _mediciones:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _mediciones[key] = time.perf_counter() - t0
+        if _reportado:
+            # Algo que se cargó recién después del primer render (ej. la vista de administración)
+            _print(f"⏱️ {tipo} {nombre}: {_mediciones[key] * 1000:.1f} ms")
+
+def report():
+    """
+    Escribe en el log del servidor, una vez por proceso, el tiempo hasta el primer render
+    y lo medido con timed() ordenado de mayor a menor.
+    """
+    global _reportado
+    if _reportado:
+        return
+    _reportado = True
+    lines = [f"⏱️ Arranque de la app: {time.perf_counter() - _inicio:.2f}s hasta el primer render"]
+    for (tipo, nombre), segundos in sorted(_mediciones.items(), key=lambda item: -item[1]):
+        lines.append(f"   {tipo:<9}{nombre:<28}{segundos * 1000:9.1f} ms")
+    _print("\n".join(lines))
+
+def timings():
+    """Copia de las mediciones: {(tipo, nombre): segundos}."""
+    return dict(_mediciones)
+
+def _print(text):
+    print(text, file=sys.stderr, flush=True)